@@ -2,8 +2,9 @@ from flask import Flask
 from flask_session import Session
 from config import AppConfig
 from app.extensions import cache, mail, login_manager
-from app.database import create_tables
+from app.database import create_tables, engine
 from app.models import User
+from app.utils import jobs, metrics
 
 
 def create_app():
@@ -24,6 +25,8 @@ def create_app():
     cache.init_app(app)
     login_manager.init_app(app)
     login_manager.login_view = 'auth.login'
+    metrics.init_app(app, engine)
+    jobs.init_app(app)
 
     # Create database tables if they don't exist
     create_tables()
@@ -46,8 +49,16 @@ def create_app():
 
     Session(app)
 
-    from app.routes.main import blueprints
+    from app.routes.main import blueprints, warmup
     for blueprint in blueprints:
         app.register_blueprint(blueprint)
 
+    @app.cli.command('warmup')
+    def warmup_command():
+        """Load the active turnus set and data libraries."""
+        warmup()
+
+    if AppConfig.WARMUP_ON_START:
+        warmup()
+
     return app
@@ -32,3 +32,12 @@ def create_tables():
 
 def get_db_session():
     return SessionLocal()
+
+
+def dispose_engine(close=True):
+    """Drop all pooled connections.
+
+    Call with close=False in a forked child: the parent's connections are left
+    untouched for the parent and the child starts with a fresh, empty pool.
+    """
+    engine.dispose(close=close)
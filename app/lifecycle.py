@@ -0,0 +1,54 @@
+"""
+Process lifecycle hooks for multi-worker deployment.
+
+With gunicorn ``--preload`` the app is created once in the master process and
+workers are forked from it, sharing loaded data copy-on-write:
+
+    preload(app)  - run in the master before forking: loads all turnus sets,
+                    compiles templates, closes DB connections and freezes the GC
+    post_fork()   - run in each worker right after fork: gives the worker its
+                    own DB connection pool and clears inherited metrics
+
+See gunicorn.conf.py for how these are wired up.
+"""
+
+import gc
+import os
+import time
+import logging
+from app.database import dispose_engine
+from app.utils import df_utils, metrics
+
+logger = logging.getLogger(__name__)
+
+
+def preload(app):
+    """Warm caches in the master process before workers are forked."""
+    start = time.perf_counter()
+
+    set_count = df_utils.preload_all_turnus_sets()
+    # After the preload, so the active set is taken from it instead of read again
+    from app.routes.main import warmup
+    warmup()
+
+    template_count = 0
+    for name in app.jinja_env.list_templates(extensions=['html']):
+        app.jinja_env.get_template(name)
+        template_count += 1
+
+    # Connections opened while warming must not be inherited by the workers
+    dispose_engine()
+
+    # Move everything loaded so far out of the GC's reach so collections in the
+    # workers don't touch (and un-share) those pages
+    gc.collect()
+    gc.freeze()
+
+    logger.warning("Preloaded %d turnus sets and %d templates in %.0f ms (pid %d)",
+                   set_count, template_count, (time.perf_counter() - start) * 1000, os.getpid())
+
+
+def post_fork():
+    """Reset per-process state in a freshly forked worker."""
+    dispose_engine(close=False)
+    metrics.registry.reset()
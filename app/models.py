@@ -5,6 +5,7 @@ from sqlalchemy.orm import Mapped, mapped_column
 
 from app.database import Base, get_db_session
 from app.extensions import cache
+from app.utils import metrics
 
 
 # ── SQLAlchemy ORM Models ──────────────────────────────────────────────
@@ -93,6 +94,7 @@ class User(UserMixin):
     def get(username):
         """Get user by username - used by Flask-Login"""
         user = cache.get(f'user_{username}')
+        metrics.record_cache('user', user is not None)
         if not user:
             from app.services.user_service import get_user_data
             db_user_data = get_user_data(username)
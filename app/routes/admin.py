@@ -1,9 +1,12 @@
 import os
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+import hmac
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, Response
 from flask_login import current_user
+from config import AppConfig
 from app.decorators import admin_required
 from app.forms import CreateUserForm, EditUserForm, CreateTurnusSetForm, SelectTurnusSetForm, UploadStreklisteForm
-from app.utils import db_utils
+from app.services import import_service
+from app.utils import db_utils, jobs, metrics
 from app.utils.pdf import strekliste_generator
 
 admin = Blueprint('admin', __name__, url_prefix='/admin')
@@ -104,6 +107,36 @@ def toggle_auth(user_id):
     return redirect(url_for('admin.admin_dashboard')) 
 
 
+# Metrics Routes
+@admin.route('/metrics')
+@admin_required
+def metrics_dashboard():
+    """Show request latency, DB, cache and data loading metrics for this worker"""
+    return render_template('admin_metrics.html',
+                         page_name='Ytelse',
+                         metrics=metrics.registry.snapshot(),
+                         slow_request_ms=AppConfig.SLOW_REQUEST_MS)
+
+@admin.route('/metrics/prometheus')
+def metrics_prometheus():
+    """Prometheus text endpoint. Accepts METRICS_TOKEN as bearer token or an admin session."""
+    token = AppConfig.METRICS_TOKEN
+    # Constant-time compare; bytes, since compare_digest rejects non-ASCII str
+    has_token = token and hmac.compare_digest(request.headers.get('Authorization', '').encode('utf-8'),
+                                              f'Bearer {token}'.encode('utf-8'))
+    if not has_token and not (current_user.is_authenticated and current_user.is_admin):
+        return jsonify({'status': 'error', 'message': 'Access denied'}), 403
+    return Response(metrics.registry.to_prometheus(), mimetype='text/plain; version=0.0.4')
+
+@admin.route('/metrics/reset', methods=['POST'])
+@admin_required
+def metrics_reset():
+    """Clear all collected metrics"""
+    metrics.registry.reset()
+    flash('Ytelsesdata nullstilt.', 'success')
+    return redirect(url_for('admin.metrics_dashboard'))
+
+
 
 
 
@@ -116,29 +149,30 @@ def manage_turnus_sets():
     turnus_sets = db_utils.get_all_turnus_sets()
     active_set = db_utils.get_active_turnus_set()
     upload_form = UploadStreklisteForm()
+    recent_jobs = jobs.list_jobs(limit=10)
 
     return render_template('admin_turnus_sets.html',
                          page_name='Manage Turnus Sets',
                          turnus_sets=turnus_sets,
                          active_set=active_set,
-                         upload_form=upload_form)
+                         upload_form=upload_form,
+                         recent_jobs=recent_jobs)
 
 @admin.route('/create-turnus-set', methods=['GET', 'POST'])
 @admin_required
 def create_turnus_set():
-    """Create a new turnus set"""
+    """Create a new turnus set. Scraping and import run as a background job."""
     form = CreateTurnusSetForm()
     
     if form.validate_on_submit():
         year_id = form.year_identifier.data.upper()
+        pdf_path = None
         
         # Determine file paths
         if form.use_existing_files.data:
             # Use existing files from turnusfiler directory
-            from config import AppConfig
             turnusfiler_dir = os.path.join(AppConfig.static_dir, 'turnusfiler', year_id.lower())
             turnus_json_path = os.path.join(turnusfiler_dir, f'turnuser_{year_id}.json')
-            df_json_path = os.path.join(turnusfiler_dir, f'turnus_df_{year_id}.json')
 
             # Check if main turnus file exists
             if not os.path.exists(turnus_json_path):
@@ -154,59 +188,26 @@ def create_turnus_set():
                                      page_name='Opprett turnussett',
                                      form=form)
             
-            # PDF upload - scrape it
-            turnus_json_path, df_json_path = handle_pdf_upload(form.pdf_file.data, year_id)
-            if not turnus_json_path:
+            pdf_path = handle_pdf_upload(form.pdf_file.data, year_id)
+            if not pdf_path:
                 return render_template('admin_create_turnus_set.html',
                                      page_name='Opprett turnussett',
                                      form=form)
 
-        # Generate statistics if missing
-        if not df_json_path or not os.path.exists(df_json_path):
-            try:
-                from app.utils.shift_stats import Turnus
-                from config import AppConfig
-                stats = Turnus(turnus_json_path)
-                df_json_path = os.path.join(AppConfig.static_dir, 'turnusfiler', year_id.lower(), f'turnus_df_{year_id}.json')
-                stats.stats_df.to_json(df_json_path)
-                flash('Statistikk-JSON generert automatisk.', 'info')
-            except Exception as e:
-                flash(f'Feil ved generering av statistikk: {e}', 'danger')
-                return render_template('admin_create_turnus_set.html',
-                                     page_name='Opprett turnussett',
-                                     form=form)
-        
-        # Create turnus set in database
-        success, message = db_utils.create_turnus_set(
-            name=form.name.data,
-            year_identifier=year_id,
-            is_active=form.is_active.data,
-            turnus_file_path=turnus_json_path,
-            df_file_path=df_json_path
-        )
-        
-        if success:
-            # Add shifts to database
-            turnus_set = db_utils.get_turnus_set_by_year(year_id)
-            if turnus_set:
-                db_utils.add_shifts_to_turnus_set(turnus_json_path, turnus_set['id'])
-                flash(f'Turnussett {year_id} opprettet!', 'success')
-            else:
-                flash('Turnussett opprettet, men vakter ikke lagt til.', 'warning')
-            return redirect(url_for('admin.manage_turnus_sets'))
-        else:
-            flash(message, 'danger')
+        jobs.submit('import_turnus_set', import_service.import_turnus_set,
+                    label=year_id, user_id=current_user.id,
+                    name=form.name.data, year_id=year_id,
+                    is_active=bool(form.is_active.data), pdf_path=pdf_path)
+        flash(f'Import av {year_id} startet i bakgrunnen. Fremdrift vises under.', 'info')
+        return redirect(url_for('admin.manage_turnus_sets'))
 
     return render_template('admin_create_turnus_set.html',
                          page_name='Opprett turnussett',
                          form=form)
 
 def handle_pdf_upload(pdf_file, year_id):
-    """Handle PDF upload and scraping"""
+    """Save an uploaded turnus PDF to turnusfiler. Returns its path, or None on error."""
     try:
-        from config import AppConfig
-        from app.utils.pdf.shiftscraper import ShiftScraper
-        
         # Create turnusfiler directory
         turnusfiler_dir = os.path.join(AppConfig.static_dir, 'turnusfiler', year_id.lower())
         os.makedirs(turnusfiler_dir, exist_ok=True)
@@ -214,21 +215,11 @@ def handle_pdf_upload(pdf_file, year_id):
         # Save PDF file
         pdf_path = os.path.join(turnusfiler_dir, f'turnuser_{year_id}.pdf')
         pdf_file.save(pdf_path)
-        
-        # Scrape PDF
-        scraper = ShiftScraper()
-        scraper.scrape_pdf(pdf_path, year_id)
-        
-        # Generate JSON files
-        turnus_json_path = scraper.create_json(year_id=year_id)
-        excel_path = scraper.create_excel(year_id=year_id)
-        
-        flash(f'PDF skrapet! JSON- og Excel-filer opprettet.', 'success')
-        return turnus_json_path, None  # df_json_path will be generated later
+        return pdf_path
 
     except Exception as e:
-        flash(f'Feil ved skraping av PDF: {e}', 'danger')
-        return None, None
+        flash(f'Feil ved lagring av PDF: {e}', 'danger')
+        return None
 
 @admin.route('/switch-turnus-set', methods=['POST'])
 @admin_required
@@ -250,71 +241,32 @@ def switch_turnus_set():
 @admin.route('/refresh-turnus-set/<int:turnus_set_id>', methods=['POST'])
 @admin_required
 def refresh_turnus_set(turnus_set_id):
-    """Re-scrape the PDF and update shift names in the database, preserving favorites."""
+    """Re-scrape the PDF and update shift names in the database as a background job."""
     turnus_set = db_utils.get_turnus_set_by_id(turnus_set_id)
     if not turnus_set:
         flash('Turnussett ikke funnet.', 'danger')
         return redirect(url_for('admin.manage_turnus_sets'))
 
     year_id = turnus_set['year_identifier']
-    version = year_id.lower()
-
-    try:
-        from config import AppConfig
-        from app.utils.pdf.shiftscraper import ShiftScraper
-        from app.utils.shift_stats import Turnus
-
-        # Find the original PDF
-        turnusfiler_dir = os.path.join(AppConfig.static_dir, 'turnusfiler', version)
-        pdf_path = os.path.join(turnusfiler_dir, f'turnuser_{year_id}.pdf')
-
-        if not os.path.exists(pdf_path):
-            flash(f'PDF ikke funnet: {pdf_path}', 'danger')
-            return redirect(url_for('admin.manage_turnus_sets'))
-
-        # Re-scrape the PDF
-        scraper = ShiftScraper()
-        scraper.scrape_pdf(pdf_path, year_id)
-        turnus_json_path = scraper.create_json(year_id=year_id)
-        scraper.create_excel(year_id=year_id)
-
-        # Regenerate statistics JSON
-        stats = Turnus(turnus_json_path)
-        df_json_path = os.path.join(turnusfiler_dir, f'turnus_df_{year_id}.json')
-        stats.stats_df.to_json(df_json_path)
-
-        # Update shift names in DB (preserving favorites)
-        summary = db_utils.refresh_turnus_set_shifts(turnus_set_id, turnus_json_path)
-
-        # Update file paths in DB
-        db_utils.update_turnus_set_paths(turnus_set_id, turnus_json_path, df_json_path)
-
-        # Reload data manager if this is the active set
-        active_set = db_utils.get_active_turnus_set()
-        if active_set and active_set['id'] == turnus_set_id:
-            from app.routes.main import df_manager
-            df_manager.reload_active_set()
-
-        # Build summary message
-        parts = []
-        if summary['renamed']:
-            parts.append(f"{len(summary['renamed'])} omdøpt")
-        if summary['added']:
-            parts.append(f"{len(summary['added'])} nye")
-        if summary['removed']:
-            parts.append(f"{len(summary['removed'])} fjernet")
-        parts.append(f"{len(summary['unchanged'])} uendret")
-        flash(f"Turnussett {year_id} oppdatert: {', '.join(parts)}.", 'success')
-
-        if summary['renamed']:
-            renamed_details = '; '.join(f"{r['old']} → {r['new']}" for r in summary['renamed'][:10])
-            if len(summary['renamed']) > 10:
-                renamed_details += f' ... og {len(summary["renamed"]) - 10} til'
-            flash(f"Omdøpte vakter: {renamed_details}", 'info')
+    jobs.submit('refresh_turnus_set', import_service.refresh_turnus_set,
+                label=year_id, user_id=current_user.id, turnus_set_id=turnus_set_id)
+    flash(f'Oppdatering av {year_id} startet i bakgrunnen. Fremdrift vises under.', 'info')
+    return redirect(url_for('admin.manage_turnus_sets'))
 
-    except Exception as e:
-        flash(f'Feil ved oppdatering av turnussett: {e}', 'danger')
+@admin.route('/import-year/<int:turnus_set_id>', methods=['POST'])
+@admin_required
+def import_year(turnus_set_id):
+    """Run the full import pipeline (scrape, stats, shifts, strekliste) as a background job."""
+    turnus_set = db_utils.get_turnus_set_by_id(turnus_set_id)
+    if not turnus_set:
+        flash('Turnussett ikke funnet.', 'danger')
+        return redirect(url_for('admin.manage_turnus_sets'))
 
+    year_id = turnus_set['year_identifier']
+    jobs.submit('import_year', import_service.import_year,
+                label=year_id, user_id=current_user.id, year_id=year_id,
+                force=request.form.get('force') == '1')
+    flash(f'Full import av {year_id} startet i bakgrunnen. Fremdrift vises under.', 'info')
     return redirect(url_for('admin.manage_turnus_sets'))
 
 @admin.route('/delete-turnus-set/<int:turnus_set_id>', methods=['POST'])
@@ -473,29 +425,45 @@ def generate_strekliste(turnus_set_id):
     # Check if force regenerate is requested
     force = request.json.get('force', False) if request.is_json else False
 
-    # Generate images
-    result = strekliste_generator.generate_all_images(version, force=force)
+    # Generate images in the background; the client polls admin.job_status
+    job_id = jobs.submit('generate_strekliste', import_service.generate_strekliste_images,
+                         label=turnus_set['year_identifier'], user_id=current_user.id,
+                         version=version, force=bool(force))
 
-    if result['success']:
-        error_count = len(result.get('errors', []))
-        message = f'Generated {len(result["generated"])} images'
-        if error_count > 0:
-            message += f' ({error_count} errors)'
+    return jsonify({
+        'status': 'success',
+        'message': 'Generering startet',
+        'job_id': job_id,
+        'status_url': url_for('admin.job_status', job_id=job_id)
+    }), 202
 
-        return jsonify({
-            'status': 'success',
-            'message': message,
-            'generated': len(result['generated']),
-            'skipped': len(result['skipped']),
-            'errors': error_count,
-            'error_details': result.get('errors', [])[:10],  # First 10 errors
-            'total': result['total']
-        })
-    else:
-        return jsonify({
-            'status': 'error',
-            'message': result.get('error', 'Unknown error')
-        }), 500
+
+# Background Job Routes
+@admin.route('/jobs')
+@admin_required
+def list_jobs():
+    """AJAX endpoint listing recent background jobs"""
+    return jsonify({'status': 'success', 'jobs': jobs.list_jobs(limit=request.args.get('limit', 10, type=int))})
+
+
+@admin.route('/jobs/<job_id>')
+@admin_required
+def job_status(job_id):
+    """AJAX endpoint for polling a background job's progress and result"""
+    job = jobs.get_job(job_id)
+    if not job:
+        return jsonify({'status': 'error', 'message': 'Job not found'}), 404
+    return jsonify({'status': 'success', 'job': job})
+
+
+@admin.route('/jobs/<job_id>/cancel', methods=['POST'])
+@admin_required
+def cancel_job(job_id):
+    """Request cancellation of a queued or running background job"""
+    job = jobs.cancel(job_id)
+    if not job:
+        return jsonify({'status': 'error', 'message': 'Job not found'}), 404
+    return jsonify({'status': 'success', 'job': job})
 
 
 @admin.route('/delete-strekliste-images/<int:turnus_set_id>', methods=['POST'])
@@ -1,13 +1,12 @@
 import os
-import re
-import glob
+import hashlib
 import logging
-from flask import Blueprint, request, jsonify, send_from_directory
+from flask import Blueprint, request, jsonify, send_from_directory, Response
 from flask_login import login_required, current_user
+from werkzeug.exceptions import NotFound
 from app.utils import db_utils
-from app.utils import shift_matcher
 from app.routes.main import favorite_lock
-from config import AppConfig
+from app.extensions import cache
 
 logger = logging.getLogger(__name__)
 
@@ -247,60 +246,99 @@ def generate_turnusnokkel():
     
     try:
         logger.debug("Generating turnusnøkkel for turnus_name=%s, turnus_set_id=%s", turnus_name, turnus_set_id)
-        
-        # Import the turnusnøkkel generator
-        from app.utils.turnusnokkel_gen import TurnusnokkelGen
+
+        from app.utils.turnusnokkel_gen import TurnusnokkelGen, XLSX_MIMETYPE
         from flask import send_file
-        import tempfile
-        import os
-        
-        # Create generator instance and generate the turnusnøkkel
+
         generator = TurnusnokkelGen(turnus_name, turnus_set_id)
         result = generator.generate_single_turnus_nokkel()
-        
-        logger.debug("Turnusnøkkel generator result: %s", result)
-        
-        if result['success']:
-            # Get the workbook object from the result
-            workbook = result.get('workbook')
-            filename = result['filename']
-            
-            if workbook:
-                # Create a temp file, close it, then save workbook to it
-                # (Windows locks files so we can't have two handles open)
-                temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx')
-                temp_file_path = temp_file.name
-                temp_file.close()
-                workbook.save(temp_file_path)
-
-                try:
-                    response = send_file(
-                        temp_file_path,
-                        as_attachment=True,
-                        download_name=filename,
-                        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-                    )
-
-                    # Clean up temp file after response is sent
-                    @response.call_on_close
-                    def cleanup():
-                        if os.path.exists(temp_file_path):
-                            os.unlink(temp_file_path)
-
-                    return response
-                except Exception as e:
-                    if os.path.exists(temp_file_path):
-                        os.unlink(temp_file_path)
-                    raise e
-            else:
-                return jsonify({'status': 'error', 'message': 'Generated workbook not found'})
-        else:
+
+        if not result['success']:
             return jsonify({'status': 'error', 'message': result['error']})
-            
+
+        # Streamed from memory (new file) or from the artifact cache (same template and turnus)
+        logger.debug("Turnusnøkkel %s (%s)", result['filename'], 'cached' if result['cached'] else 'generated')
+        return send_file(result['stream'], as_attachment=True, download_name=result['filename'],
+                         mimetype=XLSX_MIMETYPE, etag=result['etag'])
+
     except Exception as e:
         return jsonify({'status': 'error', 'message': f'Failed to generate turnusnøkkel: {str(e)}'})
 
 
+@api.route('/rank', methods=['GET'])
+@login_required
+def rank_turnuser():
+    """
+    Turnuser of the user's turnus set ordered by the turnusliste slider weights.
+
+    Query parameters: one weight per slider (helgetimer, shift_cnt, tidlig, natt,
+    ettermiddag, before_6, afternoon_ends; missing ones are 0) and optionally
+    k to only return the best k turnuser.
+    """
+    from app.utils import turnus_ranking
+    from app.utils.turnus_helpers import get_user_turnus_set
+
+    user_turnus_set = get_user_turnus_set()
+    if not user_turnus_set:
+        return jsonify({'status': 'error', 'message': 'No turnus set selected'}), 404
+
+    top_k = request.args.get('k', type=int)
+    if top_k is None and request.args.get('k'):
+        return jsonify({'status': 'error', 'message': 'k må være et heltall'}), 400
+    try:
+        weights = turnus_ranking.parse_weights(request.args.to_dict())
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+
+    ranking = turnus_ranking.rank(user_turnus_set['id'], weights, top_k=top_k)
+    return jsonify({
+        'status': 'success',
+        'turnus_set_id': user_turnus_set['id'],
+        **ranking,
+    })
+
+
+@api.route('/turnus-data/<int:turnus_set_id>', methods=['GET'])
+@login_required
+def get_turnus_data(turnus_set_id):
+    """
+    Turnus blocks of a turnus set for the turnusliste (see app/utils/turnus_pages.py):
+    ?page=N (0-based, PAGE_SIZE turnuser) or ?name=A&name=B for the named turnuser.
+
+    The bodies are prepared when the set is loaded; gzip-compressed if the client
+    accepts it, with an ETag per encoding (304 on If-None-Match).
+    """
+    from app.utils import turnus_pages
+
+    names = request.args.getlist('name')
+    if names:
+        if len(names) > turnus_pages.MAX_NAMES:
+            return jsonify({'status': 'error',
+                            'message': f'Maks {turnus_pages.MAX_NAMES} turnuser per forespørsel'}), 400
+        payload = turnus_pages.get_turnuser(turnus_set_id, names)
+    else:
+        page = request.args.get('page', 0, type=int)
+        payload = turnus_pages.get_page(turnus_set_id, page)
+
+    if payload is None:
+        return jsonify({'status': 'error', 'message': 'Turnus set or page not found'}), 404
+
+    if request.accept_encodings['gzip']:
+        response = Response(payload.gzipped, mimetype='application/json')
+        response.content_encoding = 'gzip'
+        etag = payload.gzip_etag
+    else:
+        response = Response(payload.body, mimetype='application/json')
+        etag = payload.etag
+    response.vary.add('Accept-Encoding')
+
+    # Revalidate every time: the data changes when the set is imported again
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
 @api.route('/import-favorites-preview', methods=['POST'])
 @login_required
 def import_favorites_preview():
@@ -360,6 +398,8 @@ def import_favorites_preview():
 
     user_id = current_user.get_id()
 
+    from app.utils import shift_matcher
+
     # Use multi-source function if multiple sources, otherwise use original
     if len(source_ids) > 1:
         result = shift_matcher.find_matches_from_multiple_sources(
@@ -498,6 +538,7 @@ def get_turnus_sets_for_import():
     current_turnus_set_id = user_turnus_set['id'] if user_turnus_set else None
 
     # Get all turnus sets with stats
+    from app.utils import shift_matcher
     sets_with_stats = shift_matcher.get_all_turnus_sets_with_stats()
 
     # Filter to only sets where user has favorites (and not current set)
@@ -523,41 +564,91 @@ def get_turnus_sets_for_import():
     })
 
 
+def _turnus_set_version(turnus_set_id):
+    """Strekliste version (e.g. 'r26') of a turnus set, cached briefly to skip the DB on every image."""
+    key = f'turnus_set_version_{turnus_set_id}'
+    version = cache.get(key)
+    if version is None:
+        turnus_set = db_utils.get_turnus_set_by_id(turnus_set_id)
+        if not turnus_set:
+            return None
+        version = turnus_set['year_identifier'].lower()
+        cache.set(key, version, timeout=60)
+    return version
+
+
+def _cacheable_image(response, etag, max_age=None):
+    """
+    Strong ETag (304 on If-None-Match) and private caching; the images need a login.
+
+    Without max_age the browser revalidates on every use (no-cache): the image
+    URL has no version, so a regenerated image must not be hidden behind a
+    cached copy, and the 304 keeps the check cheap.
+    """
+    response.set_etag(etag)
+    response.cache_control.public = False
+    response.cache_control.private = True
+    if max_age is None:
+        response.cache_control.no_cache = True
+        response.cache_control.max_age = None
+    else:
+        response.cache_control.no_cache = None
+        response.cache_control.max_age = max_age
+    return response.make_conditional(request)
+
+
 @api.route('/shift-image/<int:turnus_set_id>/<shift_nr>')
 @login_required
 def get_shift_image(turnus_set_id, shift_nr):
     """
     Serve shift timeline PNG image from static files.
     Converts turnus_set_id to the appropriate version identifier.
+
+    The file is found through the image manifest written by generate_all_images
+    (exact shift number, or the shortest file name starting with it, e.g. with
+    suffixes like -Mod_1, -N05_1). Responses carry a content-hash ETag.
+
+    ?size=thumb|screen|print serves a smaller variant: WebP if the request
+    accepts image/webp, otherwise a palette PNG. Without size the original PNG is sent.
     """
-    # Get turnus set to find year_identifier
-    turnus_set = db_utils.get_turnus_set_by_id(turnus_set_id)
-    if not turnus_set:
-        return jsonify({'status': 'error', 'message': 'Turnus set not found'}), 404
+    from app.utils.pdf import strekliste_generator
 
-    # Convert year_identifier (e.g., "R26") to folder name (e.g., "r26")
-    version = turnus_set['year_identifier'].lower()
+    size = request.args.get('size')
+    if size is not None and size not in strekliste_generator.IMAGE_VARIANT_WIDTHS:
+        return jsonify({'status': 'error', 'message': f'Ukjent størrelse: {size}'}), 400
+    accepts_webp = any(mimetype == 'image/webp' for mimetype in request.accept_mimetypes.values())
 
-    # Build path to PNG directory
-    png_dir = os.path.join(AppConfig.turnusfiler_dir, version, 'streklister', 'png')
+    version = _turnus_set_version(turnus_set_id)
+    if not version:
+        return jsonify({'status': 'error', 'message': 'Turnus set not found'}), 404
 
-    # Sanitize shift_nr to prevent path traversal and normalize whitespace
     # Remove all whitespace to match filename convention (PDF names may have line breaks)
-    safe_shift_nr = re.sub(r'\s+', '', os.path.basename(shift_nr))
-
-    # Try exact match first
-    exact_path = os.path.join(png_dir, f'{safe_shift_nr}.png')
-    if os.path.isfile(exact_path):
-        return send_from_directory(png_dir, f'{safe_shift_nr}.png', mimetype='image/png')
-
-    # Try to find files that start with the shift number (handles suffixes like -Mod_1, -N05_1)
-    pattern = os.path.join(png_dir, f'{safe_shift_nr}*.png')
-    matches = glob.glob(pattern)
-    if matches:
-        # Return the first match (prefer shorter names)
-        matches.sort(key=len)
-        filename = os.path.basename(matches[0])
-        return send_from_directory(png_dir, filename, mimetype='image/png')
+    safe_shift_nr = strekliste_generator.normalize_shift_nr(os.path.basename(shift_nr))
+
+    entry = strekliste_generator.lookup_shift_image(version, safe_shift_nr, size=size, webp=accepts_webp)
+    if entry:
+        png_dir = strekliste_generator.get_paths(version)['images_dir']
+        mimetype = 'image/webp' if entry['file'].endswith('.webp') else 'image/png'
+        try:
+            response = send_from_directory(png_dir, entry['file'], mimetype=mimetype, etag=False)
+        except NotFound:
+            pass  # Deleted since the manifest was written
+        else:
+            if size:
+                response.vary.add('Accept')
+            return _cacheable_image(response, entry['etag'])
+
+    # No generated image: render it from the strekliste PDF (shift index + cached page, one crop)
+    if strekliste_generator.get_paths(version)['pdf_exists']:
+        try:
+            img_bytes = strekliste_generator.render_shift_image(safe_shift_nr, version)
+        except Exception:
+            logger.exception("Rendering shift image %s for %s failed", safe_shift_nr, version)
+            img_bytes = None
+        if img_bytes:
+            etag = hashlib.sha256(img_bytes).hexdigest()[:32]
+            # Short max-age: generated images replace this once they exist
+            return _cacheable_image(Response(img_bytes, mimetype='image/png'), etag, 300)
 
     return jsonify({
         'status': 'error',
@@ -1,8 +1,11 @@
 import os
 import logging
-from flask import Blueprint, send_from_directory, flash, redirect, url_for
-from flask_login import login_required
+import unicodedata
+from urllib.parse import quote
+from flask import Blueprint, Response, request, send_from_directory, flash, redirect, url_for
+from flask_login import login_required, current_user
 from config import AppConfig
+from app.utils import db_utils
 from app.utils.turnus_helpers import get_user_turnus_set
 
 logger = logging.getLogger(__name__)
@@ -55,4 +58,50 @@ def download_pdf():
         flash(f'Turnus keys ZIP file not found for {turnus_set["year_identifier"]}. The file may not have been generated yet.', 'warning')
         return redirect(url_for('shifts.turnusliste'))
     
-    return send_from_directory(directory, filename, as_attachment=True) 
\ No newline at end of file
+    return send_from_directory(directory, filename, as_attachment=True)
+
+
+@downloads.route('/download_turnusnokler')
+@login_required
+def download_turnusnokler():
+    """Turnusnøkler as one ZIP: the user's favorites, or every turnus in the set (?alle=1, admins only)."""
+    from app.utils import turnusnokkel_gen
+
+    turnus_set = get_user_turnus_set()
+    if not turnus_set:
+        flash('No turnus set found', 'danger')
+        return redirect(url_for('shifts.turnusliste'))
+
+    all_turnuser = request.args.get('alle') == '1'
+    if all_turnuser and not current_user.is_admin:
+        flash('Kun administratorer kan laste ned alle turnusnøkler.', 'danger')
+        return redirect(url_for('shifts.turnusliste'))
+
+    turnus_names = None
+    if not all_turnuser:
+        turnus_names = db_utils.get_favorite_lst(current_user.id, turnus_set['id'])
+        if not turnus_names:
+            flash('Du har ingen favoritter å lage turnusnøkler for.', 'warning')
+            return redirect(url_for('shifts.turnusliste'))
+
+    stream = turnusnokkel_gen.stream_turnusnokler_zip(turnus_set, turnus_names,
+                                                     workers=AppConfig.TURNUSNOKKEL_WORKERS)
+    try:
+        # The first chunk comes after the template and turnus data are loaded
+        first_chunk = next(stream)
+    except FileNotFoundError as e:
+        logger.warning("Turnusnøkkel download for %s: %s", turnus_set['year_identifier'], e)
+        flash(f'Turnusnøkkel template not found for {turnus_set["year_identifier"]}.', 'warning')
+        return redirect(url_for('shifts.turnusliste'))
+
+    def generate():
+        # yield from passes close() on to the export, which then stops its workers
+        yield first_chunk
+        yield from stream
+
+    filename = turnusnokkel_gen.zip_filename(turnus_set, favorites=not all_turnuser)
+    ascii_filename = unicodedata.normalize('NFKD', filename.replace('ø', 'o')).encode('ascii', 'ignore').decode('ascii')
+    response = Response(generate(), mimetype='application/zip')
+    response.headers.set('Content-Disposition', 'attachment', filename=ascii_filename,
+                         **{'filename*': f"UTF-8''{quote(filename)}"})
+    return response
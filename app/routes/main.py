@@ -7,7 +7,13 @@ from config import AppConfig
 from app.utils import df_utils
 
 # Global variables that need to be shared across Blueprints
-df_manager = df_utils.DataframeManager()
+# Loaded on first access or by warmup(), not at import time
+df_manager = df_utils.DataframeManager(lazy=True)
+
+
+def warmup():
+    """Load the active turnus set and import the data libraries ahead of the first request."""
+    df_manager.load_turnus_set()
 
 # Configure logging
 os.makedirs(AppConfig.log_dir, exist_ok=True)
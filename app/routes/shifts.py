@@ -39,17 +39,22 @@ def turnusliste():
     # Create a position lookup dictionary for robust favorite numbering
     favorite_positions = {name: idx + 1 for idx, name in enumerate(favoritt)}
     
-    # Load data for user's selected year
-    user_df_manager = df_utils.DataframeManager(turnus_set_id)
-    
     # Get turnus parameter for highlighting specific turnus
     highlighted_turnus = request.args.get('turnus')
 
+    # The turnuser themselves are fetched by the page from /api/turnus-data (see turnus_pages)
+    from app.utils import turnus_pages
+    turnusliste_config = {
+        'turnus_set_id': turnus_set_id,
+        'page_size': turnus_pages.PAGE_SIZE,
+        'max_names': turnus_pages.MAX_NAMES,
+        'favorite_positions': favorite_positions,
+        'highlighted_turnus': highlighted_turnus,
+    }
 
     return render_template('turnusliste.html', 
                         page_name='Turnusliste',
-                        table_data=user_df_manager.turnus_data,  
-                        df=user_df_manager.df.to_dict(orient='records') if not user_df_manager.df.empty else [], 
+                        turnusliste_config=turnusliste_config,
                         favoritt=favoritt,
                         favorite_positions=favorite_positions,
                         current_turnus_set=user_turnus_set,
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Excel Export Benchmark
+
+Compares wall time and peak RSS of the turnus Excel export:
+    legacy  - one pandas DataFrame per turnus written with pd.ExcelWriter,
+              formats created per sheet and one conditional format per cell
+    current - TurnusExcelWriter (xlsxwriter constant_memory, shared formats,
+              rows written straight from the turnus structures)
+
+Each variant runs in a fresh interpreter so peak RSS is not shared between them.
+
+USAGE:
+    python app/scripts/benchmark_excel_export.py                 # r26
+    python app/scripts/benchmark_excel_export.py --year R25
+    python app/scripts/benchmark_excel_export.py --scale 20      # 20x the turnuser, to show growth
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import subprocess
+import tempfile
+
+# Add project root to path (go up 3 levels: scripts -> app -> project_root)
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+from config import AppConfig
+
+VARIANTS = ['legacy', 'current']
+
+
+def load_turnuser(year_id, scale):
+    json_path = os.path.join(AppConfig.turnusfiler_dir, year_id.lower(), f'turnuser_{year_id}.json')
+    with open(json_path, 'r') as f:
+        turnuser = json.load(f)
+    if scale <= 1:
+        return turnuser
+    # Sheet names must be unique and at most 31 characters
+    return [{f'{navn[:26]}~{i}': verdi for navn, verdi in turnus.items()}
+            for i in range(scale) for turnus in turnuser]
+
+
+def export_legacy(turnuser, output_path):
+    """The DataFrame-based export ShiftScraper.create_excel used before TurnusExcelWriter."""
+    import pandas as pd
+    import xlsxwriter
+
+    df_dict = {}
+    for turnus in turnuser:
+        for turnus_navn, turnus_verdi in turnus.items():
+            df_data = {'Uke': [1, 2, 3, 4, 5, 6],
+                       'Mandag': [], 'Tirsdag': [], 'Onsdag': [], 'Torsdag': [],
+                       'Fredag': [], 'Lørdag': [], 'Søndag': []}
+            for uke in turnus_verdi.values():
+                for dag in uke.values():
+                    if len(dag['tid']) == 0:
+                        df_data[dag['ukedag']].append('')
+                    else:
+                        df_data[dag['ukedag']].append(" - ".join(dag['tid']) + " " + dag['dagsverk'])
+            df_dict[turnus_navn] = pd.DataFrame(df_data)
+
+    color_formats = {
+        'hdag': {'bg_color': '#dbcc27'}, 'tidlig': {'bg_color': '#7abfff'},
+        'tidlig_kveld': {'bg_color': '#d68f6d'}, 'kveld': {'bg_color': '#fa7f7f'},
+        'natt': {'bg_color': '#c34fe3'}, 'turnusfri': {'bg_color': '#13bd57'},
+        'skjult_fridag': {'bg_color': '#cc9fe3', 'border': 2, 'border_color': '#c34fe3'},
+    }
+
+    with pd.ExcelWriter(output_path, engine='xlsxwriter') as writer:
+        for sheet_name, df in df_dict.items():
+            df.to_excel(writer, sheet_name=sheet_name, index=False)
+            workbook = writer.book
+            worksheet = writer.sheets[sheet_name]
+            formats = {name: workbook.add_format({**props, 'font_color': '#000000'})
+                       for name, props in color_formats.items()}
+            centered_format = workbook.add_format({'align': 'center', 'valign': 'vcenter',
+                                                   'border': 1, 'text_wrap': True})
+            worksheet.set_column('B:H', 12)
+            worksheet.set_column('A:A', 4)
+            for row in range(1, 7):
+                worksheet.set_row(row, 40)
+            for row in range(6):
+                for col, column_label in enumerate(df.columns):
+                    worksheet.write(row + 1, col, df.at[row, column_label], centered_format)
+
+            for col in range(1, 8):
+                for row in range(1, 7):
+                    cell = xlsxwriter.utility.xl_rowcol_to_cell(row, col)
+                    time_start = 'VALUE(LEFT(' + cell + ',SEARCH(":",' + cell + ')-1))'
+                    time_end = 'VALUE(MID(' + cell + ', SEARCH(":", ' + cell + ', SEARCH(":", ' + cell + ')+1)-2, 2))'
+                    rules = [
+                        ('=RIGHT(' + cell + ', 1)="H"', 'hdag'),
+                        (f'=({time_start}>=3)AND ({time_start} < 16)AND ({time_end} < 16)AND ({time_end} > 3)', 'tidlig'),
+                        (f'=({time_start}>=3)AND ({time_start} <= 8)AND ({time_end} >= 16)', 'tidlig_kveld'),
+                        (f'=({time_start}>=9)AND ({time_start}<=18)', 'kveld'),
+                        (f'=({time_start}>=18)AND ({time_start}<=23)', 'natt'),
+                        ('=(' + cell + '="")', 'skjult_fridag'),
+                        ('=(' + cell + '="XX ")OR (' + cell + '="OO ")OR (' + cell + '="TT ")', 'turnusfri'),
+                    ]
+                    for criteria, name in rules:
+                        worksheet.conditional_format(cell, {'type': 'formula', 'criteria': criteria,
+                                                            'format': formats[name]})
+
+
+def export_current(turnuser, output_path):
+    from app.utils.pdf.shiftscraper import TurnusExcelWriter
+
+    with TurnusExcelWriter(output_path) as writer:
+        for turnus in turnuser:
+            writer.write(turnus)
+
+
+def run_variant(variant, year_id, scale):
+    """Run one export in this process and print its measurements as JSON."""
+    turnuser = load_turnuser(year_id, scale)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        output_path = os.path.join(tmp_dir, f'{variant}.xlsx')
+        start = time.perf_counter()
+        if variant == 'legacy':
+            export_legacy(turnuser, output_path)
+        else:
+            export_current(turnuser, output_path)
+        wall = time.perf_counter() - start
+        size = os.path.getsize(output_path)
+
+    print(json.dumps({
+        'variant': variant,
+        'turnuser': len(turnuser),
+        'wall_s': wall,
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'rss_before_mb': rss_before / 1024,
+        'file_kb': size / 1024,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the turnus Excel export')
+    parser.add_argument('--year', default='R26', help='Year identifier (default: R26)')
+    parser.add_argument('--scale', type=int, default=1, help='Repeat the turnuser N times (default: 1)')
+    parser.add_argument('--runs', type=int, default=3, help='Runs per variant, best wall time is reported (default: 3)')
+    parser.add_argument('--run-variant', choices=VARIANTS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    year_id = args.year.upper()
+
+    if args.run_variant:
+        run_variant(args.run_variant, year_id, args.scale)
+        return
+
+    results = {}
+    for variant in VARIANTS:
+        runs = []
+        for _ in range(args.runs):
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--year', year_id,
+                 '--scale', str(args.scale), '--run-variant', variant],
+                cwd=project_root, capture_output=True, text=True, check=True,
+            ).stdout
+            runs.append(json.loads(output.strip().splitlines()[-1]))
+        results[variant] = {
+            'turnuser': runs[0]['turnuser'],
+            'wall_s': min(r['wall_s'] for r in runs),
+            'peak_rss_mb': max(r['peak_rss_mb'] for r in runs),
+            'export_rss_mb': max(r['peak_rss_mb'] - r['rss_before_mb'] for r in runs),
+            'file_kb': runs[0]['file_kb'],
+        }
+
+    print(f"\n{'=' * 70}")
+    print(f"Excel export benchmark: {year_id}, {results['current']['turnuser']} turnuser (best of {args.runs})")
+    print(f"{'=' * 70}")
+    print(f"{'Variant':<10} {'Wall ms':>10} {'Peak RSS MB':>12} {'Export RSS MB':>14} {'File KB':>10}")
+    for variant, r in results.items():
+        print(f"{variant:<10} {r['wall_s'] * 1000:>10.0f} {r['peak_rss_mb']:>12.1f} "
+              f"{r['export_rss_mb']:>14.1f} {r['file_kb']:>10.1f}")
+
+    legacy, current = results['legacy'], results['current']
+    print(f"\nSpeedup: {legacy['wall_s'] / current['wall_s']:.1f}x, "
+          f"export memory: {legacy['export_rss_mb']:.1f} MB -> {current['export_rss_mb']:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Startup Time Benchmark
+
+Reports how long it takes to import the app and which modules the time goes to.
+Runs the import in a fresh interpreter with ``python -X importtime`` so results
+are not affected by modules already loaded in this process.
+
+USAGE:
+    python app/scripts/benchmark_startup.py
+    python app/scripts/benchmark_startup.py --target app.routes.main --top 30
+    python app/scripts/benchmark_startup.py --create-app
+
+OUTPUT:
+    - Total wall time for the import
+    - Cumulative import time for the app's own modules
+    - Which heavy libraries (pandas, numpy, pdfplumber, ...) were pulled in at startup
+    - The slowest top-level imports
+"""
+
+import sys
+import os
+import time
+import argparse
+import subprocess
+
+# Add project root to path (go up 3 levels: scripts -> app -> project_root)
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+# Libraries that should only be imported on first use
+HEAVY_MODULES = ['pandas', 'numpy', 'openpyxl', 'pdfplumber', 'xlsxwriter', 'fitz', 'PIL']
+
+
+def run_importtime(code):
+    """Run code in a fresh interpreter and return (wall_seconds, importtime_rows)."""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=project_root,
+        capture_output=True,
+        text=True,
+    )
+    wall = time.perf_counter() - start
+
+    if result.returncode != 0:
+        print(result.stderr[-2000:])
+        raise SystemExit(f"Import failed with exit code {result.returncode}")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        # Format: "import time:  self [us] | cumulative | imported package"
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3:
+            continue
+        name = parts[2].rstrip()
+        rows.append({
+            'self_us': int(parts[0].strip()),
+            'cumulative_us': int(parts[1].strip()),
+            'module': name.strip(),
+            'depth': (len(name) - len(name.lstrip())) // 2,
+        })
+    return wall, rows
+
+
+def print_report(target, wall, rows, top):
+    print(f"\n{'=' * 70}")
+    print(f"Startup benchmark: {target}")
+    print(f"{'=' * 70}")
+    print(f"Wall time (including interpreter start): {wall * 1000:.0f} ms")
+    print(f"Modules imported: {len(rows)}")
+
+    app_rows = [r for r in rows if r['module'] == 'app' or r['module'].startswith('app.') or r['module'] == 'config']
+    print(f"\nApp modules (cumulative ms):")
+    for r in sorted(app_rows, key=lambda r: r['cumulative_us'], reverse=True):
+        print(f"  {r['cumulative_us'] / 1000:8.1f}  {r['module']}")
+
+    loaded = {r['module']: r for r in rows}
+    print(f"\nHeavy libraries:")
+    for name in HEAVY_MODULES:
+        if name in loaded:
+            print(f"  {name:12} LOADED   {loaded[name]['cumulative_us'] / 1000:8.1f} ms")
+        else:
+            print(f"  {name:12} deferred")
+
+    top_level = [r for r in rows if r['depth'] == 0]
+    print(f"\nSlowest top-level imports:")
+    for r in sorted(top_level, key=lambda r: r['cumulative_us'], reverse=True)[:top]:
+        print(f"  {r['cumulative_us'] / 1000:8.1f}  {r['module']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Report import time per module for app startup')
+    parser.add_argument('--target', default='app.routes.main', help='Module to import (default: app.routes.main)')
+    parser.add_argument('--create-app', action='store_true', help='Also call create_app() after importing')
+    parser.add_argument('--top', type=int, default=20, help='Number of slowest top-level imports to show')
+    args = parser.parse_args()
+
+    if args.create_app:
+        target = 'app.create_app()'
+        code = 'from app import create_app; create_app()'
+    else:
+        target = args.target
+        code = f'import {args.target}'
+
+    wall, rows = run_importtime(code)
+    print_report(target, wall, rows, args.top)
+
+
+if __name__ == "__main__":
+    main()
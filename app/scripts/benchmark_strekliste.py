@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Strekliste Page Benchmark
+
+Times the per-page work of strekliste image generation on one full page of a
+year's strekliste PDF, for the steps that only depend on the rendered page:
+    separators - finding the separator lines: the Python loop over dark rows
+                 used before, against the NumPy run-length grouping
+    rulers     - the hour ruler for every row on the page: drawn per row as
+                 before, against the memoized ruler
+    page       - cropping every row on the page and putting the ruler on top,
+                 with both of the above (the page is rendered once, outside the timing)
+
+USAGE:
+    python app/scripts/benchmark_strekliste.py                  # r26, first page
+    python app/scripts/benchmark_strekliste.py --year R25 --page 3
+    python app/scripts/benchmark_strekliste.py --runs 50
+"""
+
+import os
+import sys
+import time
+import argparse
+
+# Add project root to path (go up 3 levels: scripts -> app -> project_root)
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+from app.utils.pdf import strekliste_generator
+
+
+def find_separator_lines_legacy(arr, min_thickness=2, max_brightness=100):
+    """find_separator_lines before the NumPy grouping: one Python iteration per dark row."""
+    import numpy as np
+
+    row_brightness = np.mean(arr, axis=1)
+    dark_rows = np.where(row_brightness < 180)[0]
+    if len(dark_rows) == 0:
+        return []
+
+    lines = []
+    start = prev = dark_rows[0]
+    for row in list(dark_rows[1:]) + [None]:
+        if row is None or row - prev > 3:
+            if prev - start + 1 >= min_thickness and np.min(row_brightness[start:prev + 1]) < max_brightness:
+                lines.append(int((start + prev) // 2))
+            start = row
+        prev = row
+    return lines
+
+
+def crop_page_rows(page_img, separator_lines, shifts, create_ruler):
+    from PIL import Image
+
+    for shift in shifts:
+        crop_box = strekliste_generator.get_crop_box(page_img.width, page_img.height, separator_lines,
+                                                     shift['visual_y'])
+        cropped = page_img.crop(crop_box)
+        ruler = create_ruler(cropped.width, zoom=strekliste_generator.PDF_ZOOM)
+        combined = Image.new('RGB', (cropped.width, cropped.height + ruler.height), 'white')
+        combined.paste(ruler, (0, 0))
+        combined.paste(cropped, (0, ruler.height))
+
+
+def best_of(runs, func):
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark per-page strekliste image work')
+    parser.add_argument('--year', default='R26', help='Year identifier (default: R26)')
+    parser.add_argument('--page', type=int, default=1, help='Page number, 1-based (default: 1)')
+    parser.add_argument('--runs', type=int, default=20, help='Runs per measurement, best time is reported (default: 20)')
+    args = parser.parse_args()
+
+    if not strekliste_generator.FITZ_AVAILABLE or not strekliste_generator.PIL_AVAILABLE:
+        sys.exit("PyMuPDF (fitz), Pillow and NumPy are required")
+    import fitz
+
+    paths = strekliste_generator.get_paths(args.year)
+    if not paths['pdf_exists']:
+        sys.exit(f"No strekliste PDF: {paths['pdf_path']}")
+
+    doc = fitz.open(paths['pdf_path'])
+    if not 1 <= args.page <= len(doc):
+        sys.exit(f"Page must be between 1 and {len(doc)}")
+    page = doc[args.page - 1]
+    shifts = strekliste_generator.get_shift_rows(page)
+    page_img, separator_lines, _pix = strekliste_generator._render_page(page)
+    gray = strekliste_generator.grayscale_array(page_img)
+
+    legacy_lines = find_separator_lines_legacy(gray)
+    if legacy_lines != separator_lines:
+        sys.exit(f"Separator lines differ: legacy {legacy_lines}, current {separator_lines}")
+
+    uncached_ruler = strekliste_generator.create_hour_ruler.__wrapped__
+    cached_ruler = strekliste_generator.create_hour_ruler
+    width = page_img.width - int(22 * strekliste_generator.PDF_ZOOM) - int(271 * strekliste_generator.PDF_ZOOM)
+    zoom = strekliste_generator.PDF_ZOOM
+
+    results = [
+        ('separators', best_of(args.runs, lambda: find_separator_lines_legacy(gray)),
+         best_of(args.runs, lambda: strekliste_generator.find_separator_lines(gray))),
+        ('rulers', best_of(args.runs, lambda: [uncached_ruler(width, zoom=zoom) for _ in shifts]),
+         best_of(args.runs, lambda: [cached_ruler(width, zoom=zoom) for _ in shifts])),
+        ('page', best_of(args.runs, lambda: (find_separator_lines_legacy(gray),
+                                             crop_page_rows(page_img, separator_lines, shifts, uncached_ruler))),
+         best_of(args.runs, lambda: (strekliste_generator.find_separator_lines(gray),
+                                     crop_page_rows(page_img, separator_lines, shifts, cached_ruler)))),
+    ]
+    doc.close()
+
+    print(f"\n{'=' * 60}")
+    print(f"Strekliste page benchmark: {args.year.upper()} page {args.page}, "
+          f"{page_img.width}x{page_img.height} px, {len(shifts)} rows, "
+          f"{len(separator_lines)} separator lines (best of {args.runs})")
+    print(f"{'=' * 60}")
+    print(f"{'Step':<12} {'Before ms':>10} {'After ms':>10} {'Speedup':>9}")
+    for name, before, after in results:
+        print(f"{name:<12} {before * 1000:>10.2f} {after * 1000:>10.2f} {before / after:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
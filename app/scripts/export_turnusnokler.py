@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Turnusnøkkel ZIP Export
+
+Writes the turnusnøkler of a turnus year to one ZIP archive: every turnus in
+the set, or one user's favorites. Files are rendered in a process pool and
+written to the archive as they finish; files already in the artifact cache
+are copied from it.
+
+USAGE:
+    python app/scripts/export_turnusnokler.py R26                       # All turnuser
+    python app/scripts/export_turnusnokler.py R26 --user ola            # Favorites of user 'ola'
+    python app/scripts/export_turnusnokler.py R26 --workers 4 --output /tmp/r26.zip
+"""
+
+import os
+import sys
+import time
+import argparse
+
+# Add project root to path (go up 3 levels: scripts -> app -> project_root)
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+from app.utils import db_utils, turnusnokkel_gen
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export the turnusnøkler of a turnus year as a ZIP archive')
+    parser.add_argument('year_id', help='Year identifier (e.g. R26)')
+    parser.add_argument('--user', help='Only the favorites of this username')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Processes rendering files (default: CPU count)')
+    parser.add_argument('--output', help='ZIP path (default: the archive name in the current directory)')
+    args = parser.parse_args()
+
+    year_id = args.year_id.upper()
+    turnus_set = db_utils.get_turnus_set_by_year(year_id)
+    if not turnus_set:
+        sys.exit(f"No turnus set for {year_id}")
+
+    turnus_names = None
+    if args.user:
+        user = db_utils.get_user_by_username(args.user)
+        if not user:
+            sys.exit(f"No user named {args.user}")
+        turnus_names = db_utils.get_favorite_lst(user['id'], turnus_set['id'])
+        if not turnus_names:
+            sys.exit(f"{args.user} has no favorites in {year_id}")
+
+    output = args.output or turnusnokkel_gen.zip_filename(turnus_set, favorites=bool(args.user))
+    report = {}
+    start = time.perf_counter()
+    try:
+        with open(output, 'wb') as f:
+            for chunk in turnusnokkel_gen.stream_turnusnokler_zip(turnus_set, turnus_names,
+                                                                 workers=args.workers, report=report):
+                f.write(chunk)
+    except FileNotFoundError as e:
+        if os.path.exists(output):
+            os.remove(output)
+        sys.exit(str(e))
+    elapsed = time.perf_counter() - start
+
+    print(f"{output}: {report['files']} files ({report['cached']} from cache) "
+          f"in {elapsed:.1f}s with {args.workers} worker(s)")
+    for turnus_name in report['missing']:
+        print(f"  Not in {year_id}: {turnus_name}")
+    for error in report['errors']:
+        print(f"  Failed: {error['turnus']}: {error['error']}")
+    if report['errors']:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Import Turnus Year
+
+Runs every step of setting up a turnus year as one pipeline, instead of
+shiftscraper.py, shift_stats.py, create_new_turnus_year_in_database.py,
+double_shift_scanner.py and strekliste image generation one by one:
+
+    turnuser_<YEAR>.pdf      -> scrape (JSON + Excel) -> stats -> database shifts
+    streklister/<year>_streker.pdf -> page model -> double shifts
+                                                  -> shift images
+                                                  -> shift index
+
+Independent stages run concurrently. Each stage's outputs are cached by the
+hash of its inputs, so running it again only redoes what changed. Stages whose
+PDF is missing are skipped. The same pipeline runs from the admin panel as a
+background job.
+
+USAGE:
+    python app/scripts/import_year.py R26 --name "OSL Train Shifts 2026"
+    python app/scripts/import_year.py R26 --force              # Ignore cached stage outputs
+    python app/scripts/import_year.py R26 --only double_shifts shift_index
+"""
+
+import os
+import sys
+import argparse
+
+# Add project root to path (go up 3 levels: scripts -> app -> project_root)
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+from app.services.import_service import build_import_pipeline
+from app.utils.db_utils import create_tables
+from app.utils.pipeline import format_report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the full import pipeline for a turnus year')
+    parser.add_argument('year_id', help='Year identifier (e.g., R26)')
+    parser.add_argument('--name', help='Turnus set name, used if the set does not exist yet (default: year_id)')
+    parser.add_argument('--active', action='store_true', help='Make a newly created set active')
+    parser.add_argument('--force', action='store_true', help='Run every stage even if its inputs are unchanged')
+    parser.add_argument('--only', nargs='+', metavar='STAGE', help='Only run these stages')
+    parser.add_argument('--workers', type=int, help='Stages run at the same time (default: all independent stages)')
+    args = parser.parse_args()
+
+    year_id = args.year_id.upper()
+    create_tables()
+
+    pipeline = build_import_pipeline(year_id, name=args.name, is_active=args.active)
+    if args.only:
+        unknown = set(args.only) - set(pipeline.stages)
+        if unknown:
+            parser.error(f"Unknown stage(s): {', '.join(sorted(unknown))}. Stages: {', '.join(pipeline.order())}")
+
+    last_label = [None]
+
+    def progress(current, total, label):
+        stage = label.split(':')[0]
+        if stage != last_label[0]:
+            print(f"  [{current:.1f}/{total}] {label}")
+            last_label[0] = stage
+
+    print(f"Importing {year_id}: {', '.join(pipeline.order())}")
+    report = pipeline.run(workers=args.workers, force=args.force, only=args.only, progress_callback=progress)
+
+    print()
+    for line in format_report(pipeline, report):
+        print(line)
+
+    if not report['success']:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Worker Memory Measurement
+
+Reports resident memory for a gunicorn master and its workers, split into
+shared and private pages, so the effect of ``preload_app`` can be checked.
+Reads /proc/<pid>/smaps_rollup, so it only works on Linux.
+
+USAGE:
+    python app/scripts/measure_worker_memory.py                  # pid from gunicorn.conf.py pidfile
+    python app/scripts/measure_worker_memory.py --pid 12345
+    python app/scripts/measure_worker_memory.py --pidfile /tmp/app.pid
+
+COLUMNS:
+    RSS      - resident set size (counts shared pages in every process)
+    PSS      - proportional set size (shared pages divided between sharers)
+    Shared   - pages shared with other processes (e.g. preloaded data)
+    Private  - pages only this process uses (the real per-worker cost)
+"""
+
+import os
+import sys
+import argparse
+
+DEFAULT_PIDFILE = os.environ.get('GUNICORN_PIDFILE', '/tmp/shift_rotation_organizer.pid')
+
+
+def read_smaps_rollup(pid):
+    """Return memory stats in kB for a process."""
+    stats = {}
+    with open(f'/proc/{pid}/smaps_rollup', 'r') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(':') and parts[1].isdigit():
+                stats[parts[0][:-1]] = int(parts[1])
+    return {
+        'rss': stats.get('Rss', 0),
+        'pss': stats.get('Pss', 0),
+        'shared': stats.get('Shared_Clean', 0) + stats.get('Shared_Dirty', 0),
+        'private': stats.get('Private_Clean', 0) + stats.get('Private_Dirty', 0),
+    }
+
+
+def get_children(pid):
+    """Return child pids of a process."""
+    children = []
+    task_dir = f'/proc/{pid}/task'
+    for tid in os.listdir(task_dir):
+        try:
+            with open(os.path.join(task_dir, tid, 'children'), 'r') as f:
+                children.extend(int(c) for c in f.read().split())
+        except OSError:
+            continue
+    return sorted(set(children))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure resident memory of gunicorn master and workers')
+    parser.add_argument('--pid', type=int, help='Gunicorn master pid')
+    parser.add_argument('--pidfile', default=DEFAULT_PIDFILE, help=f'Gunicorn pidfile (default: {DEFAULT_PIDFILE})')
+    args = parser.parse_args()
+
+    master_pid = args.pid
+    if master_pid is None:
+        if not os.path.exists(args.pidfile):
+            print(f"✗ Pidfile not found: {args.pidfile}. Use --pid.")
+            sys.exit(1)
+        with open(args.pidfile, 'r') as f:
+            master_pid = int(f.read().strip())
+
+    workers = get_children(master_pid)
+    rows = [('master', master_pid, read_smaps_rollup(master_pid))]
+    rows += [(f'worker {i + 1}', pid, read_smaps_rollup(pid)) for i, pid in enumerate(workers)]
+
+    print(f"{'Process':<10} {'PID':>8} {'RSS MB':>9} {'PSS MB':>9} {'Shared MB':>10} {'Private MB':>11}")
+    for name, pid, m in rows:
+        print(f"{name:<10} {pid:>8} {m['rss'] / 1024:>9.1f} {m['pss'] / 1024:>9.1f} "
+              f"{m['shared'] / 1024:>10.1f} {m['private'] / 1024:>11.1f}")
+
+    if workers:
+        worker_stats = [m for name, _, m in rows[1:]]
+        avg_private = sum(m['private'] for m in worker_stats) / len(worker_stats)
+        avg_rss = sum(m['rss'] for m in worker_stats) / len(worker_stats)
+        total_pss = sum(m['pss'] for _, _, m in rows)
+        print(f"\nWorkers: {len(workers)}")
+        print(f"Average worker RSS:     {avg_rss / 1024:.1f} MB")
+        print(f"Average worker private: {avg_private / 1024:.1f} MB")
+        print(f"Total PSS (all procs):  {total_pss / 1024:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
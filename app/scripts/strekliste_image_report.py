@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Strekliste Image Size Report
+
+Shows, per turnus year, the total size of the original strekliste PNGs and of
+each compact variant (palette PNG and WebP at thumb/screen/print width) that
+generate_all_images writes, and how many bytes each variant saves.
+
+USAGE:
+    python app/scripts/strekliste_image_report.py           # All years with images
+    python app/scripts/strekliste_image_report.py r26
+"""
+
+import os
+import sys
+import argparse
+
+# Add project root to path (go up 3 levels: scripts -> app -> project_root)
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+from config import AppConfig
+from app.utils.pdf import strekliste_generator
+
+
+def format_bytes(value):
+    return f'{value / 1024 / 1024:.2f} MB' if value >= 1024 * 1024 else f'{value / 1024:.1f} KB'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Report byte savings of the strekliste image variants')
+    parser.add_argument('versions', nargs='*', help='Versions (e.g. r26). Default: every year in turnusfiler')
+    args = parser.parse_args()
+
+    versions = [v.lower() for v in args.versions] or sorted(
+        d for d in os.listdir(AppConfig.turnusfiler_dir)
+        if os.path.isdir(os.path.join(AppConfig.turnusfiler_dir, d)))
+
+    found = False
+    for version in versions:
+        report = strekliste_generator.image_size_report(version)
+        if report is None:
+            if args.versions:
+                print(f"{version.upper()}: no generated images")
+            continue
+        found = True
+
+        print(f"\n{version.upper()}: {report['images']} images, originals {format_bytes(report['original_bytes'])}")
+        print(f"  {'Variant':<14} {'Images':>7} {'Size':>12} {'Saved':>12} {'Saved %':>8}")
+        for name, variant in report['variants'].items():
+            print(f"  {name:<14} {variant['count']:>7} {format_bytes(variant['bytes']):>12} "
+                  f"{format_bytes(variant['saved_bytes']):>12} {variant['saved_percent']:>7.1f}%")
+
+    if not found and not args.versions:
+        print("No generated strekliste images found")
+
+
+if __name__ == "__main__":
+    main()
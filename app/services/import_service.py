@@ -0,0 +1,344 @@
+"""Turnus import tasks run as background jobs (see app.utils.jobs).
+
+Each task takes a JobContext as first argument and returns a JSON-serializable
+result with 'success' and 'messages', a list of [category, text] pairs shown
+in the admin UI the same way flash messages are.
+"""
+
+import os
+import logging
+
+from config import AppConfig
+from app.services.turnus_service import (
+    create_turnus_set, get_turnus_set_by_year, get_turnus_set_by_id, get_active_turnus_set,
+    add_shifts_to_turnus_set, refresh_turnus_set_shifts, update_turnus_set_paths,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _turnusfiler_dir(year_id):
+    return os.path.join(AppConfig.static_dir, 'turnusfiler', year_id.lower())
+
+
+def _reload_if_active(turnus_set_id):
+    active_set = get_active_turnus_set()
+    if active_set and active_set['id'] == turnus_set_id:
+        from app.routes.main import df_manager
+        df_manager.reload_active_set()
+
+
+def import_turnus_set(ctx, name, year_id, is_active=False, pdf_path=None):
+    """
+    Create a turnus set. Scrapes pdf_path if given, otherwise uses the existing
+    turnuser JSON in turnusfiler. Statistics are generated if missing.
+    """
+    from app.utils.pdf.shiftscraper import scrape_to_turnusfiler
+    from app.utils.shift_stats import Turnus
+
+    messages = []
+    turnusfiler_dir = _turnusfiler_dir(year_id)
+    turnus_json_path = os.path.join(turnusfiler_dir, f'turnuser_{year_id}.json')
+    df_json_path = os.path.join(turnusfiler_dir, f'turnus_df_{year_id}.json')
+
+    if pdf_path:
+        # Statistics are computed from the stream while scraping
+        ctx.set_message('Skraper PDF')
+        stats = Turnus()
+        try:
+            result = scrape_to_turnusfiler(pdf_path, year_id, workers=AppConfig.SCRAPER_WORKERS,
+                                           on_turnus=[stats.add_turnus], progress_callback=ctx.progress)
+        except Exception as e:
+            logger.exception("Scraping %s failed", pdf_path)
+            return {'success': False, 'messages': [['danger', f'Feil ved skraping av PDF: {e}']]}
+        turnus_json_path = result['json_path']
+
+        if result['from_cache']:
+            messages.append(['success', 'PDF er skrapet tidligere. JSON- og Excel-filer hentet fra cache.'])
+            df_json_path = None  # Generated below
+        else:
+            stats.finish().to_json(df_json_path)
+            messages.append(['success', 'PDF skrapet! JSON- og Excel-filer opprettet.'])
+
+    elif not os.path.exists(turnus_json_path):
+        return {'success': False, 'messages': [['danger', f'Turnus JSON-fil ikke funnet: {turnus_json_path}']]}
+
+    # Generate statistics if missing
+    if not df_json_path or not os.path.exists(df_json_path):
+        ctx.set_message('Genererer statistikk')
+        try:
+            df_json_path = os.path.join(turnusfiler_dir, f'turnus_df_{year_id}.json')
+            Turnus(turnus_json_path).stats_df.to_json(df_json_path)
+            messages.append(['info', 'Statistikk-JSON generert automatisk.'])
+        except Exception as e:
+            logger.exception("Generating statistics for %s failed", year_id)
+            messages.append(['danger', f'Feil ved generering av statistikk: {e}'])
+            return {'success': False, 'messages': messages}
+
+    # Create turnus set in database
+    ctx.set_message('Oppretter turnussett')
+    success, message = create_turnus_set(
+        name=name,
+        year_identifier=year_id,
+        is_active=is_active,
+        turnus_file_path=turnus_json_path,
+        df_file_path=df_json_path
+    )
+    if not success:
+        messages.append(['danger', message])
+        return {'success': False, 'messages': messages}
+
+    # Add shifts to database
+    turnus_set = get_turnus_set_by_year(year_id)
+    if turnus_set:
+        add_shifts_to_turnus_set(turnus_json_path, turnus_set['id'])
+        messages.append(['success', f'Turnussett {year_id} opprettet!'])
+        if is_active:
+            _reload_if_active(turnus_set['id'])
+    else:
+        messages.append(['warning', 'Turnussett opprettet, men vakter ikke lagt til.'])
+
+    return {'success': True, 'messages': messages, 'turnus_set_id': turnus_set['id'] if turnus_set else None}
+
+
+def refresh_turnus_set(ctx, turnus_set_id):
+    """Re-scrape the PDF and update shift names in the database, preserving favorites."""
+    from app.utils.pdf.shiftscraper import scrape_to_turnusfiler
+    from app.utils.shift_stats import Turnus
+
+    turnus_set = get_turnus_set_by_id(turnus_set_id)
+    if not turnus_set:
+        return {'success': False, 'messages': [['danger', 'Turnussett ikke funnet.']]}
+
+    year_id = turnus_set['year_identifier']
+    turnusfiler_dir = _turnusfiler_dir(year_id)
+    pdf_path = os.path.join(turnusfiler_dir, f'turnuser_{year_id}.pdf')
+    if not os.path.exists(pdf_path):
+        return {'success': False, 'messages': [['danger', f'PDF ikke funnet: {pdf_path}']]}
+
+    # Re-scrape the PDF. Unchanged pages are reused from the previous JSON,
+    # and an unchanged PDF is reused from cache
+    ctx.set_message('Skraper PDF')
+    stats = Turnus()
+    result = scrape_to_turnusfiler(pdf_path, year_id, workers=AppConfig.SCRAPER_WORKERS,
+                                   incremental=True, on_turnus=[stats.add_turnus],
+                                   progress_callback=ctx.progress)
+    turnus_json_path = result['json_path']
+    changes = result['changes']
+
+    # Regenerate statistics JSON (streamed while scraping, or from the cached JSON)
+    ctx.set_message('Oppdaterer statistikk og vakter')
+    if result['from_cache']:
+        stats = Turnus(turnus_json_path)
+    else:
+        stats.finish()
+    df_json_path = os.path.join(turnusfiler_dir, f'turnus_df_{year_id}.json')
+    stats.stats_df.to_json(df_json_path)
+
+    # Update shift names in DB (preserving favorites) and file paths
+    summary = refresh_turnus_set_shifts(turnus_set_id, turnus_json_path)
+    update_turnus_set_paths(turnus_set_id, turnus_json_path, df_json_path)
+    _reload_if_active(turnus_set_id)
+
+    # Build summary messages
+    messages = []
+    parts = []
+    if summary['renamed']:
+        parts.append(f"{len(summary['renamed'])} omdøpt")
+    if summary['added']:
+        parts.append(f"{len(summary['added'])} nye")
+    if summary['removed']:
+        parts.append(f"{len(summary['removed'])} fjernet")
+    parts.append(f"{len(summary['unchanged'])} uendret")
+    messages.append(['success', f"Turnussett {year_id} oppdatert: {', '.join(parts)}."])
+
+    if summary['renamed']:
+        renamed_details = '; '.join(f"{r['old']} → {r['new']}" for r in summary['renamed'][:10])
+        if len(summary['renamed']) > 10:
+            renamed_details += f' ... og {len(summary["renamed"]) - 10} til'
+        messages.append(['info', f"Omdøpte vakter: {renamed_details}"])
+
+    if changes:
+        if changes['reprocessed_pages'] is not None:
+            pages = changes['reprocessed_pages']
+            text = f"Sider skrapet på nytt: {len(pages)} av {changes['page_count']}"
+            if pages:
+                text += f" ({', '.join(map(str, pages[:20]))})"
+            messages.append(['info', text])
+        affected = changes['changed'] + changes['added'] + changes['removed']
+        if affected:
+            details = ', '.join(affected[:20])
+            if len(affected) > 20:
+                details += f' ... og {len(affected) - 20} til'
+            messages.append(['info', f"Berørte turnuser ({len(changes['changed'])} endret, {len(changes['added'])} nye, "
+                                     f"{len(changes['removed'])} fjernet): {details}"])
+        else:
+            messages.append(['info', 'Ingen turnuser endret.'])
+
+    return {'success': True, 'messages': messages, 'changes': changes}
+
+
+def generate_strekliste_images(ctx, version, force=False):
+    """Generate PNG images from the strekliste PDF, reporting progress per shift."""
+    from app.utils.pdf import strekliste_generator
+
+    ctx.set_message('Genererer bilder')
+    result = strekliste_generator.generate_all_images(version, force=force, progress_callback=ctx.progress,
+                                                      workers=AppConfig.STREKLISTE_WORKERS)
+    if not result['success']:
+        return {'success': False, 'messages': [['danger', result.get('error', 'Unknown error')]]}
+
+    # The image endpoint only reads the shift index, so write it here too (from the page model just used)
+    ctx.set_message('Skriver vaktindeks')
+    strekliste_generator.write_shift_index(version)
+
+    error_count = len(result.get('errors', []))
+    message = f'Generated {len(result["generated"])} images ({len(result["skipped"])} unchanged'
+    if result['removed']:
+        message += f', {len(result["removed"])} removed'
+    message += ')'
+    if error_count > 0:
+        message += f' ({error_count} errors)'
+
+    return {
+        'success': True,
+        'messages': [['success' if not error_count else 'warning', message]],
+        'generated': len(result['generated']),
+        'skipped': len(result['skipped']),
+        'removed': len(result['removed']),
+        'errors': error_count,
+        'error_details': result.get('errors', [])[:10],  # First 10 errors
+        'total': result['total'],
+    }
+
+
+def build_import_pipeline(year_id, name=None, is_active=False):
+    """
+    The full import of a turnus year as a stage graph:
+
+        turnuser PDF  -> scrape (JSON + Excel) -> stats -> database shifts
+        strekliste PDF -> page model -> double shifts
+                                     -> shift images
+                                     -> shift index (page and neighbouring rows per shift)
+
+    The two branches run concurrently. Stages whose input PDF is missing are skipped.
+    """
+    from app.utils.pipeline import Pipeline, Stage
+    from app.utils.pdf import strekliste_generator, strekliste_analysis, double_shift_scanner
+    from app.utils.pdf.shiftscraper import turnusfiler_output_path
+
+    year_id = year_id.upper()
+    version = year_id.lower()
+    turnusfiler_dir = _turnusfiler_dir(year_id)
+    pdf_path = os.path.join(turnusfiler_dir, f'turnuser_{year_id}.pdf')
+    json_path = turnusfiler_output_path(year_id, 'json')
+    excel_path = turnusfiler_output_path(year_id, 'xlsx')
+    df_json_path = os.path.join(turnusfiler_dir, f'turnus_df_{year_id}.json')
+    strekliste_paths = strekliste_generator.get_paths(version)
+
+    def scrape(progress):
+        from app.utils.pdf.shiftscraper import scrape_to_turnusfiler
+
+        if not os.path.exists(pdf_path):
+            return {'from_existing_json': True}
+        result = scrape_to_turnusfiler(pdf_path, year_id, workers=AppConfig.SCRAPER_WORKERS,
+                                       incremental=True, progress_callback=progress)
+        return {'from_cache': result['from_cache'], 'changes': result['changes']}
+
+    def stats(progress):
+        from app.utils.shift_stats import Turnus
+
+        stats_df = Turnus(json_path).stats_df
+        stats_df.to_json(df_json_path)
+        return {'turnuser': len(stats_df)}
+
+    def database(progress):
+        turnus_set = get_turnus_set_by_year(year_id)
+        if turnus_set:
+            summary = refresh_turnus_set_shifts(turnus_set['id'], json_path)
+            update_turnus_set_paths(turnus_set['id'], json_path, df_json_path)
+            return {'turnus_set_id': turnus_set['id'], 'created': False,
+                    **{key: len(value) for key, value in summary.items()}}
+
+        success, message = create_turnus_set(name=name or year_id, year_identifier=year_id,
+                                             is_active=is_active, turnus_file_path=json_path,
+                                             df_file_path=df_json_path)
+        if not success:
+            raise RuntimeError(message)
+        turnus_set = get_turnus_set_by_year(year_id)
+        add_shifts_to_turnus_set(json_path, turnus_set['id'])
+        return {'turnus_set_id': turnus_set['id'], 'created': True}
+
+    def page_model(progress):
+        model = strekliste_analysis.load_page_model(strekliste_paths['pdf_path'])
+        return {'pages': len(model['pages']),
+                'shift_rows': sum(len(page['shift_rows']) for page in model['pages'])}
+
+    def double_shifts(progress):
+        result = double_shift_scanner.write_double_shifts(strekliste_paths['pdf_path'], version)
+        return {'dobbelt_tur': len(result['dobbelt_tur']), 'delt_dagsverk': len(result['delt_dagsverk'])}
+
+    def images(progress):
+        # Only runs when the PDF changed (or with force); rows whose source is unchanged keep their image
+        result = strekliste_generator.generate_all_images(version, progress_callback=progress,
+                                                          workers=AppConfig.STREKLISTE_WORKERS)
+        if not result['success']:
+            raise RuntimeError(result['error'])
+        return {'generated': len(result['generated']), 'unchanged': len(result['skipped']),
+                'removed': len(result['removed']), 'errors': len(result['errors']), 'total': result['total']}
+
+    def shift_index(progress):
+        result = strekliste_generator.write_shift_index(version)
+        return {'shifts': result['shifts'], 'page_count': result['page_count']}
+
+    turnus_source = pdf_path if os.path.exists(pdf_path) else json_path
+
+    return Pipeline(f'import_{version}', [
+        # The scraper caches by PDF hash itself, and writes the JSON and Excel in one streamed pass
+        Stage('scrape', scrape, label='Skraping (JSON/Excel)', cache=False,
+              inputs=lambda: [turnus_source]),
+        Stage('stats', stats, label='Statistikk', depends_on=['scrape'],
+              inputs=lambda: [json_path], outputs=lambda: {'turnus_df.json': df_json_path}),
+        Stage('database', database, label='Vakter i database', depends_on=['scrape', 'stats'],
+              inputs=lambda: [json_path, df_json_path], cache=False),
+        # The page model is cached by PDF hash itself; the stages below read it
+        Stage('page_model', page_model, label='Strekliste-analyse', cache=False,
+              inputs=lambda: [strekliste_paths['pdf_path']]),
+        Stage('double_shifts', double_shifts, label='Dobbeltturer', depends_on=['page_model'],
+              inputs=lambda: [strekliste_paths['pdf_path']],
+              outputs=lambda: {'double_shifts.json': double_shift_scanner.get_output_path(version)},
+              params={'analysis_version': strekliste_analysis.ANALYSIS_VERSION}),
+        Stage('images', images, label='Strekliste-bilder', depends_on=['page_model'],
+              inputs=lambda: [strekliste_paths['pdf_path']],
+              outputs=lambda: {'png': strekliste_paths['images_dir']},
+              params={'zoom': strekliste_generator.PDF_ZOOM}),
+        Stage('shift_index', shift_index, label='Vaktindeks', depends_on=['page_model'],
+              inputs=lambda: [strekliste_paths['pdf_path']],
+              outputs=lambda: {'shift_index.json': strekliste_paths['index_path']},
+              params={'analysis_version': strekliste_analysis.ANALYSIS_VERSION}),
+    ])
+
+
+def import_year(ctx, year_id, name=None, is_active=False, force=False):
+    """Run the full import pipeline for a year, with per-stage timings in the result."""
+    from app.utils.pipeline import format_report, DONE, SKIPPED, FAILED
+
+    pipeline = build_import_pipeline(year_id, name=name, is_active=is_active)
+    report = pipeline.run(force=force, progress_callback=ctx.progress)
+
+    # One line per stage with its status and time, then the total
+    lines = format_report(pipeline, report)
+    messages = []
+    for stage_report, line in zip(report['stages'].values(), lines):
+        category = {FAILED: 'danger', SKIPPED: 'warning'}.get(stage_report['status'], 'info')
+        messages.append([category, ' '.join(line.split())])
+    messages.append(['success' if report['success'] else 'danger',
+                     f"Import av {year_id.upper()} {'fullført' if report['success'] else 'feilet'} "
+                     f"på {report['seconds']:.1f} s."])
+
+    # Shifts, statistics and double shift flags are all part of the loaded set
+    turnus_set = get_turnus_set_by_year(year_id.upper())
+    if turnus_set and any(r['status'] == DONE for r in report['stages'].values()):
+        _reload_if_active(turnus_set['id'])
+
+    return {'success': report['success'], 'messages': messages, 'stages': report['stages']}
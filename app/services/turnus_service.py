@@ -7,6 +7,18 @@ from app.models import TurnusSet, Shifts, Favorites
 logger = logging.getLogger(__name__)
 
 
+def _iter_turnus_names(source):
+    """Yield turnus names from a turnuser JSON path, or an iterable of turnus dicts or names."""
+    if isinstance(source, str):
+        with open(source, 'r') as f:
+            source = json.load(f)
+    for entry in source:
+        if isinstance(entry, str):
+            yield entry
+        else:
+            yield from entry.keys()
+
+
 def create_turnus_set(name, year_identifier, is_active=False, turnus_file_path=None, df_file_path=None):
     """Create a new turnus set with optional file paths"""
     db_session = get_db_session()
@@ -137,21 +149,21 @@ def get_active_turnus_set():
 
 
 def add_shifts_to_turnus_set(file_path, turnus_set_id):
-    """Load shifts from a JSON file into a specific turnus set"""
+    """Load shifts into a specific turnus set.
+
+    file_path is a turnuser JSON file, or an iterable of turnus dicts or names
+    (e.g. streamed from the scraper).
+    """
     db_session = get_db_session()
     try:
-        with open(file_path, 'r') as f:
-            turnus_data = json.load(f)
-
-        for x in turnus_data:
-            for name in x.keys():
-                existing = db_session.query(Shifts).filter_by(
-                    title=name,
-                    turnus_set_id=turnus_set_id
-                ).first()
-                if not existing:
-                    new_shift = Shifts(title=name, turnus_set_id=turnus_set_id)
-                    db_session.add(new_shift)
+        for name in _iter_turnus_names(file_path):
+            existing = db_session.query(Shifts).filter_by(
+                title=name,
+                turnus_set_id=turnus_set_id
+            ).first()
+            if not existing:
+                new_shift = Shifts(title=name, turnus_set_id=turnus_set_id)
+                db_session.add(new_shift)
 
         db_session.commit()
         logger.info("Shifts added to turnus set %s successfully", turnus_set_id)
@@ -224,12 +236,7 @@ def refresh_turnus_set_shifts(turnus_set_id, json_file_path):
         old_shifts = db_session.query(Shifts).filter_by(turnus_set_id=turnus_set_id).all()
         old_names = set(s.title for s in old_shifts)
 
-        with open(json_file_path, 'r') as f:
-            turnus_data = json.load(f)
-        new_names = set()
-        for entry in turnus_data:
-            for name in entry.keys():
-                new_names.add(name)
+        new_names = set(_iter_turnus_names(json_file_path))
 
         unchanged = old_names & new_names
         unmatched_old = old_names - unchanged
@@ -7,6 +7,7 @@ import { SortingSystem } from './modules/sorting-system.js';
 import { Favorites } from './modules/favorites.js';
 import { PrintUtils } from './modules/print-utils.js';
 import { ShiftTimelineModal } from './modules/shift-timeline.js';
+import { TurnusLoader } from './modules/turnus-loader.js';
 
 // NOT USED
 // import { Utils, ScrollPosition } from './modules/utils.js';
@@ -28,8 +29,11 @@ class App {
         this.modules.favorites = new Favorites();
         // this.modules.scrollPosition = new ScrollPosition(); // Disabled - Utils not imported
 
+        // Turnusliste: turnuser are rendered by the loader as they are fetched
+        const turnusList = document.querySelector('#turnus-list');
+
         // Initialize shift colors if we have table cells (applies CSS classes)
-        if (document.querySelector('td[id="cell"]')) {
+        if (document.querySelector('td[id="cell"]') || turnusList) {
             this.modules.shiftColors = new ShiftColors();
         }
 
@@ -44,9 +48,25 @@ class App {
         //     this.modules.colorAdjustment = new ColorAdjustment();
         // }
 
+        if (turnusList) {
+            // Newly rendered turnuser get the same treatment as server-rendered tables
+            document.addEventListener('turnusliste:rendered', (event) => {
+                event.detail.elements.forEach(element => {
+                    this.modules.shiftColors?.applyShiftColors(element);
+                    this.modules.shiftTimeline?.setupClickHandlers(element);
+                });
+            });
+            this.modules.turnusLoader = new TurnusLoader();
+
+            // Print every turnus, not only the ones loaded so far
+            window.printTables = () => {
+                this.modules.turnusLoader.loadAll().then(() => PrintUtils.printTables());
+            };
+        }
+
         // Initialize sorting if we're on the turnusliste page
         if (document.querySelector('#helgetimer-slider')) {
-            this.modules.sorting = new SortingSystem();
+            this.modules.sorting = new SortingSystem(this.modules.turnusLoader);
         }
 
         // Initialize shift timeline modal if present
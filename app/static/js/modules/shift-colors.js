@@ -1,6 +1,16 @@
 // Shift Colors Module
 // Applies CSS classes to shift table cells based on time and shift type
 
+// Day categories from the server (data-kategori, see app/utils/day_classifier.py)
+const CATEGORY_CLASSES = {
+    T: 'early',
+    K: 'late',
+    N: 'night',
+    B: 'early-and-late',
+    F: 'day_off',
+    S: 'day_off'
+};
+
 export class ShiftColors {
     constructor() {
         this.defaultTimeThresholds = {
@@ -21,22 +31,28 @@ export class ShiftColors {
         }
     }
 
-    applyShiftColors() {
+    applyShiftColors(root = document) {
         // Skip if custom color settings are active (user has configured custom colors)
         if (localStorage.getItem('shiftColorSettings')) {
             return;
         }
 
-        this.colorAllCells();
+        this.colorAllCells(root);
     }
 
-    colorAllCells() {
-        const tds = document.querySelectorAll('td[id="cell"]');
+    colorAllCells(root = document) {
+        const tds = root.querySelectorAll('td[id="cell"]');
         
         tds.forEach(td => this.colorCell(td));
     }
 
     colorCell(td) {
+        // Cells from the server carry their category; older markup is parsed below
+        if (td.dataset.kategori !== undefined) {
+            this.applyCategory(td, td.dataset.kategori);
+            return;
+        }
+
         const timeTextElement = td.querySelector('.time-text');
         if (!timeTextElement) {
             console.log('No .time-text element found in td:', td);
@@ -63,6 +79,17 @@ export class ShiftColors {
         }
     }
 
+    applyCategory(td, kategori) {
+        if (kategori.endsWith('H')) {
+            td.classList.add('h-dag');
+            return;
+        }
+        const className = CATEGORY_CLASSES[kategori];
+        if (className) {
+            td.classList.add(className);
+        }
+    }
+
     applyShiftTypeColors(td, times) {
         const startTime = times[0];
         const [start_hours, start_minutes] = startTime.split(':').map(Number);
@@ -95,9 +95,9 @@ export class ShiftTimelineModal {
         });
     }
 
-    setupClickHandlers() {
+    setupClickHandlers(root = document) {
         // Find all dagsverk (shift number) elements in table cells and make them clickable
-        document.querySelectorAll('.dagsverk-link').forEach(element => {
+        root.querySelectorAll('.dagsverk-link').forEach(element => {
             const shiftNr = element.dataset.shiftNr;
             // Extract turnus_set_id from parent container
             const container = element.closest('.printable');
@@ -142,7 +142,10 @@ export class ShiftTimelineModal {
         this.setLoading(true);
 
         try {
-            const response = await fetch(`/api/shift-image/${turnusSetId}/${lookupShiftNr}`);
+            const response = await fetch(
+                `/api/shift-image/${turnusSetId}/${lookupShiftNr}?size=${this.imageSize()}`,
+                { headers: { 'Accept': this.acceptsWebp() ? 'image/webp,image/png' : 'image/png' } }
+            );
 
             if (response.ok) {
                 const blob = await response.blob();
@@ -171,6 +174,25 @@ export class ShiftTimelineModal {
         }
     }
 
+    // Smallest image variant that is still sharp at the modal's width
+    imageSize() {
+        // The modal may still be opening, so fall back to the window width
+        const wrapperWidth = (this.imageWrapper && this.imageWrapper.clientWidth) || window.innerWidth;
+        const pixels = wrapperWidth * (window.devicePixelRatio || 1);
+        if (pixels <= 600) return 'thumb';
+        if (pixels <= 1200) return 'screen';
+        return 'print';
+    }
+
+    acceptsWebp() {
+        if (this._acceptsWebp === undefined) {
+            const canvas = document.createElement('canvas');
+            canvas.width = canvas.height = 1;
+            this._acceptsWebp = canvas.toDataURL('image/webp').startsWith('data:image/webp');
+        }
+        return this._acceptsWebp;
+    }
+
     setLoading(loading) {
         if (this.modalSpinner) {
             this.modalSpinner.style.display = loading ? 'block' : 'none';
@@ -2,7 +2,10 @@
 // Handles turnusliste sorting functionality
 
 export class SortingSystem {
-    constructor() {
+    // With a TurnusLoader the loader shows the turnuser in the ranked order;
+    // without one the list items already on the page are reordered
+    constructor(loader = null) {
+        this.loader = loader;
         this.originalOrder = [];
         this.currentOrder = [];
         this.init();
@@ -155,8 +158,8 @@ export class SortingSystem {
         return score;
     }
 
-    sortTurnuser() {
-        const weights = {
+    getWeights() {
+        return {
             helgetimer: parseFloat(document.getElementById('helgetimer-slider').value),
             shift_cnt: parseFloat(document.getElementById('shift-cnt-slider').value),
             tidlig: parseFloat(document.getElementById('tidlig-slider').value),
@@ -165,6 +168,67 @@ export class SortingSystem {
             before_6: parseFloat(document.getElementById('before-6-slider').value),
             afternoon_ends: parseFloat(document.getElementById('afternoon-ends-slider').value)
         };
+    }
+
+    /**
+     * Sort by the server's ranking (/api/rank, same scoring as sortTurnuserLocally).
+     * Falls back to scoring in the browser if the request fails.
+     */
+    async sortTurnuser() {
+        const weights = this.getWeights();
+
+        // Only the latest slider position counts
+        if (this.rankRequest) {
+            this.rankRequest.abort();
+        }
+        const controller = new AbortController();
+        this.rankRequest = controller;
+
+        try {
+            const response = await fetch('/api/rank?' + new URLSearchParams(weights), {
+                signal: controller.signal,
+                headers: { 'Accept': 'application/json' }
+            });
+            const data = await response.json();
+            if (!response.ok || data.status !== 'success') {
+                throw new Error(data.message || `HTTP ${response.status}`);
+            }
+            this.applyRanking(data.turnuser, weights);
+        } catch (error) {
+            if (error.name === 'AbortError') return;
+            console.warn('Ranking request failed, sorting locally:', error);
+            this.sortTurnuserLocally(weights);
+        } finally {
+            if (this.rankRequest === controller) {
+                this.rankRequest = null;
+            }
+        }
+    }
+
+    applyRanking(turnusNames, weights) {
+        if (this.loader) {
+            this.loader.setOrder(turnusNames);
+            this.updateSortingInfo(weights);
+            return;
+        }
+
+        const elements = new Map(this.originalOrder.map(t => [t.name, t.element]));
+        const container = document.querySelector('.list-group');
+        const ranked = turnusNames.filter(name => elements.has(name));
+
+        if (container) {
+            ranked.forEach(name => container.appendChild(elements.get(name)));
+        }
+
+        this.currentOrder = ranked.map(name => ({ element: elements.get(name), name: name }));
+        this.updateSortingInfo(weights);
+    }
+
+    async sortTurnuserLocally(weights) {
+        if (this.loader) {
+            // Scoring in the browser needs every turnus on the page
+            await this.loader.loadAll();
+        }
 
         const turnusData = this.getTurnusData();
 
@@ -182,6 +246,12 @@ export class SortingSystem {
         });
         
         turnusData.sort((a, b) => b.score - a.score);
+
+        if (this.loader) {
+            this.loader.setOrder(turnusData.map(t => t.name));
+            this.updateSortingInfo(weights);
+            return;
+        }
         
         // Reorder DOM elements
         const container = document.querySelector('.list-group');
@@ -199,11 +269,20 @@ export class SortingSystem {
     }
 
     resetOrder() {
-        const container = document.querySelector('.list-group');
-        this.originalOrder.forEach(turnus => {
-            container.appendChild(turnus.element);
-        });
-        this.currentOrder = [...this.originalOrder];
+        // A ranking still on its way would undo the reset
+        if (this.rankRequest) {
+            this.rankRequest.abort();
+        }
+
+        if (this.loader) {
+            this.loader.setOrder(null);
+        } else {
+            const container = document.querySelector('.list-group');
+            this.originalOrder.forEach(turnus => {
+                container.appendChild(turnus.element);
+            });
+            this.currentOrder = [...this.originalOrder];
+        }
         
         // Reset all sliders
         const sliders = document.querySelectorAll('input[type="range"]');
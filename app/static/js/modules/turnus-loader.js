@@ -0,0 +1,289 @@
+// Turnus Loader Module
+// Renders the turnusliste from /api/turnus-data a page at a time, as the list is scrolled
+
+// Load the next page when the end of the list is this close (px)
+const PRELOAD_MARGIN = 800;
+
+export class TurnusLoader {
+    constructor() {
+        const config = document.getElementById('turnusliste-config');
+        this.config = JSON.parse(config.textContent);
+        this.list = document.getElementById('turnus-list');
+        this.status = document.getElementById('turnus-list-status');
+        this.sentinel = document.getElementById('turnus-list-sentinel');
+        this.itemTemplate = document.getElementById('turnus-item-template');
+
+        this.pageSize = this.config.page_size;
+        this.elements = new Map();   // turnus name -> rendered list item
+        this.announced = new WeakSet();  // Items already passed to 'turnusliste:rendered' listeners
+        this.setOrderNames = [];     // turnus names by index in the set, as far as loaded
+        this.loadedPages = new Set();
+        this.total = null;
+        this.order = null;           // Ranked turnus names, or null for the set's order
+        this.shown = 0;
+        this.queue = Promise.resolve();
+
+        this.init();
+    }
+
+    init() {
+        if (!this.config.turnus_set_id) {
+            this.setStatus('Ingen turnus valgt');
+            return;
+        }
+
+        this.observer = new IntersectionObserver(entries => {
+            if (entries.some(entry => entry.isIntersecting)) {
+                this.fillViewport();
+            }
+        }, { rootMargin: `${PRELOAD_MARGIN}px 0px` });
+
+        this.showMore().then(() => {
+            this.observer.observe(this.sentinel);
+            if (this.config.highlighted_turnus) {
+                this.reveal(this.config.highlighted_turnus);
+            }
+        });
+    }
+
+    // Renders run one after another, in the order they were asked for
+    enqueue(task) {
+        this.queue = this.queue.then(task).catch(error => {
+            console.error('Error loading turnuser:', error);
+            this.setStatus('Kunne ikke laste turnuser');
+        });
+        return this.queue;
+    }
+
+    showMore() {
+        return this.enqueue(() => this.render(this.shown + this.pageSize));
+    }
+
+    // The observer only fires when the sentinel comes into range, so keep going while it stays there
+    async fillViewport() {
+        while (this.shown < this.available() &&
+               this.sentinel.getBoundingClientRect().top < window.innerHeight + PRELOAD_MARGIN) {
+            const shown = this.shown;
+            await this.showMore();
+            if (this.shown === shown) break;
+        }
+    }
+
+    available() {
+        return this.order ? this.order.length : (this.total ?? 0);
+    }
+
+    /** Show the list in this order (ranked turnus names), or in the set's order for null. */
+    setOrder(names) {
+        return this.enqueue(() => {
+            this.order = names;
+            return this.render(Math.max(this.shown, this.pageSize));
+        });
+    }
+
+    /** Load and show every turnus (e.g. before printing). */
+    loadAll() {
+        return this.enqueue(async () => {
+            if (this.total === null) {
+                await this.fetchPage(0);
+            }
+            return this.render(this.total);
+        });
+    }
+
+    /** Make sure a turnus is shown, loading the list up to it. Resolves to its list item. */
+    reveal(name) {
+        return this.enqueue(async () => {
+            if (!this.elements.has(name)) {
+                await this.fetchNames([name]);
+            }
+            const element = this.elements.get(name);
+            if (!element) return null;
+
+            const position = this.order ? this.order.indexOf(name) : Number(element.dataset.index);
+            if (position >= this.shown) {
+                await this.render(position + 1);
+            }
+            return element;
+        });
+    }
+
+    async render(count) {
+        let names;
+        if (this.order) {
+            names = this.order.slice(0, count);
+            await this.fetchNames(names.filter(name => !this.elements.has(name)));
+        } else {
+            if (this.total === null) {
+                await this.fetchPage(0);
+            }
+            count = Math.min(count, this.total);
+            const lastPage = Math.ceil(count / this.pageSize) - 1;
+            for (let page = 0; page <= lastPage; page++) {
+                if (!this.loadedPages.has(page)) {
+                    await this.fetchPage(page);
+                }
+            }
+            names = this.setOrderNames.slice(0, count);
+        }
+
+        const shownNames = names.filter(name => this.elements.has(name));
+        const shownElements = new Set(shownNames.map(name => this.elements.get(name)));
+
+        const current = Array.from(this.list.children);
+        const added = [];
+        if (current.length !== shownElements.size || current.some(element => !shownElements.has(element)) ||
+            shownNames.some((name, i) => current[i] !== this.elements.get(name))) {
+            // Items shown before but not in this selection are kept for later, off the page
+            current.forEach(element => {
+                if (!shownElements.has(element)) {
+                    element.remove();
+                }
+            });
+            shownNames.forEach(name => {
+                const element = this.elements.get(name);
+                if (!this.announced.has(element)) {
+                    this.announced.add(element);
+                    added.push(element);
+                }
+                this.list.appendChild(element);
+            });
+        }
+
+        this.shown = shownNames.length;
+        const available = this.available();
+        this.setStatus(this.shown < available ? `Viser ${this.shown} av ${available} turnuser` : '');
+
+        // Listeners set up each item once (colours, click handlers), however often it is moved
+        if (added.length) {
+            document.dispatchEvent(new CustomEvent('turnusliste:rendered', { detail: { elements: added } }));
+        }
+    }
+
+    async fetchPage(page) {
+        const data = await this.fetchJson(`page=${page}`);
+        this.total = data.total;
+        this.loadedPages.add(page);
+        this.addBlocks(data.turnuser);
+    }
+
+    async fetchNames(names) {
+        const maxNames = this.config.max_names;
+        for (let i = 0; i < names.length; i += maxNames) {
+            const query = names.slice(i, i + maxNames)
+                .map(name => `name=${encodeURIComponent(name)}`).join('&');
+            const data = await this.fetchJson(query);
+            this.total = data.total;
+            this.addBlocks(data.turnuser);
+        }
+    }
+
+    async fetchJson(query) {
+        // The browser revalidates with the ETag and gets 304 when nothing changed
+        const response = await fetch(`/api/turnus-data/${this.config.turnus_set_id}?${query}`, {
+            headers: { 'Accept': 'application/json' }
+        });
+        if (!response.ok) {
+            throw new Error(`HTTP ${response.status}`);
+        }
+        return response.json();
+    }
+
+    addBlocks(blocks) {
+        blocks.forEach(block => {
+            this.setOrderNames[block.index] = block.name;
+            if (!this.elements.has(block.name)) {
+                this.elements.set(block.name, this.createItem(block));
+            }
+        });
+    }
+
+    createItem(block) {
+        const item = this.itemTemplate.content.firstElementChild.cloneNode(true);
+        const name = block.name;
+        const favoritePosition = this.config.favorite_positions[name];
+
+        item.dataset.index = block.index;
+        if (name === this.config.highlighted_turnus) {
+            item.classList.add('highlighted-turnus');
+        }
+        if (favoritePosition) {
+            item.classList.add('favorite-item');
+            const position = item.querySelector('.favorite-position');
+            position.classList.remove('d-none');
+            position.querySelector('.badge').textContent = `#${favoritePosition}`;
+        }
+
+        item.querySelector('[data-turnus]').dataset.turnus = name;
+        item.querySelector('.t-name').textContent = name;
+        item.querySelector('.custom-key-btn').addEventListener('click', () => handleKeyFunction(name));
+
+        const checkbox = item.querySelector('.toggle-favoritt');
+        checkbox.id = `toggle-favoritt-${block.index}`;
+        checkbox.setAttribute('shift_title', name);
+        checkbox.checked = Boolean(favoritePosition);
+        checkbox.closest('label').htmlFor = checkbox.id;
+
+        const tbody = item.querySelector('tbody');
+        block.weeks.forEach(week => tbody.appendChild(this.createWeekRow(week)));
+
+        const dataFelt = item.querySelector('.data-felt');
+        if (block.stats) {
+            dataFelt.querySelectorAll('[data-stat]').forEach(element => {
+                const value = block.stats[element.dataset.stat];
+                element.textContent = value === null || value === undefined ? '' : value;
+            });
+        } else {
+            dataFelt.remove();
+        }
+
+        return item;
+    }
+
+    createWeekRow(week) {
+        const row = document.createElement('tr');
+        row.className = 'align-middle text-nowrap';
+
+        const weekCell = document.createElement('td');
+        weekCell.style.cssText = 'border: 1px solid black; font-size: small;';
+        weekCell.textContent = week.nr;
+        row.appendChild(weekCell);
+
+        week.days.forEach((day, i) => {
+            const cell = document.createElement('td');
+            cell.id = 'cell';
+            cell.className = 'min-width-td';
+            if (day.is_consecutive_shift) {
+                cell.classList.add('consecutive-shift-arrow', 'consecutive-shift-border');
+            } else if (day.is_consecutive_receiver) {
+                cell.classList.add('consecutive-shift-receiver', 'consecutive-shift-border');
+            }
+            if (day.is_delt_dagsverk) cell.classList.add('delt-dagsverk');
+            if (i === week.days.length - 1) cell.classList.add('last-day');
+            if (i === 0) cell.classList.add('first-day');
+            cell.dataset.kategori = day.kategori ?? '';
+            cell.style.border = '1px solid black';
+
+            const dagsverk = document.createElement('div');
+            dagsverk.className = 'custom-text dagsverk-link';
+            dagsverk.style.fontSize = 'xx-small';
+            dagsverk.dataset.shiftNr = day.dagsverk;
+            dagsverk.textContent = day.dagsverk;
+
+            const time = document.createElement('div');
+            time.className = 'time-text';
+            time.style.fontSize = 'small';
+            time.textContent = day.tid.length === 2 ? `${day.tid[0]} - ${day.tid[1]}` : day.tid.join(' ');
+
+            cell.append(dagsverk, time);
+            row.appendChild(cell);
+        });
+
+        return row;
+    }
+
+    setStatus(text) {
+        this.status.textContent = text;
+        this.status.style.display = text ? 'block' : 'none';
+    }
+}
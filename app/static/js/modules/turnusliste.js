@@ -112,9 +112,7 @@ function getCurrentTurnusSetId() {
 }
 
 // Toggle favorites visibility
-function toggleFavoritesVisibility(hideFavorites) {
-    const favoriteItems = document.querySelectorAll('.favorite-item');
-    
+function toggleFavoritesVisibility(hideFavorites, favoriteItems = document.querySelectorAll('.favorite-item')) {
     favoriteItems.forEach(item => {
         const tableWrapper = item.querySelector('.table-scroll-wrapper');
         const dataFelt = item.querySelector('.data-felt');
@@ -131,10 +129,11 @@ function toggleFavoritesVisibility(hideFavorites) {
     });
 }
 
-document.addEventListener('DOMContentLoaded', function() {
-    const highlightedElement = document.querySelector('.highlighted-turnus');
-    
-    if (highlightedElement) {
+// Scroll to the highlighted turnus and drop the highlight on the next click elsewhere
+function focusHighlightedTurnus(highlightedElement) {
+    if (highlightedElement && !highlightedElement.dataset.focused) {
+        highlightedElement.dataset.focused = 'true';
+
         // Jump to highlighted element
         setTimeout(() => {
             const rect = highlightedElement.getBoundingClientRect();
@@ -156,6 +155,23 @@ document.addEventListener('DOMContentLoaded', function() {
             }
         });
     }
+}
+
+document.addEventListener('DOMContentLoaded', function() {
+    focusHighlightedTurnus(document.querySelector('.highlighted-turnus'));
+
+    // Turnuser rendered later by the turnusliste loader
+    document.addEventListener('turnusliste:rendered', function(event) {
+        event.detail.elements.forEach(element => {
+            if (element.classList.contains('highlighted-turnus')) {
+                focusHighlightedTurnus(element);
+            }
+            if (element.classList.contains('favorite-item')) {
+                const hideFavorites = localStorage.getItem('turnuslisteViewMode') === 'hide-favorites';
+                toggleFavoritesVisibility(hideFavorites, [element]);
+            }
+        });
+    });
     
     // Set up favorites toggle
     const hideFavoritesRadio = document.getElementById('hide-favorites');
@@ -0,0 +1,287 @@
+"""
+Content-Addressed Artifact Cache
+
+Stores generated files (scraped JSON, Excel, analysis results, ...) on disk
+under a key derived from the inputs, so identical inputs can reuse earlier
+output instead of recomputing it.
+
+Layout:
+    <cache_dir>/<namespace>/<key>/meta.json
+    <cache_dir>/<namespace>/<key>/<artifact files>
+
+The entry directory's mtime is bumped on every hit and used as "last used"
+when pruning.
+
+Usage:
+    Programmatic:
+        cache = ArtifactCache('scrape')
+        key = cache.make_key(file_sha256(pdf_path), scraper_fingerprint)
+        entry_dir = cache.get(key)
+        if entry_dir is None:
+            entry_dir = cache.put(key, {'turnuser.json': json_path}, meta={'year_id': 'R26'})
+
+    Command Line:
+        python app/utils/artifact_cache.py list
+        python app/utils/artifact_cache.py list --namespace scrape
+        python app/utils/artifact_cache.py prune --max-age-days 90
+        python app/utils/artifact_cache.py prune --namespace scrape --max-size-mb 200
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import logging
+
+# Allow running as standalone script
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from config import AppConfig
+
+logger = logging.getLogger(__name__)
+
+META_FILENAME = 'meta.json'
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """Return the hex SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _dir_size(path):
+    total = 0
+    for dirpath, _dirnames, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, filename))
+            except OSError:
+                pass
+    return total
+
+
+class ArtifactCache():
+    def __init__(self, namespace, root=None):
+        self.namespace = namespace
+        self.root = os.path.join(root or AppConfig.cache_dir, namespace)
+
+    @staticmethod
+    def make_key(*parts):
+        """Combine input hashes/fingerprints (str, bytes or JSON-serializable) into one key."""
+        digest = hashlib.sha256()
+        for part in parts:
+            if isinstance(part, bytes):
+                data = part
+            elif isinstance(part, str):
+                data = part.encode('utf-8')
+            else:
+                data = json.dumps(part, sort_keys=True, default=str).encode('utf-8')
+            digest.update(len(data).to_bytes(8, 'big'))
+            digest.update(data)
+        return digest.hexdigest()
+
+    def entry_dir(self, key):
+        return os.path.join(self.root, key)
+
+    def get(self, key):
+        """Return the entry directory for a key, or None on a miss."""
+        path = self.entry_dir(key)
+        if not os.path.exists(os.path.join(path, META_FILENAME)):
+            return None
+        try:
+            os.utime(path)  # Mark as recently used
+        except OSError:
+            pass
+        return path
+
+    def get_meta(self, key):
+        """Return the metadata dict stored with an entry, or None."""
+        path = os.path.join(self.entry_dir(key), META_FILENAME)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def put(self, key, files=None, meta=None, data=None, blobs=None):
+        """
+        Store an entry atomically.
+
+        Args:
+            key: Cache key from make_key()
+            files: dict of artifact name -> source file path to copy in
+            meta: Optional JSON-serializable metadata
+            data: dict of artifact name -> JSON-serializable object to write
+            blobs: dict of artifact name -> bytes to write
+
+        Returns:
+            The entry directory
+        """
+        os.makedirs(self.root, exist_ok=True)
+        final_dir = self.entry_dir(key)
+        tmp_dir = f'{final_dir}.tmp-{os.getpid()}-{time.time_ns()}'
+        os.makedirs(tmp_dir)
+
+        try:
+            for name, src_path in (files or {}).items():
+                shutil.copyfile(src_path, os.path.join(tmp_dir, name))
+            for name, obj in (data or {}).items():
+                with open(os.path.join(tmp_dir, name), 'w', encoding='utf-8') as f:
+                    json.dump(obj, f, ensure_ascii=False)
+            for name, content in (blobs or {}).items():
+                with open(os.path.join(tmp_dir, name), 'wb') as f:
+                    f.write(content)
+
+            entry_meta = dict(meta or {})
+            entry_meta.setdefault('created_at', time.time())
+            entry_meta['artifacts'] = sorted(list((files or {}).keys()) + list((data or {}).keys())
+                                             + list((blobs or {}).keys()))
+            with open(os.path.join(tmp_dir, META_FILENAME), 'w', encoding='utf-8') as f:
+                json.dump(entry_meta, f, indent=2, ensure_ascii=False)
+
+            for attempt in range(3):
+                self._move_aside(final_dir)
+                try:
+                    os.rename(tmp_dir, final_dir)
+                    break
+                except OSError:
+                    # Another put stored the same key in between; its entry is as good as ours
+                    if os.path.isdir(final_dir):
+                        shutil.rmtree(tmp_dir, ignore_errors=True)
+                        break
+                    if attempt == 2:
+                        raise
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        return final_dir
+
+    @staticmethod
+    def _move_aside(entry_dir):
+        """Remove an entry by renaming it away first, so nobody sees it half deleted."""
+        old_dir = f'{entry_dir}.tmp-old-{os.getpid()}-{time.time_ns()}'
+        try:
+            os.rename(entry_dir, old_dir)
+        except OSError:
+            return  # Not there, or already moved by another put
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+    def artifact_path(self, key, name):
+        """Path of a stored artifact (the entry must exist)."""
+        return os.path.join(self.entry_dir(key), name)
+
+    def load_json(self, key, name):
+        """Return a JSON artifact from an entry, or None on a miss."""
+        if self.get(key) is None:
+            return None
+        path = self.artifact_path(key, name)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def delete(self, key):
+        shutil.rmtree(self.entry_dir(key), ignore_errors=True)
+
+    def entries(self):
+        """List entries with size and timestamps, most recently used first."""
+        if not os.path.isdir(self.root):
+            return []
+
+        result = []
+        for key in os.listdir(self.root):
+            path = os.path.join(self.root, key)
+            if '.tmp-' in key or not os.path.isdir(path):
+                continue
+            meta = self.get_meta(key) or {}
+            result.append({
+                'namespace': self.namespace,
+                'key': key,
+                'size': _dir_size(path),
+                'created_at': meta.get('created_at', os.path.getmtime(path)),
+                'last_used': os.path.getmtime(path),
+                'meta': meta,
+            })
+        result.sort(key=lambda e: e['last_used'], reverse=True)
+        return result
+
+    def prune(self, max_age_days=None, max_bytes=None):
+        """
+        Remove entries not used for max_age_days, then the least recently used
+        entries until the namespace is at most max_bytes.
+
+        Returns:
+            list of removed entry dicts
+        """
+        removed = []
+        entries = self.entries()
+
+        if max_age_days is not None:
+            cutoff = time.time() - max_age_days * 86400
+            for entry in [e for e in entries if e['last_used'] < cutoff]:
+                self.delete(entry['key'])
+                removed.append(entry)
+            entries = [e for e in entries if e['last_used'] >= cutoff]
+
+        if max_bytes is not None:
+            total = sum(e['size'] for e in entries)
+            for entry in reversed(entries):  # Least recently used first
+                if total <= max_bytes:
+                    break
+                self.delete(entry['key'])
+                removed.append(entry)
+                total -= entry['size']
+
+        return removed
+
+
+def list_namespaces(root=None):
+    root = root or AppConfig.cache_dir
+    if not os.path.isdir(root):
+        return []
+    return sorted(d for d in os.listdir(root) if os.path.isdir(os.path.join(root, d)))
+
+
+def main():
+    import argparse
+    from datetime import datetime
+
+    parser = argparse.ArgumentParser(description='List and prune the artifact cache')
+    parser.add_argument('command', choices=['list', 'prune'])
+    parser.add_argument('--namespace', help='Only this namespace (e.g. scrape). Default: all')
+    parser.add_argument('--max-age-days', type=float, help='Prune entries not used for this many days')
+    parser.add_argument('--max-size-mb', type=float, help='Prune least recently used entries down to this size per namespace')
+    args = parser.parse_args()
+
+    namespaces = [args.namespace] if args.namespace else list_namespaces()
+
+    if args.command == 'list':
+        grand_total = 0
+        for namespace in namespaces:
+            entries = ArtifactCache(namespace).entries()
+            total = sum(e['size'] for e in entries)
+            grand_total += total
+            print(f"\n{namespace}: {len(entries)} entries, {total / 1024 / 1024:.1f} MB")
+            for e in entries:
+                last_used = datetime.fromtimestamp(e['last_used']).strftime('%Y-%m-%d %H:%M')
+                label = e['meta'].get('source') or e['meta'].get('year_id') or ''
+                print(f"  {e['key'][:16]}  {e['size'] / 1024:10.1f} KB  last used {last_used}  {label}")
+        print(f"\nTotal: {grand_total / 1024 / 1024:.1f} MB")
+
+    elif args.command == 'prune':
+        if args.max_age_days is None and args.max_size_mb is None:
+            parser.error('prune needs --max-age-days and/or --max-size-mb')
+        max_bytes = int(args.max_size_mb * 1024 * 1024) if args.max_size_mb is not None else None
+        for namespace in namespaces:
+            removed = ArtifactCache(namespace).prune(max_age_days=args.max_age_days, max_bytes=max_bytes)
+            freed = sum(e['size'] for e in removed)
+            print(f"{namespace}: removed {len(removed)} entries, freed {freed / 1024 / 1024:.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
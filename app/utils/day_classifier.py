@@ -0,0 +1,120 @@
+"""
+Day Classifier
+
+One category code per turnus day, worked out once when the turnus PDF is
+scraped and stored in the turnus JSON as day['kategori']. The turnusliste
+colours, the scraper's Excel export and the shift stats all read the code
+instead of parsing the times again.
+
+A code is one letter for the day, followed by 'H' when the dagsverk is an
+H-dag (e.g. 'K' or 'KH'):
+
+    T  tidlig           ends 16:00 or earlier                   CSS .early
+    K  kveld            ends after 16:00, or after midnight     CSS .late
+    N  natt             starts 19:00 or later                   CSS .night
+    B  tidlig og kveld  starts 6-8, ends 16:00-17:59            CSS .early-and-late
+    F  fridag           XX, OO or TT                            CSS .day_off
+    S  skjult fridag    empty cell                              CSS .day_off
+    '' anything else (e.g. an unreadable time)
+
+When more than one shift letter fits, the first in the order B, N, K, T is
+used, which is the colour the page showed when it classified cells itself.
+
+Usage:
+    classify(['23:45', '7:45'], '9348')   # 'N'
+    classify_turnus(turnus)               # sets day['kategori'] on every day
+"""
+
+TIDLIG = 'T'
+KVELD = 'K'
+NATT = 'N'
+BEGGE = 'B'
+FRIDAG = 'F'
+SKJULT_FRIDAG = 'S'
+HDAG = 'H'
+
+SHIFT_CODES = (TIDLIG, KVELD, NATT, BEGGE)
+FRIDAG_TIDER = ('XX', 'OO', 'TT')
+
+KVELD_SLUTT = 16 * 60   # Shifts ending after this are kveld (minutes after midnight)
+NATT_START = 19 * 60    # Shifts starting at or after this are natt
+
+
+def _minutes(value):
+    """Minutes after midnight of 'H:MM', or None if it isn't a time."""
+    try:
+        hours, minutes = value.split(':')
+        return int(hours) * 60 + int(minutes)
+    except (AttributeError, ValueError):
+        return None
+
+
+def _shift_letter(start, end):
+    if 5 < start // 60 < 9 and 16 <= end // 60 < 18:
+        return BEGGE
+    if start >= NATT_START:
+        return NATT
+    if end > KVELD_SLUTT or start > end:
+        return KVELD
+    return TIDLIG
+
+
+def classify(tid, dagsverk=''):
+    """Category code of a day from its tid list and dagsverk (see the module docstring)."""
+    if len(tid) == 2:
+        start, end = _minutes(tid[0]), _minutes(tid[1])
+        letter = _shift_letter(start, end) if start is not None and end is not None else ''
+    elif not tid or tid[0] == '':
+        letter = SKJULT_FRIDAG
+    elif tid[0] in FRIDAG_TIDER:
+        letter = FRIDAG
+    else:
+        letter = ''
+
+    if (dagsverk or '').strip().endswith(HDAG):
+        return letter + HDAG
+    return letter
+
+
+def shift_code(kategori):
+    """The day letter of a code, without the H-dag mark ('' for no code, e.g. NaN in a DataFrame)."""
+    return kategori[:1] if isinstance(kategori, str) else ''
+
+
+def is_shift(kategori):
+    return shift_code(kategori) in SHIFT_CODES
+
+
+def is_hdag(kategori):
+    return isinstance(kategori, str) and kategori.endswith(HDAG)
+
+
+def classify_turnus(turnus):
+    """Set day['kategori'] on every day of one turnus ({week: {day: day_data}}). Returns the turnus."""
+    for week_data in turnus.values():
+        if not isinstance(week_data, dict):
+            continue
+        for day_data in week_data.values():
+            if isinstance(day_data, dict) and 'tid' in day_data:
+                day_data['kategori'] = classify(day_data['tid'], day_data.get('dagsverk', ''))
+    return turnus
+
+
+def ensure_categories(turnus_data):
+    """
+    Classify the days of a turnuser list ([{name: turnus}]) that have no code,
+    as in JSON files scraped before the codes were added.
+
+    Returns:
+        Number of turnuser that were classified
+    """
+    classified = 0
+    for turnus_entry in turnus_data:
+        for turnus in turnus_entry.values():
+            missing = any(isinstance(day_data, dict) and 'tid' in day_data and 'kategori' not in day_data
+                          for week_data in turnus.values() if isinstance(week_data, dict)
+                          for day_data in week_data.values())
+            if missing:
+                classify_turnus(turnus)
+                classified += 1
+    return classified
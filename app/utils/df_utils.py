@@ -1,24 +1,135 @@
 import os
 import re
+import time
 import logging
-import pandas as pd
 import json
+import threading
 import app.utils.db_utils as _db_utils
+from app.utils import day_classifier, metrics
 from config import AppConfig
 
 logger = logging.getLogger(__name__)
 
+# Turnus sets loaded once by preload_all_turnus_sets() (gunicorn master before fork).
+# turnus_set_id -> {'key': (paths and mtimes), 'df': DataFrame, 'turnus_data': list}
+# Entries are shared read-only across requests and dropped when the files change.
+_preloaded_sets = {}
+
+
+def _file_key(*paths):
+    """Return (path, mtime) pairs used to detect changed files on disk."""
+    return tuple((path, os.path.getmtime(path) if os.path.exists(path) else None) for path in paths)
+
+
+def turnus_file_paths(turnus_set):
+    """Return (turnus JSON path, DataFrame JSON path) of a turnus set row."""
+    # Use database file paths if available
+    if turnus_set.get('turnus_file_path') and turnus_set.get('df_file_path'):
+        # Convert database paths to OS-specific paths
+        return os.path.normpath(turnus_set['turnus_file_path']), os.path.normpath(turnus_set['df_file_path'])
+
+    # Construct paths based on turnus set identifier
+    year_id = turnus_set['year_identifier'].lower()
+    return (os.path.join(AppConfig.turnusfiler_dir, year_id, f'turnuser_{turnus_set["year_identifier"]}.json'),
+            os.path.join(AppConfig.turnusfiler_dir, year_id, f'turnus_df_{turnus_set["year_identifier"]}.json'))
+
+
+def double_shifts_path(year_id):
+    return os.path.join(AppConfig.turnusfiler_dir, year_id.lower(), f'double_shifts_{year_id.lower()}.json')
+
+
+def turnus_set_source_key(turnus_set):
+    """(path, mtime) of the files a turnus set row is loaded from, without loading them.
+    Equal to DataframeManager._source_key while the files are unchanged."""
+    turnus_path, df_path = turnus_file_paths(turnus_set)
+    return _file_key(turnus_path, df_path, double_shifts_path(turnus_set['year_identifier']))
+
+
+def preload_all_turnus_sets():
+    """Load every turnus set into the process-wide cache. Returns the number of sets loaded."""
+    _preloaded_sets.clear()
+    loaded = 0
+    for turnus_set in _db_utils.get_all_turnus_sets():
+        manager = DataframeManager(turnus_set['id'])
+        if manager.has_data():
+            _preloaded_sets[turnus_set['id']] = {
+                'key': manager._source_key,
+                'df': manager.df,
+                'turnus_data': manager.turnus_data,
+            }
+            loaded += 1
+    return loaded
+
+
+class _EmptyFrame():
+    """Stands in for the DataFrame until one is assigned, without importing pandas."""
+    empty = True
+
+    def __len__(self):
+        return 0
+
+
+_EMPTY_FRAME = _EmptyFrame()
+
+
 class DataframeManager():
-    def __init__(self, turnus_set_id=None):
-        """Initialize with either a specific turnus set or the active one"""
+    def __init__(self, turnus_set_id=None, lazy=False):
+        """Initialize with either a specific turnus set or the active one.
+
+        With lazy=True nothing is read (and pandas is not imported) until the
+        data is first accessed or load_turnus_set() is called explicitly.
+        """
         self.current_turnus_set = None
-        self.df = pd.DataFrame()  # Empty dataframe as default
-        self.turnus_data = []     # Empty list as default
-        self.load_turnus_set(turnus_set_id)
-    
+        self._df = _EMPTY_FRAME   # DataFrame once loaded
+        self._turnus_data = []    # Empty list as default
+        self._pending_turnus_set_id = turnus_set_id
+        self._loaded = False
+        # Shared lazy managers are loaded on first use by whichever thread gets there first
+        self._load_lock = threading.RLock()
+        self._source_key = None
+        if not lazy:
+            self.load_turnus_set(turnus_set_id)
+
+    @property
+    def df(self):
+        self._ensure_loaded()
+        return self._df
+
+    @df.setter
+    def df(self, value):
+        self._df = value
+
+    @property
+    def turnus_data(self):
+        self._ensure_loaded()
+        return self._turnus_data
+
+    @turnus_data.setter
+    def turnus_data(self, value):
+        self._turnus_data = value
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            with self._load_lock:
+                if not self._loaded:
+                    self.load_turnus_set(self._pending_turnus_set_id)
+
+    def is_loaded(self):
+        """Check if the data has been read (always True for non-lazy managers)"""
+        return self._loaded
+
     def load_turnus_set(self, turnus_set_id=None):
         """Load a specific turnus set or the active one"""
-        
+        with self._load_lock:
+            self._pending_turnus_set_id = turnus_set_id
+            loaded = self._load(turnus_set_id)
+            # Set last, so a thread that sees _loaded also sees the frames
+            self._loaded = True
+            return loaded
+
+    def _load(self, turnus_set_id):
+        import pandas as pd
+
         if turnus_set_id:
             # Load specific turnus set by ID
             all_sets = _db_utils.get_all_turnus_sets()
@@ -35,19 +146,23 @@ class DataframeManager():
             return False
         
         self.current_turnus_set = turnus_set
-        
+        load_start = time.perf_counter()
+
         try:
-            # Use database file paths if available
-            if turnus_set.get('turnus_file_path') and turnus_set.get('df_file_path'):
-                # Convert database paths to OS-specific paths
-                turnus_path = os.path.normpath(turnus_set['turnus_file_path'])
-                df_path = os.path.normpath(turnus_set['df_file_path'])
-            else:
-                # Construct paths based on turnus set identifier
-                year_id = turnus_set['year_identifier'].lower()
-                turnus_path = os.path.join(AppConfig.turnusfiler_dir, year_id, f'turnuser_{turnus_set["year_identifier"]}.json')
-                df_path = os.path.join(AppConfig.turnusfiler_dir, year_id, f'turnus_df_{turnus_set["year_identifier"]}.json')
-            
+            turnus_path, df_path = turnus_file_paths(turnus_set)
+            self._source_key = turnus_set_source_key(turnus_set)
+
+            # Reuse the preloaded copy if the files have not changed since
+            preloaded = _preloaded_sets.get(turnus_set['id'])
+            if preloaded:
+                if preloaded['key'] == self._source_key:
+                    metrics.record_cache('turnus_set', True)
+                    self.df = preloaded['df']
+                    self.turnus_data = preloaded['turnus_data']
+                    return True
+                _preloaded_sets.pop(turnus_set['id'], None)
+                metrics.record_cache('turnus_set', False)
+
             # Load dataframe
             if os.path.exists(df_path):
                 self.df = pd.read_json(df_path)
@@ -58,13 +173,20 @@ class DataframeManager():
             # Load turnus data
             if os.path.exists(turnus_path):
                 with open(turnus_path, 'r') as f:
-                    self.turnus_data = json.load(f)
+                    turnus_data = json.load(f)
                 # Apply double shift flags from double_shifts JSON file
-                self.turnus_data = self._apply_double_shift_flags(self.turnus_data, turnus_set['year_identifier'])
+                turnus_data = self._apply_double_shift_flags(turnus_data, turnus_set['year_identifier'])
+                # Files scraped before the day categories were added
+                if day_classifier.ensure_categories(turnus_data):
+                    logger.info("Classified days of %s on load; re-import to store the categories",
+                                turnus_set['year_identifier'])
+                # Assigned once complete: other threads may be reading the previous data
+                self.turnus_data = turnus_data
             else:
                 logger.warning("Turnus file not found: %s", turnus_path)
                 self.turnus_data = []
 
+            metrics.observe_df_load(turnus_set['year_identifier'], time.perf_counter() - load_start)
             return True
         except Exception as e:
             logger.error("Error loading turnus set %s: %s", turnus_set['year_identifier'], e)
@@ -74,6 +196,7 @@ class DataframeManager():
     
     def get_current_turnus_info(self):
         """Get information about the currently loaded turnus set"""
+        self._ensure_loaded()
         return self.current_turnus_set
     
     def reload_active_set(self):
@@ -84,10 +207,13 @@ class DataframeManager():
         """Check if we have valid data loaded"""
         return not self.df.empty and len(self.turnus_data) > 0
 
+    def _double_shifts_path(self, year_id):
+        return double_shifts_path(year_id)
+
     def _apply_double_shift_flags(self, turnus_data, year_id):
         """Apply shift flags based on double_shifts file."""
 
-        double_shifts_path = os.path.join(AppConfig.turnusfiler_dir, year_id.lower(), f'double_shifts_{year_id.lower()}.json')
+        double_shifts_path = self._double_shifts_path(year_id)
         if not os.path.exists(double_shifts_path):
             return turnus_data
 
@@ -0,0 +1,310 @@
+"""
+Background Jobs
+
+Runs long admin tasks (turnus PDF import, refresh, strekliste image
+generation) outside the HTTP request. Routes submit a job and return its id
+immediately, and the browser polls for progress.
+
+Jobs are stored in a local SQLite file (AppConfig.jobs_db_path), so every
+gunicorn worker can answer progress polls and results survive restarts. Each
+process runs the jobs it accepted in its own thread pool of
+AppConfig.JOB_WORKERS threads, created on first submit (after any fork).
+
+Usage:
+    job_id = jobs.submit('generate_strekliste', generate_strekliste_job,
+                         label='R26', version='r26', force=True)
+    jobs.get_job(job_id)   # {'id', 'kind', 'status', 'progress', 'message', 'result', ...}
+    jobs.cancel(job_id)
+
+A job function gets a JobContext as its first argument, whose progress()
+matches the progress_callback(current, total, label) signature used by
+generate_all_images and scrape_to_turnusfiler:
+
+    def generate_strekliste_job(ctx, version, force):
+        return strekliste_generator.generate_all_images(version, force, progress_callback=ctx.progress)
+"""
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+from config import AppConfig
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+# Finished jobs beyond this many are deleted when a new job is submitted
+KEEP_FINISHED_JOBS = 200
+
+# Minimum seconds between progress writes and cancellation checks
+PROGRESS_INTERVAL = 0.5
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    label TEXT,
+    status TEXT NOT NULL,
+    progress REAL,
+    message TEXT,
+    params TEXT,
+    result TEXT,
+    error TEXT,
+    user_id INTEGER,
+    pid INTEGER,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+)
+"""
+
+
+class JobCancelled(BaseException):
+    """
+    Raised inside a job when cancellation was requested.
+
+    Derives from BaseException so ``except Exception`` blocks in the task code
+    (e.g. per-shift error handling in generate_all_images) don't swallow it.
+    """
+
+
+class JobStore():
+    """SQLite-backed job records. Opens a short-lived connection per call, so it is thread-safe."""
+
+    def __init__(self, path=None):
+        self.path = path or AppConfig.jobs_db_path
+        self._initialized = False
+
+    @contextmanager
+    def _connect(self):
+        """Open a connection, commit on success and always close it."""
+        if not self._initialized:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        try:
+            if not self._initialized:
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.execute(_SCHEMA)
+                self._initialized = True
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def create(self, job_id, kind, label=None, params=None, user_id=None):
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT INTO jobs (id, kind, label, status, params, user_id, pid, created_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (job_id, kind, label, QUEUED, json.dumps(params or {}, default=str),
+                 user_id, os.getpid(), time.time()))
+            conn.execute(
+                'DELETE FROM jobs WHERE status IN (?, ?, ?) AND id NOT IN '
+                '(SELECT id FROM jobs ORDER BY created_at DESC LIMIT ?)',
+                (*FINISHED, KEEP_FINISHED_JOBS))
+
+    def update(self, job_id, **fields):
+        if 'result' in fields:
+            fields['result'] = json.dumps(fields['result'], default=str)
+        columns = ', '.join(f'{name} = ?' for name in fields)
+        with self._connect() as conn:
+            conn.execute(f'UPDATE jobs SET {columns} WHERE id = ?', (*fields.values(), job_id))
+
+    def get(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return _row_to_dict(row) if row else None
+
+    def list(self, limit=20, kind=None):
+        query = 'SELECT * FROM jobs'
+        args = []
+        if kind:
+            query += ' WHERE kind = ?'
+            args.append(kind)
+        query += ' ORDER BY created_at DESC LIMIT ?'
+        args.append(limit)
+        with self._connect() as conn:
+            return [_row_to_dict(row) for row in conn.execute(query, args).fetchall()]
+
+    def is_cancel_requested(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute('SELECT cancel_requested FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return bool(row and row['cancel_requested'])
+
+    def request_cancel(self, job_id):
+        """Flag a job for cancellation. Queued jobs are cancelled right away."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute('UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status IN (?, ?)',
+                         (job_id, QUEUED, RUNNING))
+            conn.execute('UPDATE jobs SET status = ?, finished_at = ?, message = ? WHERE id = ? AND status = ?',
+                         (CANCELLED, now, 'Avbrutt', job_id, QUEUED))
+
+    def fail_orphaned(self):
+        """Mark queued/running jobs whose process is gone (restart, crash) as failed."""
+        with self._connect() as conn:
+            rows = conn.execute('SELECT id, pid FROM jobs WHERE status IN (?, ?)', (QUEUED, RUNNING)).fetchall()
+            orphaned = [row['id'] for row in rows if not _pid_alive(row['pid'])]
+            for job_id in orphaned:
+                conn.execute('UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?',
+                             (FAILED, 'Prosessen som kjørte jobben ble stoppet', time.time(), job_id))
+        return orphaned
+
+
+def _pid_alive(pid):
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _timestamp(value):
+    return datetime.fromtimestamp(value).isoformat(timespec='seconds') if value else None
+
+
+def _row_to_dict(row):
+    job = dict(row)
+    job['params'] = json.loads(job['params']) if job['params'] else {}
+    job['result'] = json.loads(job['result']) if job['result'] else None
+    job['cancel_requested'] = bool(job['cancel_requested'])
+    job['finished'] = job['status'] in FINISHED
+    for key in ('created_at', 'started_at', 'finished_at'):
+        job[key] = _timestamp(job[key])
+    return job
+
+
+class JobContext():
+    """Handed to job functions for progress reporting and cancellation checks."""
+
+    def __init__(self, store, job_id):
+        self.store = store
+        self.job_id = job_id
+        self._last_write = 0.0
+        self._last_cancel_check = 0.0
+
+    def progress(self, current, total, message=''):
+        """Report progress; usable directly as a progress_callback(current, total, label)."""
+        now = time.monotonic()
+        if now - self._last_write >= PROGRESS_INTERVAL or (total and current >= total):
+            self.store.update(self.job_id,
+                              progress=(current / total) if total else None,
+                              message=str(message) if message else None)
+            self._last_write = now
+        self.check_cancelled()
+
+    def set_message(self, message):
+        self.store.update(self.job_id, message=message)
+        self.check_cancelled(force=True)
+
+    def check_cancelled(self, force=False):
+        """Raise JobCancelled if cancellation was requested."""
+        now = time.monotonic()
+        if not force and now - self._last_cancel_check < PROGRESS_INTERVAL:
+            return
+        self._last_cancel_check = now
+        if self.store.is_cancel_requested(self.job_id):
+            raise JobCancelled()
+
+
+store = JobStore()
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    """Thread pool for this process, recreated after a fork."""
+    global _executor, _executor_pid
+    from concurrent.futures import ThreadPoolExecutor
+
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(max_workers=max(1, AppConfig.JOB_WORKERS),
+                                           thread_name_prefix='job')
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def _run(job_id, func, params):
+    job = store.get(job_id)
+    if job is None or job['status'] != QUEUED:
+        return  # Cancelled while queued
+
+    store.update(job_id, status=RUNNING, started_at=time.time(), pid=os.getpid())
+    ctx = JobContext(store, job_id)
+    start = time.perf_counter()
+    try:
+        ctx.check_cancelled(force=True)
+        result = func(ctx, **params)
+    except JobCancelled:
+        store.update(job_id, status=CANCELLED, finished_at=time.time(), message='Avbrutt')
+        logger.info("Job %s (%s) cancelled", job_id, job['kind'])
+    except Exception as e:
+        logger.exception("Job %s (%s) failed", job_id, job['kind'])
+        store.update(job_id, status=FAILED, finished_at=time.time(), error=str(e))
+    else:
+        store.update(job_id, status=SUCCEEDED, finished_at=time.time(), progress=1.0, result=result)
+        logger.info("Job %s (%s) finished in %.1fs", job_id, job['kind'], time.perf_counter() - start)
+
+
+def submit(kind, func, label=None, user_id=None, **params):
+    """
+    Queue func(ctx, **params) on this process's worker pool.
+
+    params must be JSON-serializable (they are stored with the job), and the
+    return value should be too, since it is persisted as the job result.
+
+    Returns:
+        The job id
+    """
+    job_id = uuid.uuid4().hex
+    store.create(job_id, kind, label=label, params=params, user_id=user_id)
+    _get_executor().submit(_run, job_id, func, params)
+    logger.info("Job %s (%s) queued", job_id, kind)
+    return job_id
+
+
+def get_job(job_id):
+    return store.get(job_id)
+
+
+def list_jobs(limit=20, kind=None):
+    return store.list(limit=limit, kind=kind)
+
+
+def cancel(job_id):
+    store.request_cancel(job_id)
+    return store.get(job_id)
+
+
+def init_app(app):
+    """Fail jobs left queued or running by a previous process."""
+    try:
+        orphaned = store.fail_orphaned()
+        if orphaned:
+            logger.warning("Marked %d interrupted jobs as failed", len(orphaned))
+    except sqlite3.Error as e:
+        logger.error("Could not open job store %s: %s", store.path, e)
@@ -0,0 +1,285 @@
+"""
+In-memory request metrics.
+
+Collects per-endpoint latency histograms, database query counts/time,
+cache hit rates and DataframeManager load times for the running process.
+Values live in memory only and reset when the worker restarts.
+
+Exposed through:
+    /admin/metrics             - admin page
+    /admin/metrics/prometheus  - Prometheus text format
+"""
+
+import time
+import logging
+import threading
+from flask import request, has_request_context
+from sqlalchemy import event
+from config import AppConfig
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Per-thread accumulator for the request currently being served
+_request_state = threading.local()
+
+
+class Histogram():
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """Approximate quantile as the upper bound of the bucket containing it."""
+        if self.count == 0:
+            return 0.0
+        target = q * self.count
+        running = 0
+        for i, bound in enumerate(self.buckets):
+            running += self.counts[i]
+            if running >= target:
+                return bound
+        return self.max
+
+    def cumulative(self):
+        """Cumulative bucket counts as (upper_bound, count) pairs, Prometheus style."""
+        pairs = []
+        running = 0
+        for i, bound in enumerate(self.buckets):
+            running += self.counts[i]
+            pairs.append((bound, running))
+        pairs.append(('+Inf', self.count))
+        return pairs
+
+
+class MetricsRegistry():
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started_at = time.time()
+        self.requests = {}     # endpoint -> Histogram
+        self.statuses = {}     # (endpoint, status) -> count
+        self.db = {}           # endpoint -> {'queries': int, 'time': float}
+        self.cache = {}        # cache name -> {'hits': int, 'misses': int}
+        self.df_loads = {}     # year_identifier -> Histogram
+
+    def observe_request(self, endpoint, status, duration, db_queries, db_time):
+        with self.lock:
+            self.requests.setdefault(endpoint, Histogram()).observe(duration)
+            key = (endpoint, status)
+            self.statuses[key] = self.statuses.get(key, 0) + 1
+            db_stats = self.db.setdefault(endpoint, {'queries': 0, 'time': 0.0})
+            db_stats['queries'] += db_queries
+            db_stats['time'] += db_time
+
+    def record_cache(self, name, hit):
+        with self.lock:
+            stats = self.cache.setdefault(name, {'hits': 0, 'misses': 0})
+            stats['hits' if hit else 'misses'] += 1
+
+    def observe_df_load(self, year_identifier, duration):
+        with self.lock:
+            self.df_loads.setdefault(year_identifier, Histogram()).observe(duration)
+
+    def reset(self):
+        # Clear in place: threads waiting on self.lock must keep sharing it
+        with self.lock:
+            self.started_at = time.time()
+            self.requests.clear()
+            self.statuses.clear()
+            self.db.clear()
+            self.cache.clear()
+            self.df_loads.clear()
+
+    def snapshot(self):
+        """Return a plain-dict copy of all metrics for rendering."""
+        with self.lock:
+            endpoints = []
+            for endpoint, hist in sorted(self.requests.items()):
+                db_stats = self.db.get(endpoint, {'queries': 0, 'time': 0.0})
+                endpoints.append({
+                    'endpoint': endpoint,
+                    'count': hist.count,
+                    'avg_ms': hist.sum / hist.count * 1000 if hist.count else 0.0,
+                    'p50_ms': hist.quantile(0.5) * 1000,
+                    'p95_ms': hist.quantile(0.95) * 1000,
+                    'max_ms': hist.max * 1000,
+                    'db_queries_per_request': db_stats['queries'] / hist.count if hist.count else 0.0,
+                    'db_ms_per_request': db_stats['time'] / hist.count * 1000 if hist.count else 0.0,
+                    'errors': sum(c for (ep, status), c in self.statuses.items()
+                                  if ep == endpoint and status >= 500),
+                })
+
+            caches = []
+            for name, stats in sorted(self.cache.items()):
+                total = stats['hits'] + stats['misses']
+                caches.append({
+                    'name': name,
+                    'hits': stats['hits'],
+                    'misses': stats['misses'],
+                    'hit_rate': stats['hits'] / total if total else 0.0,
+                })
+
+            df_loads = []
+            for year_identifier, hist in sorted(self.df_loads.items()):
+                df_loads.append({
+                    'year_identifier': year_identifier,
+                    'count': hist.count,
+                    'avg_ms': hist.sum / hist.count * 1000 if hist.count else 0.0,
+                    'max_ms': hist.max * 1000,
+                })
+
+            return {
+                'uptime_seconds': time.time() - self.started_at,
+                'endpoints': endpoints,
+                'caches': caches,
+                'df_loads': df_loads,
+            }
+
+    def to_prometheus(self):
+        """Render all metrics in the Prometheus text exposition format."""
+        lines = []
+        with self.lock:
+            lines.append('# HELP app_request_duration_seconds Request latency per endpoint.')
+            lines.append('# TYPE app_request_duration_seconds histogram')
+            for endpoint, hist in sorted(self.requests.items()):
+                for bound, count in hist.cumulative():
+                    lines.append(f'app_request_duration_seconds_bucket{{endpoint="{endpoint}",le="{bound}"}} {count}')
+                lines.append(f'app_request_duration_seconds_sum{{endpoint="{endpoint}"}} {hist.sum:.6f}')
+                lines.append(f'app_request_duration_seconds_count{{endpoint="{endpoint}"}} {hist.count}')
+
+            lines.append('# HELP app_requests_total Requests per endpoint and status code.')
+            lines.append('# TYPE app_requests_total counter')
+            for (endpoint, status), count in sorted(self.statuses.items()):
+                lines.append(f'app_requests_total{{endpoint="{endpoint}",status="{status}"}} {count}')
+
+            lines.append('# HELP app_db_queries_total Database queries executed per endpoint.')
+            lines.append('# TYPE app_db_queries_total counter')
+            for endpoint, stats in sorted(self.db.items()):
+                lines.append(f'app_db_queries_total{{endpoint="{endpoint}"}} {stats["queries"]}')
+
+            lines.append('# HELP app_db_query_seconds_total Time spent in database queries per endpoint.')
+            lines.append('# TYPE app_db_query_seconds_total counter')
+            for endpoint, stats in sorted(self.db.items()):
+                lines.append(f'app_db_query_seconds_total{{endpoint="{endpoint}"}} {stats["time"]:.6f}')
+
+            lines.append('# HELP app_cache_requests_total Cache lookups by cache name and result.')
+            lines.append('# TYPE app_cache_requests_total counter')
+            for name, stats in sorted(self.cache.items()):
+                lines.append(f'app_cache_requests_total{{cache="{name}",result="hit"}} {stats["hits"]}')
+                lines.append(f'app_cache_requests_total{{cache="{name}",result="miss"}} {stats["misses"]}')
+
+            lines.append('# HELP app_df_load_seconds DataframeManager load time per turnus set.')
+            lines.append('# TYPE app_df_load_seconds histogram')
+            for year_identifier, hist in sorted(self.df_loads.items()):
+                for bound, count in hist.cumulative():
+                    lines.append(f'app_df_load_seconds_bucket{{turnus_set="{year_identifier}",le="{bound}"}} {count}')
+                lines.append(f'app_df_load_seconds_sum{{turnus_set="{year_identifier}"}} {hist.sum:.6f}')
+                lines.append(f'app_df_load_seconds_count{{turnus_set="{year_identifier}"}} {hist.count}')
+
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+def _current_state():
+    """Return the accumulator for the active request, or None outside a request."""
+    return getattr(_request_state, 'current', None)
+
+
+def record_cache(name, hit):
+    """Record a cache lookup. Safe to call outside a request."""
+    registry.record_cache(name, hit)
+    state = _current_state()
+    if state is not None:
+        state['cache_hits' if hit else 'cache_misses'] += 1
+
+
+def observe_df_load(year_identifier, duration):
+    """Record a DataframeManager load. Safe to call outside a request."""
+    registry.observe_df_load(year_identifier, duration)
+    state = _current_state()
+    if state is not None:
+        state['df_loads'] += 1
+        state['df_time'] += duration
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start_times = conn.info.get('query_start_time')
+    if not start_times:
+        return
+    duration = time.perf_counter() - start_times.pop()
+    state = _current_state()
+    if state is not None:
+        state['db_queries'] += 1
+        state['db_time'] += duration
+
+
+def _start_request():
+    _request_state.current = {
+        'start': time.perf_counter(),
+        'db_queries': 0,
+        'db_time': 0.0,
+        'cache_hits': 0,
+        'cache_misses': 0,
+        'df_loads': 0,
+        'df_time': 0.0,
+    }
+
+
+def _finish_request(response):
+    state = _current_state()
+    if state is None or not has_request_context():
+        return response
+    _request_state.current = None
+
+    duration = time.perf_counter() - state['start']
+    endpoint = request.url_rule.endpoint if request.url_rule else '<unmatched>'
+    registry.observe_request(endpoint, response.status_code, duration,
+                             state['db_queries'], state['db_time'])
+
+    slow_ms = AppConfig.SLOW_REQUEST_MS
+    if slow_ms and duration * 1000 >= slow_ms:
+        logger.warning(
+            "Slow request %s %s (%s) %.0f ms: db=%d queries/%.0f ms, cache=%d hits/%d misses, "
+            "df_loads=%d/%.0f ms, status=%s",
+            request.method, request.path, endpoint, duration * 1000,
+            state['db_queries'], state['db_time'] * 1000,
+            state['cache_hits'], state['cache_misses'],
+            state['df_loads'], state['df_time'] * 1000,
+            response.status_code,
+        )
+    return response
+
+
+def init_app(app, engine):
+    """Register request hooks on the app and query listeners on the engine."""
+    if not AppConfig.METRICS_ENABLED:
+        return
+
+    if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
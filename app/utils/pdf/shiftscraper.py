@@ -15,20 +15,43 @@ Usage:
     Command Line:
         python shiftscraper.py path/to/file.pdf R24
         python shiftscraper.py path/to/file.pdf R24 --output-dir custom/path
+        python shiftscraper.py path/to/file.pdf R24 --workers 4
+        python shiftscraper.py path/to/file.pdf R24 --compact
         eksempel: python "D:\\programmering\\Python Projects\\shift_rotation_organizer\\app\\static\\turnusfiler\\r23\\turnuser_R23.pdf" "r25"
     
     Programmatic:
         scraper = ShiftScraper()
-        scraper.scrape_pdf('file.pdf', 'R24')
+        scraper.scrape_pdf('file.pdf', 'R24', workers=4)  # Optional process pool
         scraper.create_json(year_id='R24')  # Auto-saves to turnusfiler/r24/
         scraper.create_excel(year_id='R24') # Auto-saves to turnusfiler/r24/
 
+        # Streaming: turnuser are yielded page by page and written as they come
+        with TurnusJsonWriter('out.json', compact=True) as writer:
+            for turnus in ShiftScraper().iter_turnuser('file.pdf'):
+                writer.write(turnus)
+
+        # Same as above, but reuses cached output if the PDF was scraped before
+        scrape_to_turnusfiler('file.pdf', 'R24')
+
+        # Corrected PDF: only re-sort pages whose words changed
+        result = scrape_to_turnusfiler('file.pdf', 'R24', incremental=True)
+        result['changes']  # {'added', 'removed', 'changed', 'reprocessed_pages', 'page_count'}
+
+Cache:
+    Scrape results are stored in app/cache/scrape keyed by the PDF's SHA-256
+    and ShiftScraper.fingerprint(). List/prune with app/utils/artifact_cache.py.
+
+Day categories:
+    Every day gets a category code in day['kategori'] (see
+    app/utils/day_classifier.py), used for the Excel colours, the
+    turnusliste colours and the shift stats.
+
 Color Coding (Excel):
     - Yellow: H-days (holidays)
-    - Blue: Early shifts (3-16)
-    - Orange: Early-Evening shifts (3-8, 16+)
-    - Red: Evening shifts (9-18)
-    - Purple: Night shifts (18-23)
+    - Blue: Early shifts (ending by 16:00)
+    - Orange: Early-Evening shifts (starting 6-8, ending 16-18)
+    - Red: Evening shifts (ending after 16:00)
+    - Purple: Night shifts (starting 19:00 or later)
     - Green: Free days (XX, OO, TT)
     - Light Purple: Hidden free days (empty cells)
 
@@ -38,16 +61,350 @@ Workflow Integration:
     3. Files are automatically organized in turnusfiler structure
 """
 
+import os
+import sys
 import logging
+import bisect
+import shutil
+import hashlib
 from datetime import datetime
 import json
 import copy
-import pandas as pd
+import uuid
 import pdfplumber
 import xlsxwriter
 
+if not __package__:
+    # Run as a script: project root on the path for the app imports
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..')))
+
+from config import AppConfig
+from app.utils import day_classifier
+
 logger = logging.getLogger(__name__)
 
+# Page ranges handed to each process in ShiftScraper.scrape_pdf(workers=N)
+PAGE_RANGES_PER_WORKER = 4
+
+# Bump when the placement logic changes, so cached scrape results are not reused
+SCRAPER_VERSION = 2  # 2: day categories
+
+
+def turnusfiler_output_path(year_id, extension):
+    """Return turnusfiler/<year>/turnuser_<YEAR>.<extension>, creating the directory."""
+    # Create turnusfiler directory structure
+    turnusfiler_dir = os.path.join(AppConfig.static_dir, 'turnusfiler', year_id.lower())
+    os.makedirs(turnusfiler_dir, exist_ok=True)
+    return os.path.join(turnusfiler_dir, f'turnuser_{year_id}.{extension}')
+
+
+def scrape_to_turnusfiler(pdf_path, year_id, workers=None, use_cache=True, incremental=False,
+                          on_turnus=(), compact_json=False, progress_callback=None):
+    """
+    Scrape a turnus PDF and write turnuser_<YEAR>.json and .xlsx to turnusfiler,
+    plus a page manifest (turnuser_<YEAR>.pages.json) with a hash of each
+    page's words and the turnuser it produced.
+
+    Results are cached by the PDF's SHA-256 and the scraper fingerprint, so
+    uploading the same PDF again copies the cached files instead of scraping.
+
+    With incremental=True the existing JSON and page manifest are used as the
+    previous state: only pages whose words changed are sorted again, and the
+    rest are spliced in from the previous JSON.
+
+    Turnuser are streamed to the JSON and Excel writers as each page is sorted,
+    and to every callable in on_turnus (e.g. Turnus().add_turnus for stats),
+    so only one page of results is held in memory. on_turnus is not called on
+    a cache hit.
+
+    progress_callback(current_page, page_count, label) is called after each page.
+
+    Returns:
+        dict with 'json_path', 'excel_path', 'pages_path', 'from_cache' and 'changes'.
+        'changes' is None unless incremental=True and a previous JSON existed,
+        otherwise a dict from diff_turnuser() plus 'reprocessed_pages'
+        (1-based page numbers, None for a cache hit) and 'page_count'.
+    """
+    json_path = turnusfiler_output_path(year_id, 'json')
+    excel_path = turnusfiler_output_path(year_id, 'xlsx')
+    pages_path = turnusfiler_output_path(year_id, 'pages.json')
+
+    from app.utils.artifact_cache import ArtifactCache, file_sha256
+
+    scraper = ShiftScraper()
+
+    previous_turnuser = None
+    previous_manifest = None
+    if incremental and os.path.exists(json_path):
+        with open(json_path, 'r') as f:
+            previous_turnuser = json.load(f)
+        if os.path.exists(pages_path):
+            with open(pages_path, 'r') as f:
+                previous_manifest = json.load(f)
+
+    cache = ArtifactCache('scrape')
+    pdf_hash = file_sha256(pdf_path)
+    key = cache.make_key(pdf_hash, scraper.fingerprint())
+
+    if use_cache and cache.get(key):
+        _replace_with_copy(cache.artifact_path(key, 'turnuser.json'), json_path)
+        _replace_with_copy(cache.artifact_path(key, 'turnuser.xlsx'), excel_path)
+        if os.path.exists(cache.artifact_path(key, 'turnuser.pages.json')):
+            _replace_with_copy(cache.artifact_path(key, 'turnuser.pages.json'), pages_path)
+        elif os.path.exists(pages_path):
+            os.remove(pages_path)  # Stale manifest would not match the copied JSON
+        logger.info("Scrape cache hit for %s (%s)", pdf_path, key[:12])
+
+        changes = None
+        if previous_turnuser is not None:
+            with open(json_path, 'r') as f:
+                changes = diff_turnuser(previous_turnuser, json.load(f))
+            changes.update({'reprocessed_pages': None, 'page_count': None})
+        return {'json_path': json_path, 'excel_path': excel_path, 'pages_path': pages_path,
+                'from_cache': True, 'changes': changes}
+
+    pages = None
+    if previous_turnuser is not None and previous_manifest is not None \
+            and previous_manifest.get('scraper') == scraper.fingerprint_hash():
+        try:
+            pages = scraper.iter_pages_incremental(pdf_path, previous_turnuser, previous_manifest['pages'])
+        except ValueError as e:
+            logger.warning("Incremental scrape not possible, scraping all pages: %s", e)
+
+    if pages is None:
+        pages = scraper.iter_pages(pdf_path, workers=workers)
+
+    turnus_count = 0
+    with TurnusJsonWriter(json_path, compact=compact_json) as json_writer, \
+            TurnusExcelWriter(excel_path) as excel_writer:
+        for page_number, (_page_hash, sorterte_turnuser) in enumerate(pages, start=1):
+            for turnus in sorterte_turnuser:
+                json_writer.write(turnus)
+                excel_writer.write(turnus)
+                for callback in on_turnus:
+                    callback(turnus)
+                turnus_count += 1
+            if progress_callback:
+                progress_callback(page_number, scraper.page_count, f'Side {page_number} av {scraper.page_count}')
+    scraper.create_page_manifest(pages_path)
+
+    if use_cache:
+        cache.put(key,
+                  files={'turnuser.json': json_path, 'turnuser.xlsx': excel_path,
+                         'turnuser.pages.json': pages_path},
+                  meta={'source': os.path.basename(pdf_path), 'year_id': year_id,
+                        'pdf_sha256': pdf_hash, 'scraper_version': SCRAPER_VERSION,
+                        'turnus_count': turnus_count})
+
+    changes = None
+    if previous_turnuser is not None:
+        with open(json_path, 'r') as f:
+            changes = diff_turnuser(previous_turnuser, json.load(f))
+        changes.update({'reprocessed_pages': scraper.reprocessed_pages,
+                        'page_count': len(scraper.page_manifest)})
+        logger.info("Re-scraped %d of %d pages for %s: %d changed, %d added, %d removed",
+                    len(scraper.reprocessed_pages), len(scraper.page_manifest), year_id,
+                    len(changes['changed']), len(changes['added']), len(changes['removed']))
+
+    return {'json_path': json_path, 'excel_path': excel_path, 'pages_path': pages_path,
+                'from_cache': False, 'changes': changes}
+
+
+def diff_turnuser(old_turnuser, new_turnuser):
+    """
+    Compare two turnuser lists by name.
+
+    Returns:
+        dict with 'added', 'removed' and 'changed' turnus names
+    """
+    def by_name(turnuser):
+        # JSON round-trips turn the week/day keys into strings, so compare serialized
+        return {navn: json.dumps(verdi, sort_keys=True)
+                for turnus in turnuser for navn, verdi in turnus.items()}
+
+    old = by_name(old_turnuser)
+    new = by_name(new_turnuser)
+    return {
+        'added': [navn for navn in new if navn not in old],
+        'removed': [navn for navn in old if navn not in new],
+        'changed': [navn for navn in new if navn in old and new[navn] != old[navn]],
+    }
+
+
+def _tmp_path(output_path):
+    """A temp file next to output_path, unique to this writer (imports of the same year may overlap)."""
+    return f'{output_path}.tmp-{os.getpid()}-{uuid.uuid4().hex}'
+
+
+def _replace_with_copy(src_path, output_path):
+    """Copy src_path over output_path so readers see either the old or the new file, never half of one."""
+    tmp_path = _tmp_path(output_path)
+    try:
+        shutil.copyfile(src_path, tmp_path)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class TurnusJsonWriter():
+    """
+    Write a turnuser JSON list one turnus at a time.
+
+    The default output is identical to json.dump(turnuser, f, indent=4);
+    compact=True writes without indentation or spaces. The file is written
+    next to output_path and only replaces it when the with block finishes
+    without an exception, so a failed or cancelled scrape keeps the old file.
+    """
+    def __init__(self, output_path, compact=False):
+        self.output_path = output_path
+        self.tmp_path = _tmp_path(output_path)
+        self.compact = compact
+        self.count = 0
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.tmp_path, 'w')
+        self._file.write('[')
+        return self
+
+    def write(self, turnus):
+        if self.compact:
+            text = json.dumps(turnus, separators=(',', ':'))
+            self._file.write((',' if self.count else '') + text)
+        else:
+            text = json.dumps(turnus, indent=4).replace('\n', '\n    ')
+            self._file.write((',\n    ' if self.count else '\n    ') + text)
+        self.count += 1
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self._file.close()
+            os.remove(self.tmp_path)
+            return
+        if not self.compact and self.count:
+            self._file.write('\n')
+        self._file.write(']')
+        self._file.close()
+        os.replace(self.tmp_path, self.output_path)
+        logger.info("JSON file created: %s (%d turnuser)", self.output_path, self.count)
+
+
+class TurnusExcelWriter():
+    """
+    Write one color-coded sheet per turnus, one turnus at a time.
+
+    Uses xlsxwriter's constant_memory mode, so each row is flushed to disk as
+    soon as the next one is started, and creates the cell and color formats
+    once per workbook instead of once per sheet. Each day cell gets the color
+    of its day category (day['kategori']). Like TurnusJsonWriter, the workbook
+    only replaces output_path when the with block finishes without an exception.
+    """
+    COLUMNS = ['Uke', 'Mandag', 'Tirsdag', 'Onsdag', 'Torsdag', 'Fredag', 'Lørdag', 'Søndag']
+
+    def __init__(self, output_path):
+        self.output_path = output_path
+        self.tmp_path = _tmp_path(output_path)
+        self.workbook = None
+        self.formats = {}
+
+    def __enter__(self):
+        self.workbook = xlsxwriter.Workbook(self.tmp_path, {'constant_memory': True})
+        self.formats = self._create_formats(self.workbook)
+        # Fargeklasse for hver dagskategori
+        self.category_formats = {
+            day_classifier.TIDLIG: self.formats['tidlig'],
+            day_classifier.BEGGE: self.formats['tidlig_kveld'],
+            day_classifier.KVELD: self.formats['kveld'],
+            day_classifier.NATT: self.formats['natt'],
+            day_classifier.FRIDAG: self.formats['turnusfri'],
+            day_classifier.SKJULT_FRIDAG: self.formats['skjult_fridag'],
+        }
+        return self
+
+    @staticmethod
+    def _create_formats(workbook):
+        centered = {'align': 'center', 'valign': 'vcenter', 'border': 1, 'text_wrap': True}
+        black_text = {'font_color': '#000000'}
+        return {
+            # Samme utseende som pandas sin overskriftsrad
+            'header': workbook.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'}),
+            'centered': workbook.add_format(centered),
+            # Fargeklasser for dagskategoriene
+            'hdag': workbook.add_format({**centered, 'bg_color': '#dbcc27', **black_text}),
+            'tidlig': workbook.add_format({**centered, 'bg_color': '#7abfff', **black_text}),
+            'tidlig_kveld': workbook.add_format({**centered, 'bg_color': '#d68f6d', **black_text}),
+            'kveld': workbook.add_format({**centered, 'bg_color': '#fa7f7f', **black_text}),
+            'natt': workbook.add_format({**centered, 'bg_color': '#c34fe3', **black_text}),
+            'turnusfri': workbook.add_format({**centered, 'bg_color': '#13bd57', **black_text}),
+            'skjult_fridag': workbook.add_format({**centered, 'bg_color': '#cc9fe3', **black_text,
+                                                  'border': 2, 'border_color': '#c34fe3'}),
+        }
+
+    def write(self, turnus):
+        for turnus_navn, turnus_verdi in turnus.items():
+            # Pakker opp turnuser i uker og dager og legger de i riktig ukedag
+            rows = []
+            for uke_nr, uke in enumerate(turnus_verdi.values(), start=1):
+                row = [uke_nr] + [''] * 7
+                categories = [day_classifier.SKJULT_FRIDAG] * 8
+                for dag in uke.values():
+                    column = self.COLUMNS.index(dag['ukedag'])
+                    if len(dag['tid']) != 0:
+                        row[column] = " - ".join(dag['tid']) + " " + dag['dagsverk']
+                    kategori = dag.get('kategori')
+                    if kategori is None:
+                        kategori = day_classifier.classify(dag['tid'], dag['dagsverk'])
+                    categories[column] = kategori
+                rows.append((row, categories))
+
+            self._write_sheet(turnus_navn, rows)
+
+    def _cell_format(self, kategori):
+        if day_classifier.is_hdag(kategori):
+            return self.formats['hdag']
+        return self.category_formats.get(day_classifier.shift_code(kategori), self.formats['centered'])
+
+    def _write_sheet(self, sheet_name, rows):
+        worksheet = self.workbook.add_worksheet(sheet_name)
+        formats = self.formats
+
+        # Setter bredden på COLUMNS.
+        worksheet.set_column('B:H', 12)
+        worksheet.set_column('A:A', 4)
+
+        # constant_memory: radene må skrives i rekkefølge, og høyden settes før cellene
+        worksheet.write_row(0, 0, self.COLUMNS, formats['header'])
+        for row_nr, (row, categories) in enumerate(rows, start=1):
+            worksheet.set_row(row_nr, 40)
+            worksheet.write(row_nr, 0, row[0], formats['centered'])
+            for column in range(1, len(row)):
+                worksheet.write(row_nr, column, row[column], self._cell_format(categories[column]))
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            # Also on errors, so xlsxwriter removes its temporary row files
+            self.workbook.close()
+        finally:
+            if exc_type is not None and os.path.exists(self.tmp_path):
+                os.remove(self.tmp_path)
+        if exc_type is None:
+            os.replace(self.tmp_path, self.output_path)
+            logger.info("Excel file created: %s", self.output_path)
+
+
+def _sort_page_range(pdf_path, page_range):
+    """Process pool worker: sort pages [start, end) of the PDF with a fresh scraper."""
+    start, end = page_range
+    scraper = ShiftScraper()
+    results = []
+    with pdfplumber.open(pdf_path) as pdf:
+        for i in range(start, end):
+            results.append(scraper.scrape_page(pdf.pages[i]))
+            pdf.pages[i].close()
+    return results
+
 
 class ShiftScraper():
     def __init__(self) -> None:
@@ -72,18 +429,171 @@ class ShiftScraper():
         self.FRIDAG_FILTER = ['XX', 'OO', 'TT']
         
         self.turnuser = []
+        # Én oppføring per side: hash av ordene og navnene på turnusene siden ga
+        self.page_manifest = []
+        # Sidene (1-basert) som ble sortert i siste kjøring
+        self.reprocessed_pages = []
+        self.page_count = 0
+
+    def fingerprint(self):
+        """Identify the scraper version and table constants, for cache keys."""
+        return {
+            'version': SCRAPER_VERSION,
+            'turnus_1_pos': self.TURNUS_1_POS,
+            'turnus_2_pos': self.TURNUS_2_POS,
+            'dag_pos': self.DAG_POS,
+            'remove_filter': self.REMOVE_FILTER,
+            'allow_filter': self.ALLOW_FILTER,
+            'fridag_filter': self.FRIDAG_FILTER,
+        }
 
+    def fingerprint_hash(self):
+        return hashlib.sha256(json.dumps(self.fingerprint(), sort_keys=True).encode('utf-8')).hexdigest()
 
     # Scraper og sorterer pdf med turnuser
-    def scrape_pdf(self, pdf_path='turnuser_R25.pdf', year_id=None):
-        
-        pdf = pdfplumber.open(pdf_path)
-        pages_in_pdf = pdf.pages
-        
-        for page in pages_in_pdf:
-            sorterte_turnuser = self.sort_page(page)
-            for sortert_turnus in sorterte_turnuser:
-                self.turnuser.append(sortert_turnus)
+    def scrape_pdf(self, pdf_path='turnuser_R25.pdf', year_id=None, workers=None):
+        """
+        Scrape all pages of the PDF into self.turnuser.
+
+        With workers > 1 the pages are split into ranges that are sorted in a
+        process pool, each worker opening the PDF itself. Results are merged in
+        page order, so the output is identical to a serial run.
+        """
+        for _page_hash, sorterte_turnuser in self.iter_pages(pdf_path, workers=workers):
+            self.turnuser.extend(sorterte_turnuser)
+
+    def iter_turnuser(self, pdf_path, workers=None):
+        """Yield each finished turnus ({navn: turnus}) in page order, without keeping them."""
+        for _page_hash, sorterte_turnuser in self.iter_pages(pdf_path, workers=workers):
+            yield from sorterte_turnuser
+
+    def iter_pages(self, pdf_path, workers=None):
+        """
+        Yield (page hash, turnuser on the page) for each page in order, recording
+        the page manifest as it goes. Only the current page is held in memory
+        (plus the pages in flight with workers > 1).
+        """
+        self.reprocessed_pages = []
+        if workers and workers > 1:
+            pages = self._sort_pages_parallel(pdf_path, workers)
+        else:
+            pages = self._sort_pages_serial(pdf_path)
+
+        for page_number, (page_hash, sorterte_turnuser) in enumerate(pages, start=1):
+            self._record_page(page_hash, sorterte_turnuser)
+            self.reprocessed_pages.append(page_number)
+            yield page_hash, sorterte_turnuser
+
+    def _sort_pages_serial(self, pdf_path):
+        with pdfplumber.open(pdf_path) as pdf:
+            self.page_count = len(pdf.pages)
+            for page in pdf.pages:
+                yield self.scrape_page(page)
+                page.close()  # Frigjør ord og objekter pdfplumber har cachet for siden
+
+    def scrape_pdf_incremental(self, pdf_path, previous_turnuser, previous_pages):
+        """
+        Scrape the PDF into self.turnuser, reusing the previous result for every
+        page whose words hash the same as in previous_pages. See
+        iter_pages_incremental().
+
+        Returns:
+            1-based page numbers that were sorted again
+        """
+        for _page_hash, sorterte_turnuser in self.iter_pages_incremental(pdf_path, previous_turnuser, previous_pages):
+            self.turnuser.extend(sorterte_turnuser)
+        return self.reprocessed_pages
+
+    def iter_pages_incremental(self, pdf_path, previous_turnuser, previous_pages):
+        """
+        Like iter_pages(), but pages whose words hash the same as in
+        previous_pages (a page manifest from an earlier run of the same scraper
+        version) yield their previous turnuser instead of being sorted again.
+        The sorted pages are in self.reprocessed_pages once exhausted.
+
+        Args:
+            previous_turnuser: The turnuser list from the previous JSON, in page order
+            previous_pages: The 'pages' list of the previous page manifest
+
+        Raises:
+            ValueError: If the manifest does not match the previous turnuser
+                (raised here, before any page is read)
+        """
+        # Del opp forrige resultat per side
+        previous_by_page = []
+        offset = 0
+        for entry in previous_pages:
+            page_turnuser = previous_turnuser[offset:offset + len(entry['turnuser'])]
+            if [navn for turnus in page_turnuser for navn in turnus] != entry['turnuser']:
+                raise ValueError("page manifest does not match the turnus JSON")
+            previous_by_page.append(page_turnuser)
+            offset += len(entry['turnuser'])
+        if offset != len(previous_turnuser):
+            raise ValueError("page manifest does not match the turnus JSON")
+
+        def pages():
+            self.reprocessed_pages = []
+            with pdfplumber.open(pdf_path) as pdf:
+                self.page_count = len(pdf.pages)
+                for i, page in enumerate(pdf.pages):
+                    text_objects = self.page_words(page)
+                    page_hash = self.hash_words(text_objects)
+                    if i < len(previous_pages) and previous_pages[i]['hash'] == page_hash:
+                        sorterte_turnuser = previous_by_page[i]
+                    else:
+                        sorterte_turnuser = self.sort_page(page, text_objects)
+                        self.reprocessed_pages.append(i + 1)
+                    page.close()
+                    self._record_page(page_hash, sorterte_turnuser)
+                    yield page_hash, sorterte_turnuser
+
+        return pages()
+
+    def scrape_page(self, page):
+        """Sort one page. Returns (hash of the page's words, turnuser on the page)."""
+        text_objects = self.page_words(page)
+        return self.hash_words(text_objects), self.sort_page(page, text_objects)
+
+    def _record_page(self, page_hash, sorterte_turnuser):
+        self.page_manifest.append({
+            'hash': page_hash,
+            'turnuser': [navn for turnus in sorterte_turnuser for navn in turnus],
+        })
+
+    @staticmethod
+    def page_words(page):
+        # Henter ut alle objektene i pdf-en med bedre toleranse for å få med komplette tall
+        return page.extract_words(x_tolerance = 3, y_tolerance = 2)
+
+    @staticmethod
+    def hash_words(text_objects):
+        """Hash the text and position of every word, the only page input sort_page uses."""
+        digest = hashlib.sha256()
+        for word in text_objects:
+            digest.update(f"{word['text']}\x1f{word['x0']:.2f}\x1f{word['x1']:.2f}\x1f"
+                          f"{word['top']:.2f}\x1f{word['bottom']:.2f}\x1e".encode('utf-8'))
+        return digest.hexdigest()
+
+    def _sort_pages_parallel(self, pdf_path, workers):
+        """Sort pages in a process pool. Yields one (hash, result list) per page, in page order."""
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        with pdfplumber.open(pdf_path) as pdf:
+            page_count = len(pdf.pages)
+        self.page_count = page_count
+
+        # A few ranges per worker keeps the pool busy when pages differ in cost
+        chunk_size = max(1, -(-page_count // (workers * PAGE_RANGES_PER_WORKER)))
+        ranges = [(start, min(start + chunk_size, page_count))
+                  for start in range(0, page_count, chunk_size)]
+
+        # Spawned, not forked: other threads here (jobs, pipelines) may hold locks
+        with ProcessPoolExecutor(max_workers=workers,
+                                 mp_context=multiprocessing.get_context('spawn')) as executor:
+            # map() yields in submission order, which is page order
+            for range_results in executor.map(_sort_page_range, [pdf_path] * len(ranges), ranges):
+                yield from range_results
     
     def extract_turnus_name(self, text_objects, word_pos):
         """
@@ -141,39 +651,69 @@ class ShiftScraper():
 
 
     
-    def sort_page(self, page):
+    def build_cell_index(self):
+        """
+        Compile the table geometry into sorted interval lists, so a word can be
+        mapped to its (uke, dag) cells with a bisect instead of scanning every
+        week and day.
+        """
+        def intervals(pos_list):
+            items = sorted(((key, verdi) for pos in pos_list for key, verdi in pos.items()),
+                           key=lambda item: item[1][0])
+            return [verdi[0] for _, verdi in items], items
+
+        return {
+            'dag': intervals(self.DAG_POS),
+            1: intervals(self.TURNUS_1_POS),
+            2: intervals(self.TURNUS_2_POS),
+        }
+
+    @staticmethod
+    def lookup_intervals(index, low, high):
+        """
+        Return the keys of all intervals (start, end) where start <= low and
+        high <= end, in the same order as the position lists. Relies on the
+        intervals being sorted with non-decreasing ends, as the tables are.
+        """
+        starts, items = index
+        i = bisect.bisect_right(starts, low) - 1
+        matches = []
+        while i >= 0 and high <= items[i][1][1]:
+            matches.append(items[i][0])
+            i -= 1
+        matches.reverse()
+        return matches
+
+    def sort_page(self, page, text_objects=None):
 
         def sorter_turnus(search_obj):
-            for txt_obj in text_objects:
-                if int(txt_obj['x0']) >= self.DAG_POS[0][1][0] and int(txt_obj['x1']) <= self.DAG_POS[6][7][1]:
-                    # Siler ut hvilken turnus (1 eller 2)
-                    if int(txt_obj['top']) >= self.TURNUS_1_POS[0][1][0] and int(txt_obj['bottom']) <= self.TURNUS_1_POS[5][6][1]:
-                        uker_dag_iterering(txt_obj, self.TURNUS_1_POS, turnus1, search_obj)
-                    elif int(txt_obj['top']) >= self.TURNUS_2_POS[0][1][0] and int(txt_obj['bottom']) <= self.TURNUS_2_POS[5][6][1]:    
-                        uker_dag_iterering(txt_obj, self.TURNUS_2_POS, turnus2, search_obj)
-
-
-        # Sjekker om objektet er innenfor verdiene til tabellen
-        def objektet_innenfor_uke_dag(word, uke_verdi, dag_verdi):
-            return (
-                word['top'] >= uke_verdi[0]
-                and word['bottom'] <= uke_verdi[1]
-                and word['x0'] >= dag_verdi[0]
-                and word['x0'] <= dag_verdi[1]
-                and word['text'] not in self.REMOVE_FILTER
-            )
-        
-        # Pakker ut uker og dager og mater det inn i plasseringslogikk
-        def uker_dag_iterering(text_obj, turnus_pos, turnus, search_obj):
-            for uker in turnus_pos:
-                for uke, uke_verdi in uker.items():
-                    for dager in self.DAG_POS:
-                        for dag, dag_verdi in dager.items():
-                            if objektet_innenfor_uke_dag(text_obj, uke_verdi, dag_verdi):
-                                if search_obj == 'tid':
-                                    plasseringslogikk_tid(text_obj, uke, dag, turnus)
-                                elif search_obj == 'dagsverk':
-                                    plasseringslogikk_dagsverk(text_obj, uke, dag, turnus)
+            for txt_obj, turnus_nr, celler in plasserte_objekter:
+                turnus = turnus1 if turnus_nr == 1 else turnus2
+                for uke, dag in celler:
+                    if search_obj == 'tid':
+                        plasseringslogikk_tid(txt_obj, uke, dag, turnus)
+                    elif search_obj == 'dagsverk':
+                        plasseringslogikk_dagsverk(txt_obj, uke, dag, turnus)
+
+        # Finner hvilken turnus (1 eller 2) og hvilke uke/dag-celler objektet hører til
+        def finn_celler(txt_obj):
+            if txt_obj['text'] in self.REMOVE_FILTER:
+                return None, []
+            if not (int(txt_obj['x0']) >= self.DAG_POS[0][1][0] and int(txt_obj['x1']) <= self.DAG_POS[6][7][1]):
+                return None, []
+            # Siler ut hvilken turnus (1 eller 2)
+            if int(txt_obj['top']) >= self.TURNUS_1_POS[0][1][0] and int(txt_obj['bottom']) <= self.TURNUS_1_POS[5][6][1]:
+                turnus_nr = 1
+            elif int(txt_obj['top']) >= self.TURNUS_2_POS[0][1][0] and int(txt_obj['bottom']) <= self.TURNUS_2_POS[5][6][1]:
+                turnus_nr = 2
+            else:
+                return None, []
+
+            uker = self.lookup_intervals(cell_index[turnus_nr], txt_obj['top'], txt_obj['bottom'])
+            if not uker:
+                return turnus_nr, []
+            dager = self.lookup_intervals(cell_index['dag'], txt_obj['x0'], txt_obj['x0'])
+            return turnus_nr, [(uke, dag) for uke in uker for dag in dager]
 
         def plasseringslogikk_tid(word, uke, dag, turnus):
             # Først, sjekk om teksten inneholder sammenkoblede tider og split dem
@@ -187,22 +727,19 @@ class ShiftScraper():
                     
                     # Check if the word crosses cell boundaries (indicates split shift)
                     # Get the current day's x boundary
-                    for dager in self.DAG_POS:
-                        for d, dag_verdi in dager.items():
-                            if d == dag:
-                                current_dag_x_end = dag_verdi[1]
-                                # If word extends beyond current day's boundary and we split times
-                                if word['x1'] > current_dag_x_end and len(split_times) == 2:
-                                    # First time in current day, second time in next day
-                                    turnus[uke][dag]['tid'].append(split_times[0])
-                                    # Place second time in next day if not Sunday
-                                    if dag < 7:
-                                        turnus[uke][dag+1]['tid'].append(split_times[1])
-                                    elif dag == 7 and uke < 6:
-                                        # Sunday to Monday next week
-                                        turnus[uke+1][1]['tid'].append(split_times[1])
-                                    # Skip normal processing
-                                    return
+                    current_dag_x_end = dag_x_slutt[dag]
+                    # If word extends beyond current day's boundary and we split times
+                    if word['x1'] > current_dag_x_end and len(split_times) == 2:
+                        # First time in current day, second time in next day
+                        turnus[uke][dag]['tid'].append(split_times[0])
+                        # Place second time in next day if not Sunday
+                        if dag < 7:
+                            turnus[uke][dag+1]['tid'].append(split_times[1])
+                        elif dag == 7 and uke < 6:
+                            # Sunday to Monday next week
+                            turnus[uke+1][1]['tid'].append(split_times[1])
+                        # Skip normal processing
+                        return
                     
                     times_to_add = split_times
                 else:
@@ -385,8 +922,17 @@ class ShiftScraper():
             return turnus
 
 
-        # Henter ut alle objektene i pdf-en med bedre toleranse for å få med komplette tall
-        text_objects = page.extract_words(x_tolerance = 3, y_tolerance = 2)
+        if text_objects is None:
+            text_objects = self.page_words(page)
+
+        # Tabellgeometrien kompileres én gang per side, og hvert objekt slås opp én gang
+        cell_index = self.build_cell_index()
+        dag_x_slutt = {dag: dag_verdi[1] for dager in self.DAG_POS for dag, dag_verdi in dager.items()}
+        plasserte_objekter = []
+        for txt_obj in text_objects:
+            turnus_nr, celler = finn_celler(txt_obj)
+            if celler:
+                plasserte_objekter.append((txt_obj, turnus_nr, celler))
 
         turnus_1_navn = None
         turnus_2_navn = None
@@ -413,11 +959,11 @@ class ShiftScraper():
 
         sorterte_turnuser_lst = []
 
-        # Legg til turnuser hvis de ble funnet
+        # Legg til turnuser hvis de ble funnet, med kategori for hver dag
         if turnus_1_navn:
-            sorterte_turnuser_lst.append({turnus_1_navn:turnus1})
+            sorterte_turnuser_lst.append({turnus_1_navn:day_classifier.classify_turnus(turnus1)})
         if turnus_2_navn:
-            sorterte_turnuser_lst.append({turnus_2_navn:turnus2})
+            sorterte_turnuser_lst.append({turnus_2_navn:day_classifier.classify_turnus(turnus2)})
 
         return sorterte_turnuser_lst
 
@@ -427,165 +973,42 @@ class ShiftScraper():
         """Create Excel file with optional custom path"""
         # If year_id is provided and output_path is default, create path in turnusfiler
         if year_id and output_path == 'turnuser_R25.xlsx':
-            import os
-            import sys
-            # Add project root to path to import config
-            project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-            sys.path.insert(0, project_root)
-            from config import AppConfig
-            
-            # Create turnusfiler directory structure
-            turnusfiler_dir = os.path.join(AppConfig.static_dir, 'turnusfiler', year_id.lower())
-            os.makedirs(turnusfiler_dir, exist_ok=True)
-            output_path = os.path.join(turnusfiler_dir, f'turnuser_{year_id}.xlsx')
-        
-        # Lager et DataFrame av turnusene som er lagret i en Dict.
-        df_dict = {}
-        
-        for turnus in self.turnuser:
-            for turnus_navn, turnus_verdi in turnus.items():
-                df_data = {'Uke': [1, 2, 3, 4, 5, 6],
-                'Mandag': [], 'Tirsdag': [], 'Onsdag': [], 'Torsdag': [],
-                'Fredag': [], 'Lørdag': [], 'Søndag': []}
-                
-                # Pakker opp turnuser i uker og dager og legger de i rikigt ukedag
-                for uke in turnus_verdi.values():
-                    for dag in uke.values():
-                        if len(dag['tid']) == 0:
-                            df_data[dag['ukedag']].append('')
-                        else:
-                            df_data[dag['ukedag']].append(" - ".join(dag['tid'])+ " " + dag['dagsverk'])
-                            
-                df_dict.update({turnus_navn : pd.DataFrame(df_data)})
-
-        # Lagrer DataFrame som Excel-fil og lager et sheet i excel-filen per turnus i dataframe
-        with pd.ExcelWriter(output_path, engine='xlsxwriter') as writer:
-            for sheet_name, df in df_dict.items():
-                df.to_excel(writer, sheet_name=sheet_name, index=False)
-                workbook  = writer.book
-                worksheet = writer.sheets[sheet_name]
-                    
-                # Define a format for the cell background color.
-                hdag_format = workbook.add_format({'bg_color': '#dbcc27',
-                                                'font_color': '#000000'})
-                tidlig_format = workbook.add_format({'bg_color': '#7abfff',
-                                                    'font_color': '#000000'})
-                tidlig_kveld_format = workbook.add_format({'bg_color': '#d68f6d',
-                                                    'font_color': '#000000'})
-                kveld_format = workbook.add_format({'bg_color': '#fa7f7f',
-                                                    'font_color': '#000000'})
-                natt_format = workbook.add_format({'bg_color': '#c34fe3',
-                                                    'font_color': '#000000'})
-                turnusfri_format = workbook.add_format({'bg_color': '#13bd57',
-                                                    'font_color': '#000000'})
-                skjult_fridag_format = workbook.add_format({'bg_color': '#cc9fe3',
-                                                    'font_color': '#000000',
-                                                    'border':2,
-                                                    'border_color': '#c34fe3'})
-                
-                centered_format = workbook.add_format({
-                                                    'align': 'center',
-                                                    'valign': 'vcenter',
-                                                    'border':1,
-                                                    'text_wrap': True})
-
-                # Setter høyden på COLUMNS.
-                worksheet.set_column('B:H', 12) 
-                worksheet.set_column('A:A', 4)
-
-                # Setter bredden på ROWS
-                for row in range(1,7):
-                    worksheet.set_row(row, 40)
-                
-                # Apply centered text and borders for the range 'A1:H6'.
-                for row in range(6):
-                    for col, column_label in enumerate(df.columns):
-                        cell_value = df.at[row, column_label]
-                        worksheet.write(row + 1, col, cell_value, centered_format)
+            output_path = turnusfiler_output_path(year_id, 'xlsx')
 
-                
-                # Logikken for formatering av celler.
-                for col in range(1, 8):  # Columns B(1) through H(7)
-                    for row in range(1, 7):  # Rows 2 through 7
-                        cell = xlsxwriter.utility.xl_rowcol_to_cell(row, col)
-
-      
-                        
-                        
-                        ## Formater ##
-                        # H-Dager
-                        worksheet.conditional_format(cell, {'type': 'formula',
-                                                            'criteria': '=RIGHT(' + cell +', 1)="H"',
-                                                            'format': hdag_format})
-                        # Tidligvakt
-                        worksheet.conditional_format(cell, {'type': 'formula',
-                                                            'criteria': '=(VALUE(LEFT(' + cell + ',SEARCH(":",' + cell + ')-1))>=3)' 
-                                                            'AND (VALUE(LEFT(' + cell + ',SEARCH(":",' + cell + ')-1)) < 16)'
-                                                            'AND (VALUE(MID(' + cell + ', SEARCH(":", ' + cell + ', SEARCH(":", ' + cell + ')+1)-2, 2)) < 16)'
-                                                            'AND (VALUE(MID(' + cell + ', SEARCH(":", ' + cell + ', SEARCH(":", ' + cell + ')+1)-2, 2)) > 3)',
-                                                            'format': tidlig_format})
-
-
-                        # Tidlig og kveld
-                        worksheet.conditional_format(cell, {'type': 'formula',
-                                                            'criteria': '=(VALUE(LEFT(' + cell + ',SEARCH(":",' + cell + ')-1))>=3)'
-                                                            'AND (VALUE(LEFT(' + cell + ',SEARCH(":",' + cell + ')-1)) <= 8)'
-                                                            'AND (VALUE(MID(' + cell + ', SEARCH(":", ' + cell + ', SEARCH(":", ' + cell + ')+1)-2, 2)) >= 16)',
-                                                            'format': tidlig_kveld_format})
-                        # Kveld                
-                        worksheet.conditional_format(cell, {'type': 'formula',
-                                                            'criteria': '=(VALUE(LEFT(' + cell + ',SEARCH(":",' + cell + ')-1))>=9)'
-                                                            'AND (VALUE(LEFT(' + cell + ',SEARCH(":",' + cell + ')-1))<=18)',
-                                                            #'AND (VALUE(MID(' + cell + ', SEARCH(":", ' + cell + ', SEARCH(":", ' + cell + ')+1)-2, 2)) >= 16)',
-                                                            'format': kveld_format})
-                        # Natt
-                        worksheet.conditional_format(cell, {'type': 'formula',
-                                                            'criteria': '=(VALUE(LEFT(' + cell + ',SEARCH(":",' + cell + ')-1))>=18)'
-                                                            'AND (VALUE(LEFT(' + cell + ',SEARCH(":",' + cell + ')-1))<=23)',
-                                                            'format': natt_format})
-                        # Tomme celler
-                        worksheet.conditional_format(cell, {'type': 'formula',
-                                                            'criteria': '=(' + cell + '="")',
-                                                            'format': skjult_fridag_format})
-                        # XX, OO og TT celler
-                        worksheet.conditional_format(cell, {'type': 'formula',
-                                                            'criteria': '=(' + cell + '="XX ")' 'OR (' + cell + '="OO ")' 'OR (' + cell + '="TT ")',
-                                                            'format': turnusfri_format})
-        
-        logger.info("Excel file created: %s", output_path)
+        with TurnusExcelWriter(output_path) as writer:
+            for turnus in self.turnuser:
+                writer.write(turnus)
         return output_path
 
-    def create_json(self, output_path='turnuser_R25.json', year_id=None):
+    def create_json(self, output_path='turnuser_R25.json', year_id=None, compact=False):
         """Create JSON file with optional custom path"""
         # If year_id is provided and output_path is default, create path in turnusfiler
         if year_id and output_path == 'turnuser_R25.json':
-            import os
-            import sys
-            # Add project root to path to import config
-            project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-            sys.path.insert(0, project_root)
-            from config import AppConfig
-            
-            # Create turnusfiler directory structure
-            turnusfiler_dir = os.path.join(AppConfig.static_dir, 'turnusfiler', year_id.lower())
-            os.makedirs(turnusfiler_dir, exist_ok=True)
-            output_path = os.path.join(turnusfiler_dir, f'turnuser_{year_id}.json')
+            output_path = turnusfiler_output_path(year_id, 'json')
         
-        with open(output_path, 'w') as f:
-            json.dump(self.turnuser, f, indent=4)
-        logger.info("JSON file created: %s", output_path)
+        with TurnusJsonWriter(output_path, compact=compact) as writer:
+            for turnus in self.turnuser:
+                writer.write(turnus)
+        return output_path
+
+    def create_page_manifest(self, output_path):
+        """Write the per-page hashes used by scrape_pdf_incremental()."""
+        tmp_path = _tmp_path(output_path)
+        with open(tmp_path, 'w') as f:
+            json.dump({'scraper': self.fingerprint_hash(), 'pages': self.page_manifest}, f)
+        os.replace(tmp_path, output_path)
         return output_path
 
 
 if __name__ == '__main__':
     import argparse
-    import os
-    import sys
-    
+
     parser = argparse.ArgumentParser(description='Scrape PDF turnus files and generate JSON and Excel')
     parser.add_argument('pdf_path', help='Path to PDF file to scrape')
     parser.add_argument('year_id', help='Year identifier (e.g., R24, R25, r23)')
     parser.add_argument('--output-dir', help='Custom output directory (default: turnusfiler/year_id)')
+    parser.add_argument('--workers', type=int, default=1, help='Processes to split the pages across (default: 1)')
+    parser.add_argument('--compact', action='store_true', help='Write JSON without indentation')
     
     args = parser.parse_args()
     
@@ -599,24 +1022,22 @@ if __name__ == '__main__':
     print(f"🚀 Scraping PDF: {args.pdf_path}")
     print(f"📅 Year ID: {year_id}")
     
-    # Initialize scraper and process PDF
-    shift_scraper = ShiftScraper()
-    shift_scraper.scrape_pdf(args.pdf_path, year_id)
-    
-    # Create JSON file
+    # Output paths
     if args.output_dir:
-        json_path = os.path.join(args.output_dir, f'turnuser_{year_id}.json')
         os.makedirs(args.output_dir, exist_ok=True)
-        shift_scraper.create_json(json_path)
-    else:
-        json_path = shift_scraper.create_json(year_id=year_id)
-    
-    # Create Excel file
-    if args.output_dir:
+        json_path = os.path.join(args.output_dir, f'turnuser_{year_id}.json')
         excel_path = os.path.join(args.output_dir, f'turnuser_{year_id}.xlsx')
-        shift_scraper.create_excel(excel_path)
     else:
-        excel_path = shift_scraper.create_excel(year_id=year_id)
+        json_path = turnusfiler_output_path(year_id, 'json')
+        excel_path = turnusfiler_output_path(year_id, 'xlsx')
+
+    # Scrape and write JSON and Excel page by page
+    shift_scraper = ShiftScraper()
+    with TurnusJsonWriter(json_path, compact=args.compact) as json_writer, \
+            TurnusExcelWriter(excel_path) as excel_writer:
+        for turnus in shift_scraper.iter_turnuser(args.pdf_path, workers=args.workers):
+            json_writer.write(turnus)
+            excel_writer.write(turnus)
     
     print(f"✅ Scraping completed successfully!")
     print(f"📄 JSON file created: {json_path}")
@@ -0,0 +1,180 @@
+"""
+Strekliste Page Model
+
+Analyses a strekliste PDF once with PyMuPDF and describes each page as a
+plain dict, shared by the image generator (row crops, shift index) and the
+double shift scanner (markers matched to rows):
+
+    width, height    page size in pixels when rendered at PDF_ZOOM
+    source_hash      hash of the page's content stream, size and rotation
+    separator_lines  y of the horizontal separator lines, in rendered pixels
+    shift_rows       shift numbers in the leftmost column, top to bottom:
+                     {nr, nr_base, suffix, full_name, visual_y, visual_x, y_mid}
+    markers          'dobbelt_tur' ("<<"), 'delt_dagsverk' ("**" or text
+                     containing it) and 'single_stars' ("*"), each a list of
+                     {x, y} with y the middle of the word
+
+Positions other than separator_lines are in visual PDF points (top-left
+origin, page rotation applied). Each page's text is extracted once (rawdict,
+so words come with their exact character boxes) and the page is rendered
+once to find the separator lines.
+
+The model is kept in memory per PDF and in the artifact cache under the
+PDF's SHA-256, so it is only built again when the PDF changes.
+
+Usage:
+    model = load_page_model(pdf_path)
+    for page in model['pages']:
+        page['shift_rows'], page['separator_lines'], page['markers']
+"""
+
+import os
+import logging
+import threading
+
+from app.utils.pdf import strekliste_generator
+
+logger = logging.getLogger(__name__)
+
+# Bump when the page model layout or the extraction changes
+ANALYSIS_VERSION = 1
+
+# Loaded page models: pdf_path -> ((mtime, size), model)
+_page_models = {}
+_page_model_lock = threading.Lock()
+
+
+def _with_span_text(blocks: list) -> list:
+    """Give rawdict spans the 'text' of dict spans, so both work with get_shift_rows()."""
+    for block in blocks:
+        for line in block.get('lines', []):
+            for span in line['spans']:
+                span['text'] = ''.join(char['c'] for char in span['chars'])
+    return blocks
+
+
+def _words(blocks: list, transform) -> list:
+    """Whitespace-separated words of every span as {'text', 'x', 'y'} in visual points."""
+    import fitz
+
+    words = []
+    for block in blocks:
+        for line in block.get('lines', []):
+            for span in line['spans']:
+                word = []
+                for char in span['chars'] + [None]:
+                    if char is not None and not char['c'].isspace():
+                        word.append(char)
+                        continue
+                    if word:
+                        rect = fitz.Rect(word[0]['bbox'])
+                        for other in word[1:]:
+                            rect |= fitz.Rect(other['bbox'])
+                        rect = rect * transform
+                        words.append({'text': ''.join(c['c'] for c in word),
+                                      'x': rect.x0, 'y': (rect.y0 + rect.y1) / 2})
+                        word = []
+    return words
+
+
+def _markers(words: list) -> dict:
+    markers = {'dobbelt_tur': [], 'delt_dagsverk': [], 'single_stars': []}
+    for word in words:
+        text = word['text']
+        position = {'x': word['x'], 'y': word['y']}
+        if text == '<<':
+            markers['dobbelt_tur'].append(position)
+        elif '**' in text:
+            markers['delt_dagsverk'].append(position)
+        elif text == '*':
+            markers['single_stars'].append(position)
+    return markers
+
+
+def _span_mid_y(shift: dict, transform) -> float:
+    import fitz
+
+    rect = fitz.Rect(shift['bbox']) * transform
+    return (rect.y0 + rect.y1) / 2
+
+
+def analyze_page(page, zoom: int = strekliste_generator.PDF_ZOOM) -> dict:
+    """Page model of one PyMuPDF page (see the module docstring)."""
+    blocks = _with_span_text(page.get_text('rawdict')['blocks'])
+    transform = ~page.derotation_matrix
+
+    shift_rows = []
+    for shift in strekliste_generator.get_shift_rows(page, blocks):
+        shift_rows.append({
+            'nr': shift['nr'],
+            'nr_base': shift['nr_base'],
+            'suffix': shift['suffix'],
+            'full_name': strekliste_generator.get_full_shift_name(shift),
+            'visual_y': shift['visual_y'],
+            'visual_x': shift['visual_x'],
+            'y_mid': _span_mid_y(shift, transform),
+        })
+
+    page_img, separator_lines, _pix = strekliste_generator._render_page(page, zoom)
+
+    return {
+        'width': page_img.width,
+        'height': page_img.height,
+        'source_hash': strekliste_generator.page_source_hash(page),
+        'separator_lines': [int(y) for y in separator_lines],
+        'shift_rows': shift_rows,
+        'markers': _markers(_words(blocks, transform)),
+    }
+
+
+def analyze_pdf(pdf_path: str, zoom: int = strekliste_generator.PDF_ZOOM) -> dict:
+    """
+    Page model of every page of a strekliste PDF.
+
+    Returns:
+        dict with 'analysis_version', 'zoom', 'pdf_sha256' and 'pages' (one per page, in order)
+    """
+    if not strekliste_generator.FITZ_AVAILABLE or not strekliste_generator.PIL_AVAILABLE:
+        raise RuntimeError("PyMuPDF (fitz), Pillow and NumPy are required but not installed")
+    import fitz
+    from app.utils.artifact_cache import file_sha256
+
+    doc = fitz.open(pdf_path)
+    try:
+        pages = [analyze_page(page, zoom) for page in doc]
+    finally:
+        doc.close()
+
+    return {
+        'analysis_version': ANALYSIS_VERSION,
+        'zoom': zoom,
+        'pdf_sha256': file_sha256(pdf_path),
+        'pages': pages,
+    }
+
+
+def load_page_model(pdf_path: str) -> dict:
+    """
+    Page model of a strekliste PDF, from memory (checked against the PDF's
+    mtime and size), the artifact cache (by SHA-256) or analysed now.
+    Concurrent callers for the same PDF wait for one analysis.
+    """
+    from app.utils.artifact_cache import ArtifactCache, file_sha256
+
+    signature = strekliste_generator._file_signature(pdf_path)
+    with _page_model_lock:
+        cached = _page_models.get(pdf_path)
+        if cached and cached[0] == signature:
+            return cached[1]
+
+        cache = ArtifactCache('strekliste_analysis')
+        key = cache.make_key(ANALYSIS_VERSION, strekliste_generator.PDF_ZOOM, file_sha256(pdf_path))
+        model = cache.load_json(key, 'model.json')
+        if model is None:
+            model = analyze_pdf(pdf_path)
+            cache.put(key, meta={'source': os.path.basename(pdf_path), 'pages': len(model['pages'])},
+                      data={'model.json': model})
+            logger.info("Analysed %s: %d pages", pdf_path, len(model['pages']))
+
+        _page_models[pdf_path] = (signature, model)
+        return model
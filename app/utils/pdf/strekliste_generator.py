@@ -13,22 +13,23 @@ Adapted from the standalone strekliste API.
 import os
 import re
 import io
+import json
+import shutil
+import logging
+import functools
+import threading
+import importlib.util
 from config import AppConfig
 from typing import Optional, Tuple, Dict, Any
 
+logger = logging.getLogger(__name__)
 
-try:
-    import fitz  # PyMuPDF
-    FITZ_AVAILABLE = True
-except ImportError:
-    FITZ_AVAILABLE = False
 
-try:
-    from PIL import Image, ImageDraw, ImageFont
-    import numpy as np
-    PIL_AVAILABLE = True
-except ImportError:
-    PIL_AVAILABLE = False
+# PyMuPDF, Pillow and NumPy are only imported inside the functions that use them,
+# so importing this module (e.g. from the admin blueprint) stays cheap.
+FITZ_AVAILABLE = importlib.util.find_spec('fitz') is not None
+PIL_AVAILABLE = (importlib.util.find_spec('PIL') is not None
+                 and importlib.util.find_spec('numpy') is not None)
 
 
 # Shift numbers appear in the leftmost "Nr." column
@@ -38,6 +39,37 @@ SHIFT_NR_VISUAL_X_MAX = 50  # Shift numbers are within 50 pixels of left edge vi
 # Sets the resolution of the .png files. Higher value = Higher resolution and file size.
 PDF_ZOOM = 4
 
+# Page ranges handed to each process in generate_all_images(workers=N)
+PAGE_RANGES_PER_WORKER = 4
+
+# Smaller encodings of each shift image, served by /api/shift-image?size=...
+# Saved under png/variants/<size>/ as palette PNG and (if supported) WebP.
+# A width of None keeps the full rendered width.
+IMAGE_VARIANT_WIDTHS = {'thumb': 600, 'screen': 1200, 'print': None}
+VARIANTS_DIR = 'variants'
+PALETTE_COLORS = 64  # Strekliste rows are a few flat colours plus anti-aliasing
+WEBP_QUALITY = 80
+
+# Height of the hour ruler above each shift image, at zoom 3 (scaled with the zoom)
+RULER_HEIGHT = 30
+
+# Bump when the crop or the ruler drawing changes, so generate_all_images renders every row again
+IMAGE_RENDER_VERSION = 1
+
+# Rendered pages kept in memory for render_shift_image (about 24 MB each at PDF_ZOOM=4)
+PAGE_CACHE_SIZE = 4
+
+# Bump when the shift index layout or the crop logic changes, so persisted indexes are rebuilt
+SHIFT_INDEX_VERSION = 1
+
+# Loaded shift indexes: pdf_path -> (signatures of the PDF and index file, _ShiftIndex or None)
+_shift_indexes = {}
+_shift_index_lock = threading.Lock()
+
+# Loaded image manifests: manifest_path -> ((mtime, size), manifest)
+_image_manifests = {}
+_image_manifest_lock = threading.Lock()
+
 
 def get_paths(version: str) -> dict:
     """
@@ -47,7 +79,7 @@ def get_paths(version: str) -> dict:
         version: The turnus version identifier (e.g., 'r26')
 
     Returns:
-        dict with 'pdf_path', 'images_dir', and 'exists' status
+        dict with 'pdf_path', 'images_dir', 'index_path', and 'exists' status
     """
     version = version.lower()
     base_dir = os.path.join(AppConfig.turnusfiler_dir, version, 'streklister')
@@ -57,6 +89,8 @@ def get_paths(version: str) -> dict:
     return {
         'pdf_path': pdf_path,
         'images_dir': images_dir,
+        'index_path': os.path.join(base_dir, f'shift_index_{version}.json'),
+        'manifest_path': os.path.join(images_dir, 'manifest.json'),
         'pdf_exists': os.path.exists(pdf_path),
         'images_dir_exists': os.path.exists(images_dir)
     }
@@ -98,18 +132,22 @@ def get_strekliste_status(version: str) -> dict:
     }
 
 
-def get_shift_rows(page) -> list:
+def get_shift_rows(page, blocks: list | None = None) -> list:
     """
     Find all shift numbers and their visual y-positions on a page.
     Handles page rotation by transforming coordinates.
     Returns list of dicts with {nr, nr_base, visual_y, bbox, suffix} sorted by visual y position.
+
+    blocks are the page's text blocks if already extracted (spans need 'text' and 'bbox').
     """
     if not FITZ_AVAILABLE:
         raise RuntimeError("PyMuPDF (fitz) is required but not installed")
+    import fitz
 
     shifts = []
     leftmost_texts = []  # All text in leftmost column for suffix detection
-    blocks = page.get_text("dict")["blocks"]
+    if blocks is None:
+        blocks = page.get_text("dict")["blocks"]
     pattern = re.compile(r'^(\d{4,5})(?:-.*)?$')
 
     # Get transformation matrix from PDF coords to visual coords
@@ -213,7 +251,7 @@ def find_row_bounds(page, shift_nr: str) -> tuple | None:
         visual_height = page.rect.height
 
     for i, shift in enumerate(shifts):
-        if shift["nr"] == shift_nr or shift["nr_base"] == shift_nr or shift_nr in shift["nr"]:
+        if _shift_matches(shift, shift_nr):
             # Top of row: slightly above this shift
             y_top = shift["visual_y"] - 5
 
@@ -236,51 +274,73 @@ def find_separator_lines(img, min_thickness: int = 2, max_brightness: int = 100)
     and where the darkest row in the group has mean brightness below max_brightness.
     Real separator lines span most of the page width, giving very low mean brightness
     (typically 30-80), while text/content rows are much brighter (140-180).
+
+    img is a PIL image or a 2-D grayscale NumPy array, which is used as is.
     """
     if not PIL_AVAILABLE:
         return []
+    import numpy as np
 
-    gray = img.convert('L')
-    arr = np.array(gray)
-    row_brightness = np.mean(arr, axis=1)
+    if isinstance(img, np.ndarray):
+        arr = img
+    else:
+        arr = grayscale_array(img)
+    # Integer row sums are exact and several times faster than np.mean's float accumulation
+    row_brightness = arr.sum(axis=1, dtype=np.uint32) / arr.shape[1]
 
     threshold = 180
-    dark_rows = np.where(row_brightness < threshold)[0]
+    dark_rows = np.flatnonzero(row_brightness < threshold)
 
     if len(dark_rows) == 0:
         return []
 
-    # Group consecutive dark rows and filter by thickness + darkness
-    lines = []
-    start = dark_rows[0]
-    prev = dark_rows[0]
-
-    for row in dark_rows[1:]:
-        if row - prev > 3:  # Gap indicates a new line
-            thickness = prev - start + 1
-            if thickness >= min_thickness:
-                # Check that at least one row in the group is truly dark
-                # (real separator lines have very low mean brightness)
-                group_min_brightness = np.min(row_brightness[start:prev + 1])
-                if group_min_brightness < max_brightness:
-                    lines.append((start + prev) // 2)
-            start = row
-        prev = row
-
-    # Don't forget the last group
-    thickness = prev - start + 1
-    if thickness >= min_thickness:
-        group_min_brightness = np.min(row_brightness[start:prev + 1])
-        if group_min_brightness < max_brightness:
-            lines.append((start + prev) // 2)
-
-    return lines
-
-
-def create_hour_ruler(width: int, height: int = 30, zoom: int = 1) -> Image.Image | None:
-    """Create a horizontal ruler showing hours 0-23."""
+    # Group consecutive dark rows (a gap of more than 3 rows starts a new line)
+    group_starts = np.concatenate(([0], np.flatnonzero(np.diff(dark_rows) > 3) + 1))
+    group_ends = np.concatenate((group_starts[1:], [len(dark_rows)])) - 1
+    first_rows = dark_rows[group_starts]
+    last_rows = dark_rows[group_ends]
+
+    # Keep groups that are thick enough and where at least one row is truly dark
+    # (real separator lines have very low mean brightness). Rows in the gaps are
+    # brighter than the threshold, so the minimum over the dark rows is the group's minimum.
+    group_min_brightness = np.minimum.reduceat(row_brightness[dark_rows], group_starts)
+    keep = (last_rows - first_rows + 1 >= min_thickness) & (group_min_brightness < max_brightness)
+
+    return ((first_rows[keep] + last_rows[keep]) // 2).tolist()
+
+
+def pixmap_to_image(pix):
+    """
+    Wrap a PyMuPDF pixmap's samples as a PIL image without encoding to PNG
+    and decoding again. The image shares the pixmap's memory where Pillow
+    allows it, so keep the pixmap alive while the image is in use.
+    """
+    from PIL import Image
+
+    mode = {1: 'L', 3: 'RGB', 4: 'RGBA'}[pix.n]
+    return Image.frombuffer(mode, (pix.width, pix.height), pix.samples_mv, 'raw', mode, pix.stride, 1)
+
+
+def grayscale_array(img):
+    """Grayscale NumPy array of a PIL image (Pillow's luma conversion, converted once)."""
+    import numpy as np
+
+    gray = img if img.mode == 'L' else img.convert('L')
+    return np.asarray(gray)
+
+
+@functools.lru_cache(maxsize=16)
+def create_hour_ruler(width: int, height: int = RULER_HEIGHT, zoom: int = 1) -> Image.Image | None:
+    """
+    Create a horizontal ruler showing hours 0-23.
+
+    Memoized per (width, height, zoom): every row of a strekliste has the same
+    width, so one ruler is drawn and pasted into all of them. The returned
+    image is shared, so don't draw on it.
+    """
     if not PIL_AVAILABLE:
         return None
+    from PIL import Image, ImageDraw, ImageFont
 
     # Scale height with zoom for proportional appearance
     scaled_height = int(height * zoom / 3)
@@ -313,129 +373,451 @@ def create_hour_ruler(width: int, height: int = 30, zoom: int = 1) -> Image.Imag
 
 
 def render_shift_image(shift_nr: str, version: str) -> bytes | None:
-    """Render a shift row as PNG image bytes."""
+    """
+    Render a shift row as PNG image bytes.
+
+    The shift is looked up in the shift index written by the import pipeline,
+    and the page is taken from a small cache of rendered pages, so this is one
+    crop. Without an up-to-date index only the page with the shift is rendered
+    (see _render_unindexed_shift).
+    """
     if not FITZ_AVAILABLE or not PIL_AVAILABLE:
         return None
 
+    index = load_shift_index(version)
+    if index is None:
+        combined = _render_unindexed_shift(shift_nr, version)
+        if combined is None:
+            return None
+    else:
+        shift = find_indexed_shift(index, shift_nr)
+        if shift is None:
+            return None
+
+        pdf_path = get_paths(version)['pdf_path']
+        page_img, _pix = _rasterized_page(pdf_path, _file_signature(pdf_path), shift['page'], index['zoom'])
+        combined = _add_hour_ruler(page_img.crop(tuple(shift['crop_box'])), index['zoom'])
+
+    # Convert back to bytes
+    output = io.BytesIO()
+    combined.save(output, format="PNG")
+    return output.getvalue()
+
+
+def _shift_matches(shift: dict, shift_nr: str) -> bool:
+    return shift["nr"] == shift_nr or shift["nr_base"] == shift_nr or shift_nr in shift["nr"]
+
+
+def _render_unindexed_shift(shift_nr: str, version: str):
+    """
+    A shift row with the hour ruler, for a PDF with no shift index yet: pages
+    are searched by their text until the shift is found, and only that page is
+    rendered. None if the PDF has no such shift.
+    """
+    import fitz
+
+    doc = fitz.open(get_paths(version)['pdf_path'])
+    try:
+        for page in doc:
+            shifts = get_shift_rows(page)
+            shift = next((shift for shift in shifts if _shift_matches(shift, shift_nr)), None)
+            if shift is not None:
+                page_img, separator_lines, _pix = _render_page(page)
+                return _crop_shift_image(page_img, separator_lines, shift)
+    finally:
+        doc.close()
+    return None
+
+
+def get_all_shifts(version: str) -> list:
+    """Get all shifts from the PDF with their full info (shift rows of the page model)."""
+    if not FITZ_AVAILABLE or not PIL_AVAILABLE:
+        return []
+    from app.utils.pdf.strekliste_analysis import load_page_model
+
+    paths = get_paths(version)
+    if not paths['pdf_exists']:
+        return []
+
+    all_shifts = []
+    seen = set()
+    for page in load_page_model(paths['pdf_path'])['pages']:
+        for shift in page['shift_rows']:
+            if shift['full_name'] not in seen:
+                seen.add(shift['full_name'])
+                all_shifts.append(shift)
+    return all_shifts
+
+
+def build_shift_index(version: str) -> dict:
+    """
+    Build an index of every shift row in the strekliste PDF: its page, its
+    position on the page, its neighbouring rows (the shift rows directly above
+    and below it on the same page, as used by dobbelt tur pairs) and its crop
+    box in the page rendered at PDF_ZOOM. Built from the page model, so no
+    page is rendered here.
+
+    Returns:
+        dict with 'index_version', 'zoom', 'pdf_sha256', 'page_count',
+        'pages': [{'width', 'height', 'separator_lines'}] and
+        'shifts': full shift name ->
+        {'nr', 'nr_base', 'page', 'row', 'visual_y', 'previous', 'next', 'crop_box'}
+    """
+    if not FITZ_AVAILABLE or not PIL_AVAILABLE:
+        raise RuntimeError("PyMuPDF (fitz), Pillow and NumPy are required but not installed")
+    from app.utils.pdf.strekliste_analysis import load_page_model
+
+    model = load_page_model(get_paths(version)['pdf_path'])
+    pages = []
+    index = {}
+
+    for page_num, page in enumerate(model['pages']):
+        rows = page['shift_rows']
+        separator_lines = page['separator_lines']
+        pages.append({'width': page['width'], 'height': page['height'],
+                      'separator_lines': separator_lines})
+
+        names = [shift['full_name'] for shift in rows]
+        for row, (shift, full_name) in enumerate(zip(rows, names)):
+            if full_name in index:
+                continue
+            index[full_name] = {
+                'nr': shift['nr'],
+                'nr_base': shift['nr_base'],
+                'page': page_num,
+                'row': row,
+                'visual_y': round(shift['visual_y'], 2),
+                'previous': names[row - 1] if row > 0 else None,
+                'next': names[row + 1] if row < len(names) - 1 else None,
+                'crop_box': get_crop_box(page['width'], page['height'], separator_lines,
+                                         shift['visual_y']),
+            }
+
+    return {
+        'index_version': SHIFT_INDEX_VERSION,
+        'zoom': PDF_ZOOM,
+        'pdf_sha256': model['pdf_sha256'],
+        'page_count': len(pages),
+        'pages': pages,
+        'shifts': index,
+    }
+
+
+def write_shift_index(version: str) -> dict:
+    """Build the shift index and write it to the index_path from get_paths()."""
     paths = get_paths(version)
-    pdf_path = paths['pdf_path']
+    index = build_shift_index(version)
+    tmp_path = f"{paths['index_path']}.tmp-{os.getpid()}-{threading.get_ident()}"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False)
+    os.replace(tmp_path, paths['index_path'])
+    return {'success': True, 'path': paths['index_path'], 'shifts': len(index['shifts']),
+            'page_count': index['page_count']}
+
+
+def _file_signature(path: str) -> tuple:
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class _ShiftIndex(dict):
+    """A loaded shift index, with the first shift in PDF order for each number and base number."""
+
+    def __init__(self, index: dict):
+        super().__init__(index)
+        self.by_nr = {}
+        self.by_nr_base = {}
+        for shift in index['shifts'].values():
+            self.by_nr.setdefault(shift['nr'], shift)
+            self.by_nr_base.setdefault(shift['nr_base'], shift)
+
+
+def _read_shift_index(paths: dict) -> _ShiftIndex | None:
+    """The persisted index, or None if it is missing or was not built from this PDF at PDF_ZOOM."""
+    from app.utils.artifact_cache import file_sha256
 
-    if not os.path.exists(pdf_path):
+    try:
+        with open(paths['index_path'], 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if (index.get('index_version') != SHIFT_INDEX_VERSION or index.get('zoom') != PDF_ZOOM
+            or index.get('pdf_sha256') != file_sha256(paths['pdf_path'])):
         return None
+    return _ShiftIndex(index)
+
+
+def load_shift_index(version: str) -> dict | None:
+    """
+    Return the shift index for a version's strekliste PDF, as written by
+    write_shift_index() (the import pipeline's shift_index stage). None without
+    a PDF, or when the index is missing or out of date; it is never built here.
+
+    Kept in memory per PDF and read again when the PDF or the index file changes.
+    """
+    paths = get_paths(version)
+    if not paths['pdf_exists']:
+        return None
+    try:
+        index_signature = _file_signature(paths['index_path'])
+    except OSError:
+        index_signature = None
+    signature = (_file_signature(paths['pdf_path']), index_signature)
+
+    with _shift_index_lock:
+        cached = _shift_indexes.get(paths['pdf_path'])
+    if cached and cached[0] == signature:
+        return cached[1]
 
-    # Crop margins (base values for zoom=1, will be scaled)
-    x_left_base = 22
-    x_right_crop_base = 271  # Amount to crop from right side
+    # Read outside the lock; a missing or stale index is remembered too, so it isn't checked per request
+    index = _read_shift_index(paths) if index_signature else None
+    if index is None:
+        logger.warning("No up-to-date shift index for %s; run the shift_index import stage", version)
+    with _shift_index_lock:
+        _shift_indexes[paths['pdf_path']] = (signature, index)
+    return index
+
+
+def find_indexed_shift(index: dict, shift_nr: str) -> dict | None:
+    """
+    Shift matching shift_nr: the full number, else the base number (dict
+    lookups), else the first shift in PDF order whose number contains it.
+    """
+    shift = index.by_nr.get(shift_nr) or index.by_nr_base.get(shift_nr)
+    if shift is not None:
+        return shift
+    for shift in index['shifts'].values():
+        if shift_nr in shift["nr"]:
+            return shift
+    return None
+
+
+@functools.lru_cache(maxsize=PAGE_CACHE_SIZE)
+def _rasterized_page(pdf_path: str, signature: tuple, page_num: int, zoom: int) -> tuple:
+    """
+    A page rendered at zoom as (PIL image, pixmap), kept in a small LRU cache.
+    signature (mtime, size) is part of the key so a replaced PDF is rendered again.
+    """
+    import fitz
 
     doc = fitz.open(pdf_path)
+    try:
+        pix = doc[page_num].get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+    finally:
+        doc.close()
+    return pixmap_to_image(pix), pix
 
-    for page_num in range(len(doc)):
-        page = doc[page_num]
-        bounds = find_row_bounds(page, shift_nr)
 
-        if bounds:
-            y_approx_top, y_approx_bottom, shift_info = bounds
+def _render_page(page, zoom: int = PDF_ZOOM) -> tuple:
+    """
+    Render a page at the given zoom and detect its separator lines.
 
-            zoom = PDF_ZOOM
-            mat = fitz.Matrix(zoom, zoom)
-            pix = page.get_pixmap(matrix=mat)
+    Returns:
+        (PIL image, separator lines, pixmap). The image wraps the pixmap's
+        samples, so the pixmap is returned to keep it alive alongside it.
+    """
+    import fitz
 
-            # Convert to PIL
-            img = Image.open(io.BytesIO(pix.tobytes("png")))
+    mat = fitz.Matrix(zoom, zoom)
+    pix = page.get_pixmap(matrix=mat)
+    page_img = pixmap_to_image(pix)
+    return page_img, find_separator_lines(grayscale_array(page_img)), pix
 
-            # Detect separator lines in the image
-            separator_lines = find_separator_lines(img)
 
-            # Find the shift's approximate y position in image coordinates
-            shift_y = int(shift_info["visual_y"] * zoom)
+def get_crop_box(width: int, height: int, separator_lines: list, visual_y: float,
+                 zoom: int = PDF_ZOOM) -> tuple:
+    """
+    Crop box (left, top, right, bottom) in rendered page pixels for the row of a
+    shift number at visual_y: between the separator lines above and below it.
+    """
+    # Crop margins (base values for zoom=1, scaled by zoom)
+    x_left = int(22 * zoom)
+    x_right_crop = int(271 * zoom)
 
-            # Scale crop margins by zoom level
-            x_left = int(x_left_base * zoom)
-            x_right_crop = int(x_right_crop_base * zoom)
+    # Find the shift's approximate y position in image coordinates
+    shift_y = int(visual_y * zoom)
 
-            # Find the separator line just above this shift (top boundary)
-            lines_above = [y for y in separator_lines if y < shift_y]
-            y_top = max(lines_above) if lines_above else max(0, shift_y - int(10 * zoom))
+    # Find the separator line just above this shift (top boundary)
+    lines_above = [y for y in separator_lines if y < shift_y]
+    y_top = max(lines_above) if lines_above else max(0, shift_y - int(10 * zoom))
 
-            # Find the separator line just below this shift (bottom boundary)
-            lines_below = [y for y in separator_lines if y > shift_y]
-            y_bottom = min(lines_below) + 2 if lines_below else min(img.height, shift_y + int(40 * zoom))
+    # Find the separator line just below this shift (bottom boundary)
+    lines_below = [y for y in separator_lines if y > shift_y]
+    y_bottom = min(lines_below) + 2 if lines_below else min(height, shift_y + int(40 * zoom))
 
-            crop_box = (
-                x_left,
-                y_top,
-                img.width - x_right_crop,
-                y_bottom
-            )
+    return (x_left, int(y_top), width - x_right_crop, int(y_bottom))
 
-            cropped = img.crop(crop_box)
 
-            # Create and attach hour ruler
-            ruler = create_hour_ruler(cropped.width, zoom=zoom)
-            if ruler is not None:
-                combined = Image.new('RGB', (cropped.width, cropped.height + ruler.height), 'white')
-                combined.paste(ruler, (0, 0))
-                combined.paste(cropped, (0, ruler.height))
-            else:
-                combined = cropped
+def _add_hour_ruler(cropped, zoom: int = PDF_ZOOM):
+    """Put the hour ruler on top of a cropped shift row."""
+    from PIL import Image
 
-            # Convert back to bytes
-            output = io.BytesIO()
-            combined.save(output, format="PNG")
-            img_bytes = output.getvalue()
+    ruler = create_hour_ruler(cropped.width, zoom=zoom)
+    if ruler is None:
+        return cropped
 
-            doc.close()
-            return img_bytes
+    combined = Image.new('RGB', (cropped.width, cropped.height + ruler.height), 'white')
+    combined.paste(ruler, (0, 0))
+    combined.paste(cropped, (0, ruler.height))
+    return combined
 
-    doc.close()
-    return None
 
+def _crop_shift_image(page_img, separator_lines: list, shift: dict, zoom: int = PDF_ZOOM):
+    """
+    Crop a shift's row out of a rendered page, between the separator lines
+    above and below the shift number, and put the hour ruler on top.
+    """
+    crop_box = get_crop_box(page_img.width, page_img.height, separator_lines, shift["visual_y"], zoom)
+    return _add_hour_ruler(page_img.crop(crop_box), zoom)
 
-def get_all_shifts(version: str) -> list:
-    """Get all shifts from the PDF with their full info."""
-    if not FITZ_AVAILABLE:
-        return []
 
-    paths = get_paths(version)
-    pdf_path = paths['pdf_path']
+def save_image_variants(img, images_dir: str, full_name: str) -> None:
+    """
+    Save the compact variants of a shift image: for each width in
+    IMAGE_VARIANT_WIDTHS a palette-quantized PNG and a WebP.
+    """
+    from PIL import Image, features
 
-    if not os.path.exists(pdf_path):
-        return []
+    webp = features.check('webp')
+    # Widest first, so each smaller width is resized from the previous one instead of the original
+    resized = img
+    for size, width in sorted(IMAGE_VARIANT_WIDTHS.items(), key=lambda item: -(item[1] or img.width)):
+        variant_dir = os.path.join(images_dir, VARIANTS_DIR, size)
+        os.makedirs(variant_dir, exist_ok=True)
 
-    doc = fitz.open(pdf_path)
-    all_shifts = []
-    seen = set()
+        if width and resized.width > width:
+            resized = resized.resize((width, max(1, round(img.height * width / img.width))), Image.LANCZOS)
+
+        quantized = resized.quantize(colors=PALETTE_COLORS, method=Image.Quantize.FASTOCTREE)
+        quantized.save(os.path.join(variant_dir, f'{full_name}.png'), format='PNG', optimize=True)
+        if webp:
+            resized.save(os.path.join(variant_dir, f'{full_name}.webp'), format='WEBP',
+                         quality=WEBP_QUALITY, method=2)
+
+
+def _has_image_variants(images_dir: str, full_name: str) -> bool:
+    return all(os.path.exists(os.path.join(images_dir, VARIANTS_DIR, size, f'{full_name}.png'))
+               for size in IMAGE_VARIANT_WIDTHS)
+
+
+def _remove_image_files(images_dir: str, full_name: str) -> None:
+    """Remove a shift's PNG and all its variants."""
+    paths = [os.path.join(images_dir, f'{full_name}.png')]
+    for size in IMAGE_VARIANT_WIDTHS:
+        for extension in ('png', 'webp'):
+            paths.append(os.path.join(images_dir, VARIANTS_DIR, size, f'{full_name}.{extension}'))
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def page_source_hash(page) -> str:
+    """Hash of what a page draws: its content stream, size and rotation."""
+    import hashlib
+
+    digest = hashlib.sha256(page.read_contents())
+    digest.update(repr((tuple(page.rect), page.rotation)).encode())
+    return digest.hexdigest()
 
-    for page_num in range(len(doc)):
-        page = doc[page_num]
-        shifts = get_shift_rows(page)
 
+def row_source_hash(page_hash: str, shifts: list, row: int) -> str:
+    """
+    Hash of everything a shift image is made from: the page's content, the
+    row's bounds (its own and its neighbours' shift number positions, which
+    place the separator lines it is cropped between), the zoom and the
+    ruler, crop and variant settings. The image only needs rendering again
+    when this changes.
+    """
+    import hashlib
+
+    bounds = [round(shifts[i]['visual_y'], 2) if 0 <= i < len(shifts) else None
+              for i in (row - 1, row, row + 1)]
+    source = [IMAGE_RENDER_VERSION, PDF_ZOOM, RULER_HEIGHT, IMAGE_VARIANT_WIDTHS, PALETTE_COLORS,
+              WEBP_QUALITY, page_hash, bounds]
+    return hashlib.sha256(json.dumps(source, sort_keys=True).encode()).hexdigest()
+
+
+def _previous_image_sources(version: str) -> dict:
+    """Row source hashes recorded in the image manifest: filename stem -> hash."""
+    try:
+        with open(get_paths(version)['manifest_path'], 'r', encoding='utf-8') as f:
+            images = json.load(f)['images']
+    except (OSError, ValueError, KeyError):
+        return {}
+    return {stem: image['source'] for stem, image in images.items() if image.get('source')}
+
+
+def _generate_page_images(doc, page_num: int, separator_lines: list, shifts: list, images_dir: str):
+    """
+    Render one page once and save the image of each given shift on it,
+    cropped between the page's separator lines from the page model.
+    Yields (full_name, error) per shift, error being None on success.
+    """
+    import fitz
+
+    try:
+        pix = doc[page_num].get_pixmap(matrix=fitz.Matrix(PDF_ZOOM, PDF_ZOOM))
+        page_img = pixmap_to_image(pix)
+    except Exception as e:
         for shift in shifts:
-            full_name = get_full_shift_name(shift)
-            if full_name not in seen:
-                seen.add(full_name)
-                all_shifts.append(shift)
+            yield shift['full_name'], str(e)
+        return
 
-    doc.close()
-    return all_shifts
+    for shift in shifts:
+        try:
+            combined = _crop_shift_image(page_img, separator_lines, shift)
+            combined.save(os.path.join(images_dir, f"{shift['full_name']}.png"), format="PNG")
+            save_image_variants(combined, images_dir, shift['full_name'])
+        except Exception as e:
+            yield shift['full_name'], str(e)
+        else:
+            yield shift['full_name'], None
 
 
-def generate_all_images(version: str, force: bool = False, progress_callback=None) -> dict:
+def _generate_page_range(pdf_path: str, images_dir: str, pages: list) -> list:
+    """
+    Process pool worker: generate images for [(page_num, separator_lines, shifts), ...]
+    with its own document handle.
+    """
+    import fitz
+
+    doc = fitz.open(pdf_path)
+    try:
+        return [result
+                for page_num, separator_lines, shifts in pages
+                for result in _generate_page_images(doc, page_num, separator_lines, shifts, images_dir)]
+    finally:
+        doc.close()
+
+
+def generate_all_images(version: str, force: bool = False, progress_callback=None,
+                        workers: int | None = None) -> dict:
     """
     Pre-generate images for all shifts.
 
+    Incremental: each image is recorded in the image manifest with the hash
+    of its source (see row_source_hash()), and only rows whose hash changed
+    or that have no image are rendered, so a corrected PDF only redraws the
+    pages that differ. Images of shifts no longer in the PDF are deleted.
+
     Optimized to process page-by-page instead of shift-by-shift:
-    - Opens PDF once
-    - Renders each page once (reused for all shifts on that page)
-    - Detects separator lines once per page
+    - Takes the shift rows and separator lines from the page model
+      (strekliste_analysis), which is only built again for a new PDF
+    - Opens PDF once (per worker process)
+    - Renders each page that has rows to redraw once (reused for all shifts on that page)
+
+    With workers > 1, pages are split into ranges that are rendered in a
+    process pool, each process with its own document handle. Progress is
+    reported as each range finishes.
 
     Args:
         version: The turnus version (e.g., 'r26')
-        force: If True, regenerate even if images already exist
+        force: If True, delete all images and regenerate every row
         progress_callback: Optional callback function(current, total, shift_nr)
+        workers: Number of processes (default 1: render in this process)
 
     Returns:
-        dict with 'success', 'generated', 'skipped', 'errors', 'total'
+        dict with 'success', 'generated', 'skipped' (unchanged), 'removed', 'errors', 'total'
     """
     if not FITZ_AVAILABLE:
         return {'success': False, 'error': 'PyMuPDF (fitz) is not installed'}
@@ -443,6 +825,9 @@ def generate_all_images(version: str, force: bool = False, progress_callback=Non
     if not PIL_AVAILABLE:
         return {'success': False, 'error': 'Pillow (PIL) is not installed'}
 
+    import fitz
+    from app.utils.pdf.strekliste_analysis import load_page_model
+
     paths = get_paths(version)
 
     if not paths['pdf_exists']:
@@ -456,117 +841,250 @@ def generate_all_images(version: str, force: bool = False, progress_callback=Non
         for filename in os.listdir(paths['images_dir']):
             if filename.endswith('.png'):
                 os.remove(os.path.join(paths['images_dir'], filename))
+        shutil.rmtree(os.path.join(paths['images_dir'], VARIANTS_DIR), ignore_errors=True)
 
-    # Open PDF once
-    doc = fitz.open(paths['pdf_path'])
+    model = load_page_model(paths['pdf_path'])
 
-    # Collect all shifts with their page numbers in a single pass
+    # Collect all shifts with their page numbers and source hashes
     all_shifts = []
     seen = set()
 
-    for page_num in range(len(doc)):
-        page = doc[page_num]
-        shifts = get_shift_rows(page)
-
-        for shift in shifts:
-            full_name = get_full_shift_name(shift)
+    for page_num, page in enumerate(model['pages']):
+        shifts = page['shift_rows']
+        for row, shift in enumerate(shifts):
+            full_name = shift['full_name']
             if full_name not in seen:
                 seen.add(full_name)
-                shift['page_num'] = page_num
-                shift['full_name'] = full_name
-                all_shifts.append(shift)
+                all_shifts.append({**shift, 'page_num': page_num,
+                                   'source': row_source_hash(page['source_hash'], shifts, row)})
 
     total = len(all_shifts)
-    generated = []
     skipped = []
-    errors = []
-
-    # Crop margins (base values for zoom=1, will be scaled)
-    zoom = PDF_ZOOM
-    x_left = int(22 * zoom)
-    x_right_crop = int(271 * zoom)
+    done = 0
+
+    # Images of shifts that are no longer in the PDF
+    removed = sorted(filename[:-len('.png')] for filename in os.listdir(paths['images_dir'])
+                     if filename.endswith('.png') and filename[:-len('.png')] not in seen)
+    for full_name in removed:
+        _remove_image_files(paths['images_dir'], full_name)
+
+    previous_sources = {} if force else _previous_image_sources(version)
+
+    # Group the shifts whose image is missing or out of date by page, in page order
+    pages = {}
+    for shift in all_shifts:
+        img_path = os.path.join(paths['images_dir'], f"{shift['full_name']}.png")
+        if previous_sources.get(shift['full_name']) == shift['source'] and os.path.exists(img_path):
+            # Images from before variants existed get them from the saved PNG
+            if not _has_image_variants(paths['images_dir'], shift['full_name']):
+                from PIL import Image
+                with Image.open(img_path) as img:
+                    save_image_variants(img.convert('RGB'), paths['images_dir'], shift['full_name'])
+            skipped.append(shift['full_name'])
+            done += 1
+            if progress_callback:
+                progress_callback(done, total, shift['full_name'])
+        else:
+            pages.setdefault(shift['page_num'], []).append(shift)
+    pages = [(page_num, model['pages'][page_num]['separator_lines'], shifts)
+             for page_num, shifts in pages.items()]
 
-    # Page-level cache
-    current_page_num = None
-    page_img = None
-    separator_lines = None
+    results = {}  # full_name -> error message, or None when generated
 
-    for idx, shift in enumerate(all_shifts):
-        full_name = shift['full_name']
-        img_path = os.path.join(paths['images_dir'], f"{full_name}.png")
+    if not workers or workers <= 1 or len(pages) <= 1:
+        doc = fitz.open(paths['pdf_path'])
+        try:
+            for page_num, separator_lines, shifts in pages:
+                for full_name, error in _generate_page_images(doc, page_num, separator_lines, shifts,
+                                                              paths['images_dir']):
+                    results[full_name] = error
+                    done += 1
+                    if progress_callback:
+                        progress_callback(done, total, full_name)
+        finally:
+            doc.close()
+    else:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor, as_completed
 
-        if os.path.exists(img_path) and not force:
-            skipped.append(full_name)
-            if progress_callback:
-                progress_callback(idx + 1, total, full_name)
-            continue
+        # A few ranges per worker keeps the pool busy when pages differ in cost
+        chunk_size = max(1, -(-len(pages) // (workers * PAGE_RANGES_PER_WORKER)))
+        ranges = [pages[i:i + chunk_size] for i in range(0, len(pages), chunk_size)]
 
+        # Spawned, not forked: other threads here (jobs, pipelines) may hold locks
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
         try:
-            # Only re-render page if we moved to a new page
-            if shift['page_num'] != current_page_num:
-                current_page_num = shift['page_num']
-                page = doc[current_page_num]
+            futures = [executor.submit(_generate_page_range, paths['pdf_path'], paths['images_dir'], page_range)
+                       for page_range in ranges]
+            for future in as_completed(futures):
+                for full_name, error in future.result():
+                    results[full_name] = error
+                    done += 1
+                    if progress_callback:
+                        progress_callback(done, total, full_name)
+        finally:
+            # Don't start queued ranges if a callback raised (e.g. job cancelled)
+            executor.shutdown(cancel_futures=True)
+
+    # Same order as the shifts appear in the PDF, whichever process made them
+    generated = [s['full_name'] for s in all_shifts if s['full_name'] in results and results[s['full_name']] is None]
+    errors = [{'shift_nr': s['full_name'], 'error': results[s['full_name']]}
+              for s in all_shifts if results.get(s['full_name']) is not None]
+
+    # Rows that failed get no source hash, so the next run tries them again
+    write_image_manifest(version, sources={s['full_name']: s['source'] for s in all_shifts
+                                           if results.get(s['full_name']) is None})
 
-                # Render page once
-                mat = fitz.Matrix(zoom, zoom)
-                pix = page.get_pixmap(matrix=mat)
-                page_img = Image.open(io.BytesIO(pix.tobytes("png")))
+    return {
+        'success': True,
+        'generated': generated,
+        'skipped': skipped,
+        'removed': removed,
+        'errors': errors,
+        'total': total
+    }
 
-                # Detect separator lines once per page
-                separator_lines = find_separator_lines(page_img)
 
-            # Safety check: ensure page was rendered
-            if page_img is None or separator_lines is None:
-                continue
+def normalize_shift_nr(shift_nr: str) -> str:
+    """Shift number as used in image filenames: all whitespace removed."""
+    return re.sub(r'\s+', '', shift_nr)
 
-            # Find crop bounds for this shift using cached separator lines
-            shift_y = int(shift["visual_y"] * zoom)
 
-            # Find the separator line just above this shift (top boundary)
-            lines_above = [y for y in separator_lines if y < shift_y]
-            y_top = max(lines_above) if lines_above else max(0, shift_y - int(10 * zoom))
+def write_image_manifest(version: str, sources: dict | None = None) -> dict:
+    """
+    Write png/manifest.json for the generated images:
+        'images': filename stem -> {'file', 'etag', 'size', 'variants', 'source'}, etag being
+                  a content hash, 'variants' '<size>.<png|webp>' -> {'file', 'etag', 'size'}
+                  with files relative to the png directory, and 'source' the row source
+                  hash the image was rendered from (None if unknown)
+        'lookup': normalized shift number or any prefix of one -> stem of the
+                  shortest matching filename (the same file an exact match or a
+                  prefix search for the shortest name would find)
+    """
+    import hashlib
 
-            # Find the separator line just below this shift (bottom boundary)
-            lines_below = [y for y in separator_lines if y > shift_y]
-            y_bottom = min(lines_below) + 2 if lines_below else min(page_img.height, shift_y + int(40 * zoom))
+    def file_entry(relative_path):
+        with open(os.path.join(paths['images_dir'], relative_path), 'rb') as f:
+            data = f.read()
+        return {'file': relative_path, 'etag': hashlib.sha256(data).hexdigest()[:32], 'size': len(data)}
 
-            crop_box = (
-                x_left,
-                y_top,
-                page_img.width - x_right_crop,
-                y_bottom
-            )
+    paths = get_paths(version)
+    if sources is None:
+        sources = _previous_image_sources(version)
+    images = {}
+    for filename in sorted(os.listdir(paths['images_dir'])):
+        if not filename.endswith('.png'):
+            continue
+        stem = filename[:-len('.png')]
+        entry = file_entry(filename)
+        entry['variants'] = {}
+        for size in IMAGE_VARIANT_WIDTHS:
+            for extension in ('png', 'webp'):
+                relative_path = f'{VARIANTS_DIR}/{size}/{stem}.{extension}'
+                if os.path.exists(os.path.join(paths['images_dir'], relative_path)):
+                    entry['variants'][f'{size}.{extension}'] = file_entry(relative_path)
+        entry['source'] = sources.get(stem)
+        images[stem] = entry
+
+    lookup = {}
+    for stem in sorted(images, key=lambda name: (len(name), name)):
+        for end in range(1, len(stem) + 1):
+            lookup.setdefault(stem[:end], stem)
+
+    manifest = {'images': images, 'lookup': lookup}
+    tmp_path = f"{paths['manifest_path']}.tmp-{os.getpid()}"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(tmp_path, paths['manifest_path'])
+    return manifest
+
+
+def load_image_manifest(version: str) -> dict | None:
+    """
+    Return the image manifest for a version, kept in memory and reloaded when
+    the file changes. Written on first use if images exist without one (e.g.
+    generated before manifests). None if there are no images.
+    """
+    paths = get_paths(version)
+    with _image_manifest_lock:
+        try:
+            signature = _file_signature(paths['manifest_path'])
+        except FileNotFoundError:
+            if not paths['images_dir_exists'] or not any(
+                    f.endswith('.png') for f in os.listdir(paths['images_dir'])):
+                return None
+            write_image_manifest(version)
+            signature = _file_signature(paths['manifest_path'])
+
+        cached = _image_manifests.get(paths['manifest_path'])
+        if cached and cached[0] == signature:
+            return cached[1]
+
+        with open(paths['manifest_path'], 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        _image_manifests[paths['manifest_path']] = (signature, manifest)
+        return manifest
+
+
+def lookup_shift_image(version: str, shift_nr: str, size: str | None = None,
+                       webp: bool = False) -> dict | None:
+    """
+    Manifest entry ({'file', 'etag', 'size'}) of the image for a shift number, or None.
 
-            cropped = page_img.crop(crop_box)
+    With size (a key of IMAGE_VARIANT_WIDTHS) the smaller of the WebP (only if
+    webp is True) and palette PNG variants is returned, or the original PNG if
+    there are no variants. Flat rows often compress better as palette PNG.
+    """
+    manifest = load_image_manifest(version)
+    if manifest is None:
+        return None
+    stem = manifest['lookup'].get(normalize_shift_nr(shift_nr))
+    if not stem:
+        return None
 
-            # Create and attach hour ruler
-            ruler = create_hour_ruler(cropped.width, zoom=zoom)
-            if ruler is not None:
-                combined = Image.new('RGB', (cropped.width, cropped.height + ruler.height), 'white')
-                combined.paste(ruler, (0, 0))
-                combined.paste(cropped, (0, ruler.height))
-            else:
-                combined = cropped
+    image = manifest['images'][stem]
+    variants = image.get('variants', {})
+    if size:
+        candidates = [variants[f'{size}.{extension}'] for extension in (['webp', 'png'] if webp else ['png'])
+                      if f'{size}.{extension}' in variants]
+        if candidates:
+            return min(candidates, key=lambda variant: variant['size'])
+    return image
 
-            # Save to file
-            combined.save(img_path, format="PNG")
-            generated.append(full_name)
 
-        except Exception as e:
-            errors.append({'shift_nr': full_name, 'error': str(e)})
+def image_size_report(version: str) -> dict | None:
+    """
+    Total bytes of the original PNGs and of each variant for a version, from
+    its image manifest. None if there are no images.
 
-        if progress_callback:
-            progress_callback(idx + 1, total, full_name)
+    Returns:
+        dict with 'images', 'original_bytes' and 'variants':
+        '<size>.<png|webp>' -> {'count', 'bytes', 'saved_bytes', 'saved_percent'},
+        savings measured against the originals of the same images
+    """
+    manifest = load_image_manifest(version)
+    if manifest is None:
+        return None
 
-    doc.close()
+    images = manifest['images'].values()
+    original_bytes = sum(image['size'] for image in images)
+    variants = {}
+    for size in IMAGE_VARIANT_WIDTHS:
+        for extension in ('png', 'webp'):
+            name = f'{size}.{extension}'
+            with_variant = [image for image in images if name in image.get('variants', {})]
+            if not with_variant:
+                continue
+            variant_bytes = sum(image['variants'][name]['size'] for image in with_variant)
+            baseline = sum(image['size'] for image in with_variant)
+            variants[name] = {
+                'count': len(with_variant),
+                'bytes': variant_bytes,
+                'saved_bytes': baseline - variant_bytes,
+                'saved_percent': round(100 * (baseline - variant_bytes) / baseline, 1) if baseline else 0.0,
+            }
 
-    return {
-        'success': True,
-        'generated': generated,
-        'skipped': skipped,
-        'errors': errors,
-        'total': total
-    }
+    return {'images': len(manifest['images']), 'original_bytes': original_bytes, 'variants': variants}
 
 
 def delete_all_images(version: str) -> dict:
@@ -595,6 +1113,9 @@ def delete_all_images(version: str) -> dict:
                     deleted_count += 1
                 except OSError as e:
                     errors.append({'file': filename, 'error': str(e)})
+        if os.path.exists(paths['manifest_path']):
+            os.remove(paths['manifest_path'])
+        shutil.rmtree(os.path.join(paths['images_dir'], VARIANTS_DIR), ignore_errors=True)
     except OSError as e:
         return {'success': False, 'error': f'Failed to access images directory: {e}'}
 
@@ -0,0 +1,253 @@
+"""
+Stage Pipeline
+
+Runs a set of stages ordered by their dependencies. Stages whose dependencies
+are done run concurrently in a thread pool, and each stage's outputs are
+cached in the artifact cache under a key derived from its input files, so a
+stage whose inputs are unchanged is restored instead of run again.
+
+A stage declares:
+    name        unique name, used in depends_on and in the report
+    run         callable(progress) -> JSON-serializable summary dict, where
+                progress(current, total, label) reports progress within the stage
+    depends_on  names of stages that must finish first
+    inputs      callable() -> list of input file paths, evaluated when the stage
+                is about to run (so it can see files written by its dependencies).
+                A missing input file skips the stage
+    outputs     callable() -> dict of artifact name -> output path. Files are
+                copied to/from the cache; a directory is checked in place (a hit
+                requires every file recorded with the entry to still be there)
+    params      extra JSON-serializable values that are part of the cache key
+    cache       False for stages with side effects outside their outputs (database)
+
+Usage:
+    pipeline = Pipeline('import_r26', [
+        Stage('scrape', run_scrape, inputs=lambda: [pdf_path], outputs=lambda: {'turnuser.json': json_path}),
+        Stage('stats', run_stats, depends_on=['scrape'], inputs=lambda: [json_path], ...),
+    ])
+    report = pipeline.run(workers=4, progress_callback=print)
+    report['stages']['stats']   # {'status': 'done', 'seconds': 0.4, 'result': {...}}
+"""
+
+import os
+import time
+import shutil
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from app.utils.artifact_cache import ArtifactCache, file_sha256
+
+logger = logging.getLogger(__name__)
+
+DONE = 'done'
+CACHED = 'cached'
+SKIPPED = 'skipped'
+FAILED = 'failed'
+SUCCESSFUL = (DONE, CACHED)
+
+# Bump to invalidate every cached stage output
+PIPELINE_CACHE_VERSION = 1
+
+
+class Stage():
+    def __init__(self, name, run, depends_on=(), inputs=None, outputs=None, params=None,
+                 cache=True, label=None):
+        self.name = name
+        self.run = run
+        self.depends_on = list(depends_on)
+        self.inputs = inputs or (lambda: [])
+        self.outputs = outputs or (lambda: {})
+        self.params = params or {}
+        self.cache = cache
+        self.label = label or name
+
+
+def _list_dir(path):
+    return sorted(f for f in os.listdir(path) if os.path.isfile(os.path.join(path, f)))
+
+
+class Pipeline():
+    def __init__(self, name, stages, cache_namespace='pipeline'):
+        self.name = name
+        self.stages = {stage.name: stage for stage in stages}
+        self.cache = ArtifactCache(cache_namespace)
+        self._validate()
+
+    def _validate(self):
+        for stage in self.stages.values():
+            for dep in stage.depends_on:
+                if dep not in self.stages:
+                    raise ValueError(f"Stage '{stage.name}' depends on unknown stage '{dep}'")
+        self.order()  # Raises on cycles
+
+    def order(self):
+        """Stage names in dependency order (stable with respect to declaration order)."""
+        ordered = []
+        remaining = dict(self.stages)
+        while remaining:
+            ready = [name for name, stage in remaining.items()
+                     if all(dep in ordered for dep in stage.depends_on)]
+            if not ready:
+                raise ValueError(f"Dependency cycle between stages: {', '.join(remaining)}")
+            for name in ready:
+                ordered.append(name)
+                del remaining[name]
+        return ordered
+
+    def cache_key(self, stage, input_paths):
+        return self.cache.make_key(self.name, stage.name, PIPELINE_CACHE_VERSION, stage.params,
+                                   [file_sha256(path) for path in input_paths])
+
+    def _restore(self, stage, key, outputs):
+        """Copy cached outputs into place. Returns False if the entry is missing or incomplete."""
+        meta = self.cache.get_meta(key)
+        if meta is None:
+            return False
+
+        for name, path in outputs.items():
+            if name in meta.get('directories', {}):
+                if not os.path.isdir(path):
+                    return False
+                present = set(_list_dir(path))
+                if not set(meta['directories'][name]) <= present:
+                    return False
+            elif not os.path.exists(self.cache.artifact_path(key, name)):
+                return False
+
+        for name, path in outputs.items():
+            if name not in meta.get('directories', {}):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                shutil.copyfile(self.cache.artifact_path(key, name), path)
+        self.cache.get(key)  # Mark as used
+        return True
+
+    def _store(self, stage, key, outputs, input_paths, result):
+        files = {}
+        directories = {}
+        for name, path in outputs.items():
+            if os.path.isdir(path):
+                directories[name] = _list_dir(path)
+            elif os.path.exists(path):
+                files[name] = path
+        self.cache.put(key, files=files,
+                       meta={'source': f'{self.name}/{stage.name}', 'inputs': input_paths,
+                             'directories': directories, 'result': result})
+
+    def _run_stage(self, stage, force, progress):
+        start = time.perf_counter()
+        input_paths = stage.inputs()
+        missing = [path for path in input_paths if not os.path.exists(path)]
+        if missing:
+            return {'status': SKIPPED, 'seconds': 0.0, 'reason': f'Mangler {os.path.basename(missing[0])}'}
+
+        key = None
+        if stage.cache:
+            key = self.cache_key(stage, input_paths)
+            if not force and self._restore(stage, key, stage.outputs()):
+                meta = self.cache.get_meta(key) or {}
+                logger.info("Stage %s/%s restored from cache (%s)", self.name, stage.name, key[:12])
+                return {'status': CACHED, 'seconds': time.perf_counter() - start,
+                        'result': meta.get('result')}
+
+        result = stage.run(progress)
+
+        if stage.cache:
+            # The summary is kept with the entry so a cache hit can report it
+            self._store(stage, key, stage.outputs(), input_paths, result)
+
+        return {'status': DONE, 'seconds': time.perf_counter() - start, 'result': result}
+
+    def run(self, workers=None, force=False, only=None, progress_callback=None):
+        """
+        Run the pipeline.
+
+        Args:
+            workers: Stages run at the same time (default: number of stages)
+            force: Ignore cached outputs and run every stage
+            only: Optional list of stage names to run; their dependencies must
+                  have produced their outputs already (the missing-input check skips them otherwise)
+            progress_callback: Optional callback(current, total, label) with
+                               current counted in finished stages (fractional within a stage)
+
+        Returns:
+            dict with 'success', 'seconds' and 'stages': name -> {'status', 'seconds', 'result' | 'error' | 'reason'},
+            in dependency order
+        """
+        names = [name for name in self.order() if not only or name in only]
+        selected = set(names)
+        total = len(names)
+        reports = {}
+        running_progress = {}
+        lock = threading.Lock()
+        start = time.perf_counter()
+
+        def report_progress(stage_name, current, stage_total, label):
+            if not progress_callback:
+                return
+            with lock:
+                running_progress[stage_name] = (current / stage_total) if stage_total else 0.0
+                overall = len(reports) + sum(running_progress.values())
+            progress_callback(overall, total, f'{self.stages[stage_name].label}: {label}' if label else self.stages[stage_name].label)
+
+        def stage_progress(stage_name):
+            return lambda current, stage_total, label='': report_progress(stage_name, current, stage_total, label)
+
+        pending = list(names)
+        futures = {}
+        with ThreadPoolExecutor(max_workers=max(1, workers or total or 1),
+                                thread_name_prefix=f'pipeline-{self.name}') as executor:
+            while pending or futures:
+                for name in list(pending):
+                    stage = self.stages[name]
+                    deps = [dep for dep in stage.depends_on if dep in selected]
+                    if any(dep in reports and reports[dep]['status'] not in SUCCESSFUL for dep in deps):
+                        failed_dep = next(dep for dep in deps if reports[dep]['status'] not in SUCCESSFUL)
+                        reports[name] = {'status': SKIPPED, 'seconds': 0.0,
+                                         'reason': f'{self.stages[failed_dep].label} ble ikke fullført'}
+                        pending.remove(name)
+                    elif all(dep in reports for dep in deps):
+                        futures[executor.submit(self._run_stage, stage, force, stage_progress(name))] = name
+                        pending.remove(name)
+
+                if not futures:
+                    continue
+
+                finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = futures.pop(future)
+                    try:
+                        report = future.result()
+                    except Exception as e:
+                        logger.exception("Stage %s/%s failed", self.name, name)
+                        report = {'status': FAILED, 'seconds': None, 'error': str(e)}
+                    except BaseException:
+                        # Cancellation: let running stages see it on their next progress call
+                        for other in futures:
+                            other.cancel()
+                        raise
+                    with lock:
+                        reports[name] = report
+                        running_progress.pop(name, None)
+                    logger.info("Stage %s/%s %s in %s", self.name, name, report['status'],
+                                f"{report['seconds']:.2f}s" if report.get('seconds') is not None else '-')
+                    if progress_callback:
+                        progress_callback(len(reports), total, f"{self.stages[name].label}: {report['status']}")
+
+        return {
+            'success': all(reports[name]['status'] != FAILED for name in names),
+            'seconds': time.perf_counter() - start,
+            'stages': {name: reports[name] for name in names},
+        }
+
+
+def format_report(pipeline, report):
+    """Report as text lines (one per stage) for the CLI and job messages."""
+    lines = []
+    for name, stage_report in report['stages'].items():
+        seconds = stage_report.get('seconds')
+        timing = f'{seconds:7.2f}s' if seconds is not None else '      -'
+        detail = stage_report.get('error') or stage_report.get('reason') or ''
+        lines.append(f"{pipeline.stages[name].label:<24} {stage_report['status']:<8} {timing}  {detail}".rstrip())
+    lines.append(f"{'Totalt':<24} {'':<8} {report['seconds']:7.2f}s")
+    return lines
@@ -10,6 +10,7 @@ import pandas as pd
 import numpy as np
 import json
 from config import AppConfig
+from app.utils import day_classifier
 
 '''
 - Fridays that goes over 2 hours into saturay counts as weekend days.
@@ -19,16 +20,38 @@ from config import AppConfig
 
 
 class Turnus():
-    def __init__(self, json_path) -> None:
-        self.turnuser_df = self.JsonToDataframe(json_path)
+    """
+    Shift statistics per turnus.
+
+    Turnus(json_path) computes stats for a whole turnuser JSON file. For a
+    stream of turnuser (e.g. from the scraper), create Turnus(), call
+    add_turnus() for each one and finish() at the end; only one turnus is
+    held as a DataFrame at a time.
+    """
+    def __init__(self, json_path=None) -> None:
         self.stats_df = pd.DataFrame()
-
-
-        self.get_shift_stats()
-
-    def JsonToDataframe(self, turnus_json):
-        with open(turnus_json, 'r') as f:
-            json_data = json.load(f)
+        self._stats_rows = []
+
+        if json_path is not None:
+            with open(json_path, 'r') as f:
+                for turnus in json.load(f):
+                    self.add_turnus(turnus)
+            self.finish()
+
+    def add_turnus(self, turnus):
+        """Compute stats for one {turnus_navn: turnus_dict} entry."""
+        turnus_df = self.JsonToDataframe([turnus])
+        if not turnus_df.empty:
+            self.get_shift_stats(turnus_df)
+
+    def finish(self):
+        """Build stats_df from the added turnuser, sorted by name like a groupby."""
+        if self._stats_rows:
+            rows = sorted(self._stats_rows, key=lambda row: row['turnus'])
+            self.stats_df = pd.DataFrame(rows)
+        return self.stats_df
+
+    def JsonToDataframe(self, json_data):
         data = []
 
         for turnus in json_data:
@@ -55,6 +78,11 @@ class Turnus():
                             slutt_tid = pd.to_datetime("00:00", format='%H:%M')
                             
                         
+                        # Dagskategori fra skrapingen (eldre filer har den ikke)
+                        kategori = dag_data.get('kategori')
+                        if kategori is None:
+                            kategori = day_classifier.classify(dag_data['tid'], dag_data['dagsverk'])
+
                         new_row = {
                             'turnus' : turnus_navn,
                             'ukedag' : dag_data['ukedag'],
@@ -62,7 +90,8 @@ class Turnus():
                             'uke_nr'   : uke_nr,
                             'start' : start_tid,
                             'slutt' : slutt_tid,
-                            'dagsverk' : dag_data['dagsverk']
+                            'dagsverk' : dag_data['dagsverk'],
+                            'kategori' : kategori
                         }
                         
                         data.append(new_row)
@@ -73,8 +102,8 @@ class Turnus():
     
 
 
-    def get_shift_stats(self):
-        df_grpby_turnus = self.turnuser_df.groupby('turnus')
+    def get_shift_stats(self, turnuser_df):
+        df_grpby_turnus = turnuser_df.groupby('turnus')
         
         for turnus_navn, turnus_df in df_grpby_turnus:
 
@@ -98,7 +127,7 @@ class Turnus():
             
 
             for _index, _dagsverk in turuns_df_reset.iterrows():
-                if _dagsverk['start'] != _dagsverk['slutt']:     
+                if day_classifier.is_shift(_dagsverk['kategori']):
                     # Checks for bottom of the list
                     if _index + 1 < len(turuns_df_reset):
                         shift_cnt += 1
@@ -112,8 +141,8 @@ class Turnus():
                         if end < start:
                             end += pd.Timedelta(days=1)
                         
-                        # Counts night shifts - align with coloring logic (start time ≥ 19:00)
-                        if start.time() >= time(19, 0):
+                        # Counts night shifts - the same days the turnusliste colours as natt
+                        if day_classifier.shift_code(_dagsverk['kategori']) == day_classifier.NATT:
                             night_count += 1
                             # Natt i helg
                             if ukedag in weekend_days:
@@ -191,25 +220,23 @@ class Turnus():
                 #### TEST ####
                 #print(f"{_dagsverk['turnus']}, {_dagsverk['uke_nr']}, {_dagsverk['ukedag']}, {sunday_hours}")
 
-            # Adds shift as new row to dataframe
-            new_row = pd.DataFrame({
-                'turnus': [turnus_navn], 
-                'shift_cnt': [shift_cnt],
-                'tidlig': [tidlig],
-                'ettermiddag' : [afternoon_count],
-                'natt': [night_count],
-                'natt_helg': [round(natt_helg,1)],
-                'helgetimer': [round(helgetimer,1)], 
-                'helgedager': [helgedager],
-                'helgetimer_dagtid': [round(helgetimer_dagtid,1)],
-                'helgetimer_ettermiddag': [round(helgetimer_ettermiddag)],
-                'before_6': [before_6],
-                'afternoon_ends_before_20': [afternoon_ends_before_20],
-                'afternoons_in_row': [afternons_in_row]
+            # Adds shift as new row, built into stats_df by finish()
+            self._stats_rows.append({
+                'turnus': turnus_navn, 
+                'shift_cnt': shift_cnt,
+                'tidlig': tidlig,
+                'ettermiddag' : afternoon_count,
+                'natt': night_count,
+                'natt_helg': round(natt_helg,1),
+                'helgetimer': round(helgetimer,1), 
+                'helgedager': helgedager,
+                'helgetimer_dagtid': round(helgetimer_dagtid,1),
+                'helgetimer_ettermiddag': round(helgetimer_ettermiddag),
+                'before_6': before_6,
+                'afternoon_ends_before_20': afternoon_ends_before_20,
+                'afternoons_in_row': afternons_in_row
                 
                 })
-            
-            self.stats_df = pd.concat([self.stats_df, new_row], ignore_index=True)
 
 
 def generate_statistics_for_year(year_id):
@@ -0,0 +1,195 @@
+"""
+Turnus Pages
+
+JSON for the turnusliste, served in pages of PAGE_SIZE turnuser or for a
+list of turnus names, so the page can load turnuser as they are needed
+instead of rendering the whole year inline.
+
+Each turnus is one block:
+
+    {"name": "OSL_01", "index": 0,
+     "weeks": [{"nr": "1", "days": [{"dagsverk": "3006", "tid": ["13:13", "19:01"], "kategori": "K"}, ...]}, ...],
+     "stats": {"shift_cnt": 25, "tidlig": 10, ...}}
+
+Days only carry what the page shows: dagsverk, tid, the day category the
+cell is coloured by (see day_classifier) and the double shift flags
+(is_consecutive_shift, is_consecutive_receiver, is_delt_dagsverk), the
+flags only when set. stats are the turnus' row of the stats DataFrame.
+
+Blocks are serialized once per turnus set, and every page is kept as JSON
+bytes, gzip-compressed bytes and an ETag, all rebuilt when the set's files
+change. Responses for name lists are put together from the serialized
+blocks and kept for the most recent NAME_PAYLOADS lists.
+
+Usage:
+    payload = get_page(turnus_set_id, 0)
+    payload.body, payload.gzipped, payload.etag
+"""
+
+import gzip
+import json
+import math
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+from app.utils import db_utils, df_utils
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 10
+MAX_NAMES = 50          # Turnuser per name list request
+NAME_PAYLOADS = 64      # Name list responses kept per turnus set
+GZIP_LEVEL = 6
+
+# Stats columns sent with each turnus (the turnusliste data-felt)
+STATS_COLUMNS = ('shift_cnt', 'tidlig', 'ettermiddag', 'natt', 'helgetimer', 'helgetimer_dagtid',
+                 'before_6', 'afternoon_ends_before_20')
+
+# Day flags sent when set
+DAY_FLAGS = ('is_consecutive_shift', 'is_consecutive_receiver', 'is_delt_dagsverk')
+
+# Serialized turnus sets: turnus_set_id -> _SetPages
+_sets = {}
+_sets_lock = threading.Lock()
+
+
+class Payload():
+    """A JSON response body, its gzip-compressed form and an ETag per encoding."""
+
+    def __init__(self, body):
+        self.body = body
+        self.gzipped = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+
+    @property
+    def gzip_etag(self):
+        return f'{self.etag}-gz'
+
+
+def _stat_value(value):
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    # numpy scalars from the DataFrame
+    return value.item() if hasattr(value, 'item') else value
+
+
+def _day(day_data):
+    day = {'dagsverk': day_data.get('dagsverk', ''), 'tid': day_data.get('tid') or [],
+           'kategori': day_data.get('kategori', '')}
+    for flag in DAY_FLAGS:
+        if day_data.get(flag):
+            day[flag] = True
+    return day
+
+
+def turnus_block(name, index, turnus_data, stats_row):
+    """The API block of one turnus (see the module docstring)."""
+    weeks = []
+    for week_nr, week_data in turnus_data.items():
+        # Same weeks and days as the turnusliste template shows
+        if not isinstance(week_data, dict) or not str(week_nr).lstrip('-').isdigit() or int(week_nr) < 0:
+            continue
+        weeks.append({'nr': str(week_nr),
+                      'days': [_day(day_data) for day_data in week_data.values() if isinstance(day_data, dict)]})
+
+    stats = None
+    if stats_row is not None:
+        stats = {column: _stat_value(stats_row.get(column)) for column in STATS_COLUMNS}
+
+    return {'name': name, 'index': index, 'weeks': weeks, 'stats': stats}
+
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class _SetPages():
+    """Serialized blocks and page payloads of one turnus set."""
+
+    def __init__(self, turnus_set_id, manager):
+        self.turnus_set_id = turnus_set_id
+        self.source_key = manager._source_key
+
+        stats = {}
+        if not manager.df.empty:
+            for row in manager.df.to_dict(orient='records'):
+                stats.setdefault(row['turnus'], row)
+
+        self.names = []
+        self.blocks = {}  # name -> serialized block
+        for turnus in manager.turnus_data:
+            for name, data in turnus.items():
+                if name in self.blocks:
+                    continue
+                self.blocks[name] = _dumps(turnus_block(name, len(self.names), data, stats.get(name)))
+                self.names.append(name)
+
+        self.page_count = max(1, -(-len(self.names) // PAGE_SIZE))
+        self.pages = [self._payload(self.names[page * PAGE_SIZE:(page + 1) * PAGE_SIZE], page=page)
+                      for page in range(self.page_count)]
+
+        self._name_payloads = OrderedDict()
+        self._name_payloads_lock = threading.Lock()
+
+    def _payload(self, names, page=None):
+        header = {'turnus_set_id': self.turnus_set_id, 'total': len(self.names),
+                  'page_size': PAGE_SIZE, 'pages': self.page_count}
+        if page is not None:
+            header['page'] = page
+        # The blocks are already serialized: splice them into the envelope
+        body = _dumps(header)[:-1] + b',"turnuser":[' + b','.join(self.blocks[name] for name in names) + b']}'
+        return Payload(body)
+
+    def for_names(self, names):
+        """Payload with the blocks of the known names, in the order given."""
+        key = tuple(dict.fromkeys(name for name in names if name in self.blocks))
+        with self._name_payloads_lock:
+            payload = self._name_payloads.get(key)
+            if payload is not None:
+                self._name_payloads.move_to_end(key)
+                return payload
+
+        payload = self._payload(key)
+        with self._name_payloads_lock:
+            self._name_payloads[key] = payload
+            while len(self._name_payloads) > NAME_PAYLOADS:
+                self._name_payloads.popitem(last=False)
+        return payload
+
+
+def get_set_pages(turnus_set_id):
+    """Serialized pages of a turnus set, built on first use and again when its files change.
+    None if the set doesn't exist or has no turnus data."""
+    turnus_set = db_utils.get_turnus_set_by_id(turnus_set_id)
+    if not turnus_set:
+        return None
+    source_key = df_utils.turnus_set_source_key(turnus_set)
+    with _sets_lock:
+        pages = _sets.get(turnus_set_id)
+        if pages is None or pages.source_key != source_key:
+            manager = df_utils.DataframeManager(turnus_set_id)
+            if not manager.turnus_data:
+                return None
+            pages = _SetPages(turnus_set_id, manager)
+            _sets[turnus_set_id] = pages
+            logger.info("Serialized turnus set %s: %d turnuser in %d pages",
+                        turnus_set_id, len(pages.names), pages.page_count)
+        return pages
+
+
+def get_page(turnus_set_id, page):
+    """Payload of one page (0-based), or None if the set or page doesn't exist."""
+    pages = get_set_pages(turnus_set_id)
+    if pages is None or not 0 <= page < pages.page_count:
+        return None
+    return pages.pages[page]
+
+
+def get_turnuser(turnus_set_id, names):
+    """Payload with the named turnuser (unknown names left out), or None if the set doesn't exist."""
+    pages = get_set_pages(turnus_set_id)
+    if pages is None:
+        return None
+    return pages.for_names(names)
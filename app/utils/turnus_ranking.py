@@ -0,0 +1,180 @@
+"""
+Turnus Ranking
+
+Server-side version of the turnusliste sorting in
+static/js/modules/sorting-system.js. Each criterion is min-max normalized over
+the turnus set (0.5 when all turnuser have the same value); a positive weight
+favours high values, a negative weight low values:
+
+    score = sum(n * w for w > 0) + sum((1 - n) * |w| for w < 0)
+
+The normalized matrix N (turnuser x criteria) and 1 - N are built once per
+turnus set and rebuilt when its files change, so ranking is a few vector
+operations over all turnuser. The sums are taken column by column in slider
+order, as the browser adds them, rather than as one dot product: turnuser
+whose scores only differ by rounding then still come out in the same order.
+Values are truncated to integers first, as the page's parseInt() does; ties
+keep the turnusliste order.
+
+Usage:
+    ranking = rank(turnus_set_id, {'helgetimer': 3, 'natt': -2}, top_k=10)
+    ranking['turnuser'], ranking['scores']
+"""
+
+import logging
+import threading
+
+import numpy as np
+
+from app.utils import db_utils, df_utils
+
+logger = logging.getLogger(__name__)
+
+# Criteria as columns of the turnus DataFrame, in matrix column order
+CRITERIA = ('helgetimer', 'shift_cnt', 'tidlig', 'natt', 'ettermiddag', 'before_6', 'afternoon_ends_before_20')
+
+# Slider names that differ from the DataFrame column
+WEIGHT_ALIASES = {'afternoon_ends': 'afternoon_ends_before_20'}
+
+# Normalized matrices: turnus_set_id -> _RankMatrix
+_matrices = {}
+_matrices_lock = threading.Lock()
+
+
+class _RankMatrix():
+    """Turnus names in turnusliste order and their normalized criteria, shape (turnuser, criteria)."""
+
+    def __init__(self, manager):
+        self.source_key = manager._source_key
+
+        rows = {}
+        if not manager.df.empty:
+            for row in manager.df.to_dict(orient='records'):
+                rows.setdefault(row['turnus'], row)
+
+        # Turnuser as listed on the page; ones without stats can't be scored
+        self.names = [name for turnus in manager.turnus_data for name in turnus if name in rows]
+
+        values = np.zeros((len(self.names), len(CRITERIA)))
+        for i, name in enumerate(self.names):
+            for j, key in enumerate(CRITERIA):
+                values[i, j] = _as_number(rows[name].get(key))
+        values = np.trunc(values)
+
+        if len(self.names):
+            low = values.min(axis=0)
+            span = values.max(axis=0) - low
+            normalized = np.where(span > 0, (values - low) / np.where(span > 0, span, 1), 0.5)
+        else:
+            normalized = values
+        # Column-major: scoring reads one criterion for all turnuser at a time
+        self.normalized = np.asfortranarray(normalized)
+        self.inverted = np.asfortranarray(1 - normalized)
+
+    def scores(self, weights):
+        """Score of every turnus for a weight vector in CRITERIA order."""
+        scores = np.zeros(len(self.names))
+        for j, weight in enumerate(weights):
+            if weight > 0:
+                scores += self.normalized[:, j] * weight
+            elif weight < 0:
+                scores += self.inverted[:, j] * -weight
+        return scores
+
+
+def _as_number(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return value if np.isfinite(value) else 0.0
+
+
+def get_matrix(turnus_set_id):
+    """
+    The rank matrix of a turnus set, built on first use and again when its files change.
+    None if the turnus set doesn't exist.
+    """
+    turnus_set = db_utils.get_turnus_set_by_id(turnus_set_id)
+    if not turnus_set:
+        with _matrices_lock:
+            _matrices.pop(turnus_set_id, None)
+        return None
+    source_key = df_utils.turnus_set_source_key(turnus_set)
+    with _matrices_lock:
+        matrix = _matrices.get(turnus_set_id)
+        if matrix is None or matrix.source_key != source_key:
+            matrix = _RankMatrix(df_utils.DataframeManager(turnus_set_id))
+            _matrices[turnus_set_id] = matrix
+            logger.debug("Built rank matrix for turnus set %s: %d turnuser", turnus_set_id, len(matrix.names))
+        return matrix
+
+
+def parse_weights(values):
+    """
+    Weight vector in CRITERIA order from slider values ({name: number}).
+    Unknown names are ignored; missing ones are 0.
+
+    Raises:
+        ValueError: A weight is not a finite number
+    """
+    weights = np.zeros(len(CRITERIA))
+    for key, value in values.items():
+        key = WEIGHT_ALIASES.get(key, key)
+        if key not in CRITERIA:
+            continue
+        try:
+            weight = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f'Invalid weight for {key}: {value!r}')
+        if not np.isfinite(weight):
+            raise ValueError(f'Invalid weight for {key}: {value!r}')
+        weights[CRITERIA.index(key)] = weight
+    return weights
+
+
+def top_indices(scores, top_k=None):
+    """
+    Indices of the highest scores, best first, ties in index order (a stable
+    descending sort). With top_k only the first top_k are selected and sorted.
+    """
+    count = len(scores)
+    if top_k is None or top_k >= count:
+        return np.argsort(-scores, kind='stable')
+    if top_k <= 0:
+        return np.empty(0, dtype=np.intp)
+
+    # k-th best score; everything above it is in, ties at it are taken in index order
+    threshold = np.partition(scores, count - top_k)[count - top_k]
+    above = np.flatnonzero(scores > threshold)
+    tied = np.flatnonzero(scores == threshold)[:top_k - len(above)]
+    selected = np.concatenate([above, tied])
+    return selected[np.argsort(-scores[selected], kind='stable')]
+
+
+def rank(turnus_set_id, weights, top_k=None):
+    """
+    Turnuser of a turnus set ordered by score for the given slider weights.
+
+    Args:
+        turnus_set_id: Turnus set to rank
+        weights: {criterion or slider name: weight}, or a weight vector in CRITERIA order
+        top_k: Only return the best top_k turnuser (None for all)
+
+    Returns:
+        dict: {'turnuser': [names, best first], 'scores': [floats], 'total': number of ranked turnuser}
+    """
+    if isinstance(weights, dict):
+        weights = parse_weights(weights)
+
+    matrix = get_matrix(turnus_set_id)
+    if matrix is None or not matrix.names:
+        return {'turnuser': [], 'scores': [], 'total': 0}
+
+    scores = matrix.scores(weights)
+    order = top_indices(scores, top_k)
+    return {
+        'turnuser': [matrix.names[i] for i in order],
+        'scores': scores[order].tolist(),
+        'total': len(matrix.names),
+    }
@@ -1,226 +1,386 @@
-import pandas as pd
-import json
-import openpyxl
+"""
+Turnusnøkkel Generator
+
+Fills a year's turnusnøkkel Excel template (turnusnøkkel_<YEAR>_org.xlsx)
+with the shift times of one turnus.
+
+- The parsed template is kept in memory per process and loaded again when
+  the file's mtime or size changes. Requests fill it under a lock: the cells
+  written for the previous turnus are restored before each fill.
+- Turnus data is looked up by name through an index per turnus JSON file,
+  also reloaded when the file changes.
+- The workbook is saved to a BytesIO. Generated files are cached in the
+  artifact cache by (turnus set, turnus, template hash, turnus data hash),
+  so a repeated download is served straight from disk.
+- stream_turnusnokler_zip() exports many turnuser (a whole set or a user's
+  favorites) as one ZIP archive, rendered in a process pool and written to
+  the archive as each file finishes.
+"""
+
+import io
 import os
-from openpyxl import load_workbook
-from openpyxl.utils import get_column_letter
+import json
+import hashlib
+import logging
+import threading
 from config import AppConfig
 from app.utils import db_utils, df_utils
 
+logger = logging.getLogger(__name__)
+
+SHEET_NAME = 'Turnusnøkkel'
+START_ROW = 51  # Week n is written to row START_ROW + n
+START_COL = 1   # Day n is written to column START_COL + n
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Bump when the generated files change for the same template and turnus data
+TURNUSNOKKEL_VERSION = 1
+CACHE_BLOB = 'turnusnokkel.xlsx'
+
+# Parsed templates: template path -> _Template
+_templates = {}
+_templates_lock = threading.Lock()
+
+# Turnus data by name: turnus JSON path -> ((mtime, size), {turnus name: turnus data})
+_turnus_indexes = {}
+_turnus_indexes_lock = threading.Lock()
+
+
+def _file_signature(path):
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def template_path(year_identifier):
+    """Path of the turnusnøkkel template for a year (e.g. R26)."""
+    return os.path.join(AppConfig.turnusfiler_dir, year_identifier.lower(),
+                        f'turnusnøkkel_{year_identifier.upper()}_org.xlsx')
+
+
+def cell_values(turnus_data):
+    """Yield (cell coordinate, value) for each day of a turnus: 'start - end', 'start' or ''."""
+    from openpyxl.utils import get_column_letter
+
+    for uke_nr, ukedata in turnus_data.items():
+        for dag_nr, dag_data in ukedata.items():
+            tid = dag_data.get('tid') or []
+            start_value = tid[0] if len(tid) > 0 else ''
+            end_value = tid[1] if len(tid) > 1 else ''
+
+            if start_value and end_value:
+                cell_value = f'{start_value} - {end_value}'
+            else:
+                cell_value = start_value or ''
+
+            yield f"{get_column_letter(START_COL + int(dag_nr))}{START_ROW + int(uke_nr)}", cell_value
+
+
+class _Template():
+    """A parsed template shared by requests in this process; filled and saved under its lock."""
+
+    def __init__(self, path):
+        from openpyxl import load_workbook
+
+        with open(path, 'rb') as f:
+            data = f.read()
+        self.path = path
+        self.signature = _file_signature(path)
+        self.sha256 = hashlib.sha256(data).hexdigest()
+        self.workbook = load_workbook(io.BytesIO(data))
+        if SHEET_NAME not in self.workbook.sheetnames:
+            raise ValueError(f"Sheet '{SHEET_NAME}' not found in the Excel file")
+
+        self.sheet = self.workbook[SHEET_NAME]
+        for name in self.workbook.sheetnames:
+            if name != SHEET_NAME:
+                self.workbook[name].sheet_state = 'hidden'
+        # Reset scroll position so the sheet opens at the top
+        self.sheet.sheet_view.topLeftCell = 'A1'
+
+        # openpyxl reads an image's data from its file object when saving and closes it,
+        # so keep the bytes and hand each save a fresh copy
+        self._images = [(image, image._data()) for sheet in self.workbook.worksheets for image in sheet._images]
+
+        self._template_values = {}  # Template value of every cell a fill has written
+        self.lock = threading.Lock()
+
+    def render(self, turnus_data):
+        """The template filled with a turnus, as .xlsx bytes."""
+        with self.lock:
+            for coordinate, value in self._template_values.items():
+                self.sheet[coordinate] = value
+            for coordinate, value in cell_values(turnus_data):
+                self._template_values.setdefault(coordinate, self.sheet[coordinate].value)
+                self.sheet[coordinate] = value
+
+            for image, image_data in self._images:
+                image.ref = io.BytesIO(image_data)
+            output = io.BytesIO()
+            self.workbook.save(output)
+        return output.getvalue()
+
+
+def get_template(path):
+    """The parsed template at path, loaded on first use and again when the file changes."""
+    signature = _file_signature(path)
+    with _templates_lock:
+        template = _templates.get(path)
+        if template is None or template.signature != signature:
+            template = _Template(path)
+            _templates[path] = template
+            logger.info("Loaded turnusnøkkel template %s", path)
+        return template
+
+
+def get_turnus_index(turnus_set):
+    """{turnus name: turnus data} of a turnus set, from its turnus JSON (cached per file)."""
+    turnus_path, _df_path = df_utils.turnus_file_paths(turnus_set)
+    signature = _file_signature(turnus_path)
+    with _turnus_indexes_lock:
+        cached = _turnus_indexes.get(turnus_path)
+        if cached and cached[0] == signature:
+            return cached[1]
+
+        with open(turnus_path, 'r', encoding='utf-8') as f:
+            turnus_data = json.load(f)
+        index = {}
+        for turnus_dict in turnus_data:
+            for name, data in turnus_dict.items():
+                index.setdefault(name, data)
+        _turnus_indexes[turnus_path] = (signature, index)
+        return index
+
+
+def output_filename(turnus_name, year_identifier):
+    return f"Turnusnøkkel_{turnus_name}_{year_identifier}.xlsx"
+
+
+def _cache_key(cache, turnus_set_id, turnus_name, template_sha256, turnus_data):
+    return cache.make_key(TURNUSNOKKEL_VERSION, turnus_set_id, turnus_name, template_sha256, turnus_data)
+
+
+def _cache_put(cache, key, turnus_set, turnus_name, data):
+    # The file is already rendered: a failed cache write must not fail the response
+    try:
+        cache.put(key, meta={'turnus_set_id': turnus_set['id'], 'turnus': turnus_name,
+                             'year_identifier': turnus_set['year_identifier']},
+                  blobs={CACHE_BLOB: data})
+    except Exception:
+        logger.exception("Caching turnusnøkkel for %s failed", turnus_name)
+
 
 class TurnusnokkelGen():
     def __init__(self, turnus_name=None, turnus_set_id=None):
         self.turnus_set_id = turnus_set_id
         self.turnus_name = turnus_name
-        self.sheet_name = 'Turnusnøkkel'
-        self.start_row = 51
-        self.start_col = 1
-        
-        # Set file path based on turnus set if available
-        if self.turnus_set_id:
-            turnus_set = db_utils.get_turnus_set_by_id(self.turnus_set_id)
-            if turnus_set:
-                year_identifier = turnus_set['year_identifier']
-                self.file_path = f'{AppConfig.turnusfiler_dir}/{year_identifier.lower()}/turnusnøkkel_{year_identifier}_org.xlsx'
-            else:
-                # Fallback to R25 if turnus set not found
-                self.file_path = f'{AppConfig.turnusfiler_dir}/turnusnøkkel_R25_org.xlsx'
-        else:
-            # Fallback to R25 if no turnus set ID provided
-            self.file_path = f'{AppConfig.turnusfiler_dir}/turnusnøkkel_R25_org.xlsx'
-        
-        # Only load workbook if we're not doing single turnus generation
-        # (single generation uses its own path logic)
-        if not self.turnus_name:
-            self.workbook, self.sheet = self.get_turnusnøkkel_excel_data()
-   
-    # Step 1: Load the existing Excel file
-    def get_turnusnøkkel_excel_data(self):
-        # This method is mainly used for the legacy generate_all_turnus_nokkel
-        # For single turnus generation, we use the proper path in generate_single_turnus_nokkel
-        excel_file = 'turnusnøkkel_R25_org.xlsx'
-        if os.path.exists(excel_file):
-            workbook = load_workbook(excel_file)
-            sheet = workbook.active
-            return workbook, sheet
-        else:
-            # Fallback: try to find it in the proper location
-            try:
-                from config import AppConfig
-                fallback_path = f'{AppConfig.turnusfiler_dir}/turnusnøkkel_R25_org.xlsx'
-                if os.path.exists(fallback_path):
-                    workbook = load_workbook(fallback_path)
-                    sheet = workbook.active
-                    return workbook, sheet
-            except (ImportError, AttributeError, FileNotFoundError):
-                pass
-            raise FileNotFoundError(f"Excel template file not found: {excel_file}")
-
 
     def generate_single_turnus_nokkel(self):
         """
-        Generate turnusnøkkel Excel file for a specific turnus
-        
+        Generate the turnusnøkkel Excel file for a specific turnus
+
         Returns:
-            dict: {'success': bool, 'filename': str, 'error': str}
+            dict: {'success': bool, 'filename': str, 'stream': binary file object,
+                   'etag': str, 'cached': bool} or {'success': False, 'error': str}.
+                   The caller closes the stream (send_file does).
         """
+        from app.utils.artifact_cache import ArtifactCache
+
         try:
             if not self.turnus_name or not self.turnus_set_id:
                 return {'success': False, 'error': 'Missing turnus name or turnus set ID'}
-            
-            # Get the turnus data for the specific turnus set
-            df_manager = df_utils.DataframeManager(self.turnus_set_id)
-            turnus_data = df_manager.turnus_data
-            
-            # Find the specific turnus data
-            target_turnus_data = None
-            for turnus_dict in turnus_data:
-                if self.turnus_name in turnus_dict:
-                    target_turnus_data = turnus_dict[self.turnus_name]
-                    break
-            
-            if not target_turnus_data:
-                return {'success': False, 'error': f'Turnus "{self.turnus_name}" not found in turnus set {self.turnus_set_id}'}
-            
-            # Get turnus set info for file paths
+
             turnus_set = db_utils.get_turnus_set_by_id(self.turnus_set_id)
             if not turnus_set:
                 return {'success': False, 'error': f'Turnus set {self.turnus_set_id} not found'}
-            
+
+            target_turnus_data = get_turnus_index(turnus_set).get(self.turnus_name)
+            if not target_turnus_data:
+                return {'success': False, 'error': f'Turnus "{self.turnus_name}" not found in turnus set {self.turnus_set_id}'}
+
             year_identifier = turnus_set['year_identifier']
-            
-            # Define file paths based on turnus set
-            # Get the project root directory
-            project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-            base_path = os.path.join(project_root, 'app', 'static', 'turnusfiler', year_identifier.lower())
-            excel_template = os.path.join(base_path, f'turnusnøkkel_{year_identifier}_org.xlsx')
-            
-            # Debug info for error reporting
-            debug_info = f"year_identifier={year_identifier}, base_path={base_path}, template={excel_template}"
-            
-            # Check if template exists
+            excel_template = template_path(year_identifier)
             if not os.path.exists(excel_template):
-                # List available files in the directory for debugging
-                available_files = []
-                if os.path.exists(base_path):
-                    available_files = os.listdir(base_path)
-                
-                error_msg = f'Template file not found: {excel_template}\n'
-                error_msg += f'Debug info: {debug_info}\n'
-                error_msg += f'Base path exists: {os.path.exists(base_path)}\n'
-                error_msg += f'Available files in base path: {available_files}'
-                return {'success': False, 'error': error_msg}
-            
-            # Load the existing Excel file
-            workbook = load_workbook(excel_template)
-            sheet = workbook.active
-            
-            # Access the specific sheet
-            if self.sheet_name in workbook.sheetnames:
-                sheet = workbook[self.sheet_name]
-            else:
-                return {'success': False, 'error': f"Sheet '{self.sheet_name}' not found in the Excel file"}
-            
-            for name in workbook.sheetnames:
-                if name != self.sheet_name:
-                    workbook[name].sheet_state = 'hidden'
-            
-            # Process the turnus data and insert into Excel
-            for uke_nr, ukedata in target_turnus_data.items():
-                for dag_nr, dag_data in ukedata.items():
-                    try:
-                        start_value = dag_data['tid'][0] if dag_data['tid'] and len(dag_data['tid']) > 0 else ''
-                    except (IndexError, KeyError, TypeError):
-                        start_value = ''
-
-                    try:
-                        end_value = dag_data['tid'][1] if dag_data['tid'] and len(dag_data['tid']) > 1 else ''
-                    except (IndexError, KeyError, TypeError):
-                        end_value = ''
-                    
-                    # Create cell value
-                    if start_value and end_value:
-                        cell_value = f'{start_value} - {end_value}'
-                    elif start_value:
-                        cell_value = start_value
-                    else:
-                        cell_value = ''
-
-                    # Set the value in the appropriate cell
-                    col_letter = get_column_letter(self.start_col + int(dag_nr))
-                    sheet[f"{col_letter}{self.start_row + int(uke_nr)}"] = cell_value
-
-            # Reset scroll position so the sheet opens at the top
-            sheet.sheet_view.topLeftCell = 'A1'
-
-            # Generate filename (no need to save to disk)
-            filename = f"Turnusnøkkel_{self.turnus_name}_{year_identifier}.xlsx"
-            
-            # Return the workbook object instead of saving to disk
-            return {'success': True, 'filename': filename, 'workbook': workbook}
-            
+                return {'success': False, 'error': f'Template file not found: {excel_template}'}
+
+            template = get_template(excel_template)
+            filename = output_filename(self.turnus_name, year_identifier)
+
+            cache = ArtifactCache('turnusnokkel')
+            key = _cache_key(cache, self.turnus_set_id, self.turnus_name, template.sha256, target_turnus_data)
+            if cache.get(key) is not None:
+                return {'success': True, 'filename': filename, 'etag': key[:32], 'cached': True,
+                        'stream': open(cache.artifact_path(key, CACHE_BLOB), 'rb')}
+
+            data = template.render(target_turnus_data)
+            _cache_put(cache, key, turnus_set, self.turnus_name, data)
+            return {'success': True, 'filename': filename, 'etag': key[:32], 'cached': False,
+                    'stream': io.BytesIO(data)}
+
         except Exception as e:
+            logger.exception("Generating turnusnøkkel for %s failed", self.turnus_name)
             return {'success': False, 'error': f'Error generating turnusnøkkel: {str(e)}'}
 
 
-    def generate_all_turnus_nokkel(self):
+# Bulk export
+
+# Files being rendered or waiting to be written, per worker
+IN_FLIGHT_PER_WORKER = 2
+
+# Parsed templates in a pool worker: template path -> _Template. Workers are
+# spawned, not forked, so they never inherit locks held by the web process.
+_worker_templates = {}
+
+
+def _render_in_worker(excel_template, turnus_name, turnus_data):
+    """Pool task: one turnusnøkkel as .xlsx bytes, the template parsed once per worker process."""
+    template = _worker_templates.get(excel_template)
+    if template is None or template.signature != _file_signature(excel_template):
+        template = _Template(excel_template)
+        _worker_templates[excel_template] = template
+    return template.render(turnus_data)
+
+
+def _iter_rendered(excel_template, todo, workers):
+    """
+    Render (turnus name, turnus data) pairs. Yields (turnus name, bytes or None, error or None)
+    as each file is done: in order in this process when workers <= 1 or there are fewer
+    files than the pool would hold at once (starting spawned workers costs more than a
+    few renders, e.g. for a favorites download), else in completion order from a process
+    pool holding at most IN_FLIGHT_PER_WORKER files per worker.
+    """
+    if not workers or workers <= 1 or len(todo) < workers * IN_FLIGHT_PER_WORKER:
+        template = get_template(excel_template)
+        for turnus_name, turnus_data in todo:
+            try:
+                yield turnus_name, template.render(turnus_data), None
+            except Exception as e:
+                logger.exception("Generating turnusnøkkel for %s failed", turnus_name)
+                yield turnus_name, None, str(e)
+        return
+
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 
-        # Step 2: Access a specific sheet by name
-        if self.sheet_name in self.workbook.sheetnames:
-            sheet = self.workbook[self.sheet_name]
+    pending = iter(todo)
+    running = {}  # future -> turnus name
+    # Spawned, not forked: other threads here (jobs, pipelines) may hold locks
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+    try:
+        while True:
+            for turnus_name, turnus_data in pending:
+                running[executor.submit(_render_in_worker, excel_template, turnus_name, turnus_data)] = turnus_name
+                if len(running) >= workers * IN_FLIGHT_PER_WORKER:
+                    break
+            if not running:
+                break
+
+            done, _not_done = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                turnus_name = running.pop(future)
+                try:
+                    yield turnus_name, future.result(), None
+                except Exception as e:
+                    logger.error("Generating turnusnøkkel for %s failed: %s", turnus_name, e)
+                    yield turnus_name, None, str(e)
+    finally:
+        # Don't render the rest if the consumer stopped (e.g. the download was aborted)
+        executor.shutdown(cancel_futures=True)
+
+
+class _ChunkWriter():
+    """Write-only, unseekable file object for zipfile; drain() hands over what was written so far."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_turnusnokler_zip(turnus_set, turnus_names=None, workers=1, report=None):
+    """
+    Turnusnøkler of a turnus set as a ZIP archive, yielded in chunks as each file is added.
+
+    Files already in the artifact cache are copied from disk; the rest are rendered
+    (see _iter_rendered), added to the archive as they finish and put in the cache.
+    Only the files in flight are held in memory, never the archive.
+
+    Args:
+        turnus_set: Turnus set dict (id, year_identifier)
+        turnus_names: Turnuser to include, in archive order for cached files.
+                      None for every turnus in the set. Unknown names are skipped.
+        workers: Processes rendering files (<= 1, or only a few uncached files, renders in this process)
+        report: Optional dict, filled with 'files', 'cached', 'missing' and 'errors'
+                as the archive is written
+
+    Raises:
+        FileNotFoundError: No turnusnøkkel template for the set's year
+    """
+    import zipfile
+    from app.utils.artifact_cache import ArtifactCache
+
+    year_identifier = turnus_set['year_identifier']
+    excel_template = template_path(year_identifier)
+    if not os.path.exists(excel_template):
+        raise FileNotFoundError(f'Template file not found: {excel_template}')
+    template_sha256 = get_template(excel_template).sha256
+
+    index = get_turnus_index(turnus_set)
+    if turnus_names is None:
+        turnus_names = list(index)
+
+    report = report if report is not None else {}
+    report.update({'files': 0, 'cached': 0, 'missing': [], 'errors': []})
+
+    cache = ArtifactCache('turnusnokkel')
+    cached, todo, keys = [], [], {}
+    for turnus_name in dict.fromkeys(turnus_names):
+        turnus_data = index.get(turnus_name)
+        if not turnus_data:
+            report['missing'].append(turnus_name)
+            continue
+        keys[turnus_name] = _cache_key(cache, turnus_set['id'], turnus_name, template_sha256, turnus_data)
+        if cache.get(keys[turnus_name]) is not None:
+            cached.append(turnus_name)
         else:
-            raise ValueError(f"Sheet '{self.sheet_name}' not found in the Excel file.")
-
-        # Step 2: Load the JSON file (assuming a 7x6 table structure)
-        with open('turnuser_R25.json', 'r') as file:
-            json_data = json.load(file)
-
-        # Step 4: Specify where to start inserting the data
-        start_row = 51  # Row 2, for example
-        start_col = 1  # Column B (2nd column)
-
-
-        # Step 4: Extract 'start' and 'end' from each nested dictionary and insert them into cells
-        for turnus in json_data:
-            for turnus_navn, turnus_data in turnus.items():
-                # Step 1: Load the existing Excel file
-                excel_file = 'turnusnøkkel_R25_org.xlsx'
-                workbook = load_workbook(excel_file)
-                sheet = workbook.active  # Select the active sheet, or specify the sheet name
-
-                # Step 2: Access a specific sheet by name
-                sheet_name = 'Turnusnøkkel'
-                if sheet_name in workbook.sheetnames:
-                    sheet = workbook[sheet_name]
-                else:
-                    raise ValueError(f"Sheet '{sheet_name}' not found in the Excel file.")
-
-                for uke_nr, ukedata in turnus_data.items():
-                    for dag_nr, dag_data in ukedata.items():
-                    
-                        try:
-                            start_value = dag_data['tid'][0]
-                        except IndexError:
-                            start_value = ''
-
-                        try:
-                            end_value = dag_data['tid'][1]
-                        except IndexError:
-                            end_value = ''
-                        
-                        
-                        cell_value = f'{start_value} - {end_value}' if start_value and end_value else f"{start_value}"
-
-                        # Set the 'start' value in the first column of this row
-                        col_letter_start = get_column_letter(start_col+int(dag_nr))
-                        sheet[f"{col_letter_start}{start_row + int(uke_nr)}"] = cell_value
-                    
-                # Save the updated Excel file with a new name
-                filename = f"Turnusnøkkel_{turnus_navn}.xlsx"
-                workbook.save(filename)
-                    
-
-if __name__ == "__main__":
-    # Example usage
-    generator = TurnusnokkelGen()
-    generator.generate_all_turnus_nokkel()
\ No newline at end of file
+            todo.append((turnus_name, turnus_data))
+
+    writer = _ChunkWriter()
+    # The files are .xlsx (already deflated), so they are stored as they are
+    with zipfile.ZipFile(writer, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for turnus_name in cached:
+            try:
+                with open(cache.artifact_path(keys[turnus_name], CACHE_BLOB), 'rb') as f:
+                    data = f.read()
+            except FileNotFoundError:
+                # Pruned or replaced since the hit was checked: render it with the rest
+                todo.append((turnus_name, index[turnus_name]))
+                continue
+            archive.writestr(output_filename(turnus_name, year_identifier), data)
+            report['files'] += 1
+            report['cached'] += 1
+            yield writer.drain()
+
+        for turnus_name, data, error in _iter_rendered(excel_template, todo, workers):
+            if error is not None:
+                report['errors'].append({'turnus': turnus_name, 'error': error})
+                continue
+            archive.writestr(output_filename(turnus_name, year_identifier), data)
+            _cache_put(cache, keys[turnus_name], turnus_set, turnus_name, data)
+            report['files'] += 1
+            yield writer.drain()
+    yield writer.drain()
+
+
+def zip_filename(turnus_set, favorites=False):
+    suffix = '_favoritter' if favorites else ''
+    return f"Turnusnøkler_{turnus_set['year_identifier']}{suffix}.zip"
@@ -73,6 +73,22 @@ class AppConfig:
     UNVERIFIED_CLEANUP_DAYS = _env_int('UNVERIFIED_CLEANUP_DAYS', 14)
     MAX_VERIFICATION_EMAILS_PER_DAY = _env_int('MAX_VERIFICATION_EMAILS_PER_DAY', 3)
 
+    # Metrics
+    METRICS_ENABLED = _env_bool('METRICS_ENABLED', True)
+    SLOW_REQUEST_MS = _env_int('SLOW_REQUEST_MS', 1000)  # 0 disables slow-request logging
+    METRICS_TOKEN = _env('METRICS_TOKEN', '')  # Bearer token for Prometheus scraping
+
+    # PDF processing
+    SCRAPER_WORKERS = _env_int('SCRAPER_WORKERS', 1)  # Processes used by ShiftScraper.scrape_pdf
+    STREKLISTE_WORKERS = _env_int('STREKLISTE_WORKERS', 1)  # Processes used by strekliste generate_all_images
+    TURNUSNOKKEL_WORKERS = _env_int('TURNUSNOKKEL_WORKERS', 1)  # Processes used by the turnusnøkkel ZIP download
+
+    # Background jobs (PDF import, refresh, strekliste images)
+    JOB_WORKERS = _env_int('JOB_WORKERS', 1)  # Threads per app process running background jobs
+
+    # Startup
+    WARMUP_ON_START = _env_bool('WARMUP_ON_START', False)  # Load active turnus set in create_app()
+
     # MySQL (exposed as class attrs for backup scripts)
     MYSQL_HOST = _env('MYSQL_HOST', '')
     MYSQL_USER = _env('MYSQL_USER', '')
@@ -86,3 +102,5 @@ class AppConfig:
     sessions_dir = os.path.abspath(os.path.join(base_dir, 'app', 'utils', 'sessions'))
     log_dir = os.path.abspath(os.path.join(base_dir, 'app', 'logs'))
     turnusfiler_dir = os.path.abspath(os.path.join(base_dir, 'app', 'static', 'turnusfiler'))
+    cache_dir = os.path.abspath(os.path.join(base_dir, 'app', 'cache'))
+    jobs_db_path = os.path.abspath(os.path.join(base_dir, 'app', 'jobs', 'jobs.sqlite'))
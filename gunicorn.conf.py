@@ -0,0 +1,31 @@
+"""
+Gunicorn configuration.
+
+Loads the app once in the master (preload_app) and forks workers from it, so
+turnus data, stats frames and compiled templates are shared copy-on-write.
+
+Usage:
+    gunicorn run:app
+
+Use app/scripts/measure_worker_memory.py to check resident memory per worker.
+"""
+
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8080')
+workers = int(os.environ.get('GUNICORN_WORKERS', 3))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+preload_app = True
+pidfile = os.environ.get('GUNICORN_PIDFILE', '/tmp/shift_rotation_organizer.pid')
+
+
+def when_ready(server):
+    # Runs in the master after the app is loaded, before any worker is forked
+    from app.lifecycle import preload
+    from run import app
+    preload(app)
+
+
+def post_fork(server, worker):
+    from app.lifecycle import post_fork as reset_worker
+    reset_worker()
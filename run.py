@@ -1,7 +1,10 @@
 from app import create_app
 
-app = create_app()
-print('Run: Create App')
- 
+# Process pools start their workers with spawn, which imports the main module
+# again as __mp_main__: those workers only render files and must not build the app.
+if __name__ != '__mp_main__':
+    app = create_app()
+    print('Run: Create App')
+
 if __name__ == '__main__':
     app.run(port=8080, debug=True)
\ No newline at end of file